@@ -0,0 +1,73 @@
+"""
+Datos sintéticos deterministas con la MISMA forma que devuelve DataProvider:
+- listado /pools: {"pools": [...]} con pairAddress, ChainId, Liquidity, Volume, tokens...
+- /pool/history: {"pool": {...info..., "history": [snapshots 8h, más reciente primero]}}
+"""
+import zlib
+from datetime import datetime, timedelta
+
+import numpy as np
+
+CHAINS = ["arbitrum", "base", "ethereum", "optimism", "polygon"]
+TOKENS = ["WETH", "USDC", "WBTC", "ARB", "OP", "CBBTC", "USDT", "DAI", "LINK", "UNI", "PEPE", "AERO"]
+FEE_TIERS = [100, 500, 3000, 10000]
+SNAPSHOTS_PER_DAY = 3
+HISTORY_END = datetime(2025, 1, 1)
+
+
+def _seed(*parts):
+    return zlib.crc32("|".join(str(p) for p in parts).encode())
+
+
+def make_pool_listing(n_pools, seed=0):
+    """Listado general de `n_pools` pools (formato de get_all_pools)."""
+    rng = np.random.default_rng(seed)
+    pools = []
+    for i in range(n_pools):
+        base, quote = rng.choice(TOKENS, size=2, replace=False)
+        pools.append({
+            "_id": f"id{i}",
+            "pairAddress": f"0x{i:040x}",
+            "ChainId": str(rng.choice(CHAINS)),
+            "DexId": "uniswap-v3",
+            "BaseToken": str(base),
+            "QuoteToken": str(quote),
+            "feeTier": str(rng.choice(FEE_TIERS)),
+            "Liquidity": str(round(float(10 ** rng.uniform(3, 8)), 2)),
+            "Volume": str(round(float(10 ** rng.uniform(2, 7)), 2)),
+        })
+    return pools
+
+
+def make_history(address, days, annual_vol=None, start_price=None):
+    """Historial de 8h (más reciente primero) para `days` días, determinista por dirección."""
+    rng = np.random.default_rng(_seed(address, days))
+    n = days * SNAPSHOTS_PER_DAY
+    vol = annual_vol if annual_vol is not None else float(rng.uniform(0.2, 1.5))
+    step_sd = vol / np.sqrt(365 * SNAPSHOTS_PER_DAY)
+
+    p0 = start_price if start_price is not None else float(10 ** rng.uniform(-2, 4))
+    prices = p0 * np.exp(np.cumsum(rng.normal(0.0, step_sd, n)))
+    quote_usd = float(rng.choice([1.0, 2500.0]))
+    aprs = np.abs(rng.normal(30.0, 20.0, n))
+    liquidity = 10 ** rng.uniform(4, 7) * np.exp(np.cumsum(rng.normal(0.0, 0.01, n)))
+
+    history = []
+    for k in range(n):
+        date = HISTORY_END - timedelta(hours=8 * (n - 1 - k))
+        history.append({
+            "date": date.strftime("%Y%m%d%H%M%S"),
+            "priceNative": float(prices[k]),
+            "priceUsd": float(prices[k] * quote_usd),
+            "apr": float(aprs[k]),
+            "Liquidity": float(liquidity[k]),
+        })
+    history.reverse()
+    return history
+
+
+def make_pool_detail(pool, days):
+    """Objeto completo de /pool/history para un pool del listado."""
+    detail = dict(pool)
+    detail["history"] = make_history(pool.get("pairAddress") or pool.get("_id"), days)
+    return detail
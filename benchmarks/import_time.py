@@ -0,0 +1,66 @@
+"""
+Tiempo de arranque en frío: cada muestra importa el módulo en un intérprete nuevo
+(sin contar el arranque de Python) y anota qué dependencias pesadas quedaron cargadas.
+
+    python -m benchmarks.import_time
+    python -m benchmarks.run --suite imports
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Lo que importa un worker nuevo según lo que vaya a hacer
+IMPORT_TARGETS = (
+    "uni_v3_kit",
+    "uni_v3_kit.math_core",
+    "uni_v3_kit.nft_gate",
+    "uni_v3_kit.data_provider",
+    "uni_v3_kit.backtester",
+    "uni_v3_kit.analyzer",
+    "uni_v3_kit.precompute",
+)
+HEAVY_MODULES = ("numpy", "pandas", "requests", "web3", "eth_account")
+
+_PROBE = (
+    "import importlib, json, sys, time\n"
+    "start = time.perf_counter()\n"
+    "importlib.import_module({module!r})\n"
+    "elapsed = time.perf_counter() - start\n"
+    "print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))\n"
+)
+
+
+def cold_import(module):
+    """(segundos, dependencias pesadas cargadas) de importar `module` en un proceso nuevo."""
+    code = _PROBE.format(module=module, heavy=HEAVY_MODULES)
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {module}: {out.stderr.strip().splitlines()[-1:]}")
+    data = json.loads(out.stdout.strip().splitlines()[-1])
+    return data["seconds"], data["loaded"]
+
+
+def bench_imports(cfg):
+    results = {}
+    for module in IMPORT_TARGETS:
+        try:
+            samples, loaded = [], []
+            for _ in range(cfg["repeat"]):
+                seconds, loaded = cold_import(module)
+                samples.append(seconds)
+        except RuntimeError as e:
+            # p.ej. web3 no instalado: el resto de casos sigue siendo útil
+            print(e)
+            continue
+        results[f"import/{module}"] = {"min": min(samples), "median": statistics.median(samples),
+                                       "repeat": cfg["repeat"], "number": 1, "loaded": loaded}
+    return results
+
+
+if __name__ == "__main__":
+    for name, r in bench_imports({"repeat": 5}).items():
+        print(f"{name:35s} median {r['median'] * 1000:8.1f} ms   carga: {', '.join(r['loaded']) or '-'}")
@@ -0,0 +1,219 @@
+"""
+Benchmarks de rendimiento de uni_v3_kit (scan, listado /pools, backtest, V3Math y arranque en frío).
+
+    python -m benchmarks.run --size small --output bench.json
+    python -m benchmarks.run --size small --baseline bench.json --tolerance 0.25 --memory-tolerance 0.10
+
+Con --baseline compara con una ejecución anterior y sale con código 1 si algún caso es
+más lento que baseline * (1 + tolerance) o, en los casos que miden memoria (peak_mb),
+usa más que baseline * (1 + memory_tolerance).
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+from uni_v3_kit.analyzer import MarketScanner
+from uni_v3_kit.backtester import Backtester
+from uni_v3_kit.data_provider import DataProvider
+from uni_v3_kit.http_client import HttpClient
+from uni_v3_kit.math_core import RollingVolatility, V3Math
+from uni_v3_kit.memo import ResultCache
+from uni_v3_kit.pool_history import PoolHistory
+from uni_v3_kit.pool_index import PoolIndex
+
+from .fixtures import make_history, make_pool_listing
+from .import_time import bench_imports
+from .stub_server import StubIndexServer
+
+SIZES = {
+    "small":  {"pools": 500,   "scan_history_days": 90,  "backtest_days": [90, 365],        "listing_pools": 20000,  "repeat": 5},
+    "medium": {"pools": 2000,  "scan_history_days": 365, "backtest_days": [365, 3 * 365],   "listing_pools": 100000, "repeat": 5},
+    "large":  {"pools": 10000, "scan_history_days": 365, "backtest_days": [3 * 365, 5 * 365], "listing_pools": 300000, "repeat": 3},
+}
+
+
+def measure(fn, repeat, number=1):
+    """Ejecuta fn `number` veces por muestra; devuelve estadísticas por llamada (segundos)."""
+    fn()  # calentamiento
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return {"min": min(samples), "median": statistics.median(samples), "repeat": repeat, "number": number}
+
+
+def bench_scan(cfg, latency):
+    results = {}
+    pools = make_pool_listing(cfg["pools"])
+    with StubIndexServer(pools, history_days=cfg["scan_history_days"], latency=latency) as server:
+        for workers in (1, 16):
+            # listing_ttl=0: cada scan revalida el listado (304 si no ha cambiado)
+            provider = DataProvider(http_client=HttpClient(), store=False, listing_ttl=0)
+            provider.base_url = server.url
+            # Sin memo: tras el calentamiento cada muestra sería solo un acierto de caché
+            scanner = MarketScanner(provider, cache=False)
+            run = lambda: scanner.scan(None, 0, 7, 1.0, 0, ["WETH"], max_workers=workers)
+            results[f"scan.pools{cfg['pools']}.workers{workers}"] = measure(run, max(1, cfg["repeat"] // 2))
+    return results
+
+
+def _peak_mb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def bench_listing(cfg):
+    """Listado /pools: lista completa (get_all_pools) + índice vs índice en streaming vs revalidación (304)."""
+    results = {}
+    n = cfg["listing_pools"]
+    with StubIndexServer(make_pool_listing(n)) as server:
+        provider = DataProvider(http_client=HttpClient(), store=False, listing_ttl=0)
+        provider.base_url = server.url
+
+        def full():
+            return PoolIndex(DataProvider.get_all_pools(provider))
+
+        def stream():
+            DataProvider._index_cache.pop(server.url, None)
+            return provider.get_pool_index()
+
+        for name, fn in (("all_pools", full), ("stream", stream)):
+            results[f"listing.pools{n}.{name}"] = dict(measure(fn, cfg["repeat"]), peak_mb=_peak_mb(fn))
+        provider.get_pool_index()
+        results[f"listing.pools{n}.not_modified"] = measure(provider.get_pool_index, cfg["repeat"])
+    return results
+
+
+def bench_backtest(cfg):
+    results = {}
+    # Sin memo en los casos de motor: medimos la simulación, no el acierto de caché
+    backtester = Backtester(cache=False)
+    for days in cfg["backtest_days"]:
+        history = make_history("0xbacktest", days + 14, annual_vol=0.9, start_price=2500.0)
+        parsed = PoolHistory.from_records(history)
+        for auto in (False, True):
+            tag = f"backtest.{days}d.{'auto' if auto else 'static'}"
+            results[f"{tag}.loop"] = measure(
+                lambda: backtester.run_simulation(history, 1000.0, 1.0, sim_days=days, vol_days=7, auto_rebalance=auto, engine="loop"),
+                cfg["repeat"])
+            results[f"{tag}.vector"] = measure(
+                lambda: backtester.run_simulation(parsed, 1000.0, 1.0, sim_days=days, vol_days=7, auto_rebalance=auto),
+                cfg["repeat"])
+
+        # Coste de un acierto del memo (hash del historial + copia del resultado), aparte
+        memoized = Backtester(cache=ResultCache(name="bench"))
+        results[f"backtest.{days}d.memo_hit"] = measure(
+            lambda: memoized.run_simulation(parsed, 1000.0, 1.0, sim_days=days, vol_days=7), cfg["repeat"])
+    return results
+
+
+def bench_math(cfg):
+    results = {}
+    rng = np.random.default_rng(0)
+    widths = rng.uniform(0.005, 0.9, 10_000)
+    sqrt_p = np.sqrt(rng.uniform(0.5, 2.0, 10_000))
+    prices = list(2500.0 * np.exp(np.cumsum(rng.normal(0, 0.02, 365 * 3))))
+
+    results["math.il_at_limit.scalar_x1000"] = measure(
+        lambda: [V3Math.calculate_v3_il_at_limit(float(w)) for w in widths[:1000]], cfg["repeat"])
+    results["math.il_at_limit.array_10k"] = measure(
+        lambda: V3Math.calculate_v3_il_at_limit(widths), cfg["repeat"], number=10)
+    results["math.calculate_amounts.scalar_x1000"] = measure(
+        lambda: [V3Math.calculate_amounts(1000.0, float(s), 0.9, 1.1) for s in sqrt_p[:1000]], cfg["repeat"])
+    results["math.calculate_amounts.array_10k"] = measure(
+        lambda: V3Math.calculate_amounts(1000.0, sqrt_p, 0.9, 1.1), cfg["repeat"], number=10)
+    results["math.realized_volatility.365d"] = measure(
+        lambda: V3Math.calculate_realized_volatility(prices), cfg["repeat"], number=10)
+    rolling = RollingVolatility(prices)
+    starts = np.arange(0, len(prices) - 21)
+    results["math.rolling_volatility.all_windows"] = measure(
+        lambda: rolling.annualized_many(starts, starts + 21), cfg["repeat"], number=10)
+    return results
+
+
+def compare(current, baseline, tolerance, memory_tolerance=None):
+    """
+    Lista de (caso, métrica, ratio) que empeoran respecto al baseline: "median" por encima de
+    baseline * (1 + tolerance) y "peak_mb" por encima de baseline * (1 + memory_tolerance)
+    (por defecto, la misma tolerancia).
+    """
+    memory_tolerance = tolerance if memory_tolerance is None else memory_tolerance
+    regressions = []
+    for name, base in baseline.get("results", {}).items():
+        cur = current["results"].get(name)
+        if not cur: continue
+        for metric, limit in (("median", tolerance), ("peak_mb", memory_tolerance)):
+            if not base.get(metric) or metric not in cur: continue
+            ratio = cur[metric] / base[metric]
+            if ratio > 1.0 + limit:
+                regressions.append((name, metric, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de uni_v3_kit")
+    parser.add_argument("--size", choices=sorted(SIZES), default="small")
+    parser.add_argument("--suite", default="scan,listing,backtest,math,imports", help="lista separada por comas")
+    parser.add_argument("--latency", type=float, default=0.02, help="latencia simulada del stub (s)")
+    parser.add_argument("--output", help="fichero JSON de resultados")
+    parser.add_argument("--baseline", help="JSON de una ejecución anterior para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="margen de tiempo (mediana) frente al baseline")
+    parser.add_argument("--memory-tolerance", type=float, help="margen de memoria pico (peak_mb); por defecto --tolerance")
+    args = parser.parse_args(argv)
+
+    cfg = SIZES[args.size]
+    suites = {s.strip() for s in args.suite.split(",") if s.strip()}
+
+    results = {}
+    if "scan" in suites: results.update(bench_scan(cfg, args.latency))
+    if "listing" in suites: results.update(bench_listing(cfg))
+    if "backtest" in suites: results.update(bench_backtest(cfg))
+    if "math" in suites: results.update(bench_math(cfg))
+    if "imports" in suites: results.update(bench_imports(cfg))
+
+    report = {
+        "meta": {
+            "size": args.size,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        },
+        "results": results,
+    }
+
+    for name, r in sorted(results.items()):
+        peak = f"   pico {r['peak_mb']:8.1f} MB" if "peak_mb" in r else ""
+        print(f"{name:55s} median {r['median'] * 1000:10.3f} ms   min {r['min'] * 1000:10.3f} ms{peak}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance, args.memory_tolerance)
+        for name, metric, ratio in regressions:
+            what = "más memoria pico" if metric == "peak_mb" else "más lento"
+            print(f"REGRESIÓN {name}: {ratio:.2f}x {what} que el baseline")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
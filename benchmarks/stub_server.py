@@ -0,0 +1,114 @@
+"""Servidor HTTP local que imita apiindex (/pools y /pool/history) con latencia configurable."""
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from .fixtures import make_pool_detail
+
+
+class StubIndexServer:
+    """
+    Uso:
+        with StubIndexServer(pools, history_days=90, latency=0.05) as server:
+            provider.base_url = server.url
+
+    `slow`: {address: segundos} de latencia extra en /pool/history (endpoints colgados).
+    """
+
+    def __init__(self, pools, history_days=90, latency=0.0, slow=None):
+        self.pools = pools
+        self.history_days = history_days
+        self.latency = latency
+        self.slow = slow or {}
+        self.requests = 0
+        self.not_modified = 0
+        self._by_address = {p.get("pairAddress") or p.get("_id"): p for p in pools}
+        self._payloads = {}
+        self._lock = threading.Lock()
+        self._listing = json.dumps({"pools": pools}).encode()
+        self.listing_etag = '"%s"' % hashlib.blake2b(self._listing, digest_size=12).hexdigest()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def _history_payload(self, address):
+        # Se pre-serializa una vez: medimos al cliente, no al servidor
+        with self._lock:
+            payload = self._payloads.get(address)
+            if payload is None:
+                pool = self._by_address.get(address)
+                body = {"pool": make_pool_detail(pool, self.history_days) if pool else {}}
+                payload = self._payloads[address] = json.dumps(body).encode()
+            return payload
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+
+                url = urlparse(self.path)
+                extra_headers = {}
+                if url.path == "/pools":
+                    # Petición condicional: listado sin cambios -> 304 sin cuerpo
+                    if self.headers.get("If-None-Match") == server.listing_etag:
+                        with server._lock:
+                            server.not_modified += 1
+                        self.send_response(304)
+                        self.send_header("ETag", server.listing_etag)
+                        self.end_headers()
+                        return
+                    body = server._listing
+                    extra_headers["ETag"] = server.listing_etag
+                elif url.path == "/pool/history":
+                    address = parse_qs(url.query).get("id", [""])[0]
+                    if address in server.slow:
+                        time.sleep(server.slow[address])
+                    body = server._history_payload(address)
+                else:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in extra_headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
@@ -0,0 +1,71 @@
+import numpy as np
+
+from benchmarks.fixtures import make_history, make_pool_listing
+from uni_v3_kit.archive import ArchiveDataProvider, SnapshotArchive
+from uni_v3_kit.backtester import Backtester
+from uni_v3_kit.data_provider import SnapshotDirectoryProvider
+from uni_v3_kit.pool_history import PoolHistory
+
+COLUMNS = ("date", "price_native", "price_usd", "apr", "liquidity", "price")
+
+
+def _pools():
+    pools = {}
+    for k, address in enumerate(("0xa", "0xb", "0xc")):
+        history = make_history(address, 30 + 20 * k)
+        history[2]["priceNative"] = None
+        history[5]["apr"] = "n/a"
+        pools[address] = {"pairAddress": address, "poolName": f"POOL{k}", "feeTier": "3000", "history": history}
+    return pools
+
+
+def _assert_same_history(got, expected):
+    for column in COLUMNS:
+        np.testing.assert_array_equal(getattr(got, column), getattr(expected, column))
+    assert got.meta == expected.meta
+
+
+def test_round_trip_matches_source(tmp_path):
+    pools = _pools()
+    listing = make_pool_listing(5)
+    archive = SnapshotArchive.write(str(tmp_path / "arch"), pools, listing=listing)
+
+    reopened = SnapshotArchive(str(tmp_path / "arch"))
+    assert sorted(reopened.addresses()) == sorted(pools)
+    assert reopened.pool_listing() == listing
+    for address, pool in pools.items():
+        history = reopened.get(address)
+        _assert_same_history(history, PoolHistory.from_pool(pool))
+        # Vistas sobre el memmap, no copias
+        assert np.shares_memory(history.price_native, reopened._records)
+        assert reopened.get_pool(address) == PoolHistory.from_pool(pool).to_pool()
+    assert reopened.get("0xnone") is None and len(archive) == 3
+
+
+def test_export_dir_round_trip(tmp_path):
+    pools = _pools()
+    archive = SnapshotArchive.write(str(tmp_path / "arch"), pools)
+    archive.export_dir(str(tmp_path / "json"))
+
+    directory = SnapshotDirectoryProvider(str(tmp_path / "json"))
+    for address, pool in pools.items():
+        _assert_same_history(PoolHistory.from_pool(directory.get_pool_history(address)), PoolHistory.from_pool(pool))
+
+
+def test_backtest_on_archive_matches_raw_history(tmp_path):
+    pools = _pools()
+    archive = SnapshotArchive.write(str(tmp_path / "arch"), pools)
+    provider = ArchiveDataProvider(archive)
+
+    backtester = Backtester(provider, cache=False)
+    from_archive = backtester.run_simulation(backtester.load_history("0xc"), 1000.0, 1.0, sim_days=30)
+    from_raw = backtester.run_simulation(pools["0xc"]["history"], 1000.0, 1.0, sim_days=30)
+    np.testing.assert_allclose(from_archive[0].drop(columns="Date").to_numpy(float),
+                               from_raw[0].drop(columns="Date").to_numpy(float), rtol=1e-12)
+
+
+def test_non_numeric_dates_are_skipped_and_empty_archive_opens(tmp_path):
+    bad = {"0xbad": [{"date": "ayer", "priceNative": 1.0}]}
+    archive = SnapshotArchive.write(str(tmp_path / "empty"), bad)
+    assert len(archive) == 0
+    assert archive.pool_listing() == []
@@ -0,0 +1,45 @@
+import itertools
+
+import pandas as pd
+import pytest
+
+from benchmarks.fixtures import make_history
+from uni_v3_kit.backtester import Backtester
+from uni_v3_kit.pool_history import PoolHistory
+
+# El motor vectorizado reordena sumas y usa cumsums: solo cambia el redondeo
+RTOL = 1e-9
+
+CASES = list(itertools.product(
+    ["0xa", "0xb", "0xc"],  # historiales sintéticos con distinta volatilidad y precio
+    [False, True],          # auto_rebalance
+    [0.5, 1.0, 2.5],        # sd_multiplier
+    [3, 7, 14],             # vol_days
+))
+
+
+@pytest.fixture(scope="module")
+def backtester():
+    return Backtester(cache=False)
+
+
+@pytest.mark.parametrize("address,auto,sd,vol_days", CASES)
+def test_vector_engine_matches_loop(backtester, address, auto, sd, vol_days):
+    history = make_history(address, 120)
+    kwargs = dict(sim_days=60, vol_days=vol_days, auto_rebalance=auto)
+    loop_df, loop_min, loop_max, loop_meta = backtester.run_simulation(history, 1000.0, sd, engine="loop", **kwargs)
+    vec_df, vec_min, vec_max, vec_meta = backtester.run_simulation(PoolHistory.from_records(history), 1000.0, sd, **kwargs)
+
+    pd.testing.assert_frame_equal(loop_df.drop(columns="Date"), vec_df.drop(columns="Date"),
+                                  check_dtype=False, check_exact=False, rtol=RTOL)
+    assert list(pd.to_datetime(loop_df["Date"])) == list(pd.to_datetime(vec_df["Date"]))
+    assert (vec_min, vec_max) == pytest.approx((loop_min, loop_max), rel=RTOL)
+    assert vec_meta["rebalances"] == loop_meta["rebalances"]
+    for key in ("initial_volatility", "initial_range_width_pct"):
+        assert float(vec_meta[key]) == pytest.approx(float(loop_meta[key]), rel=RTOL)
+
+
+def test_insufficient_history_agrees(backtester):
+    history = make_history("0xshort", 3)
+    for engine in ("loop", "vector"):
+        assert backtester.run_simulation(history, 1000.0, 1.0, sim_days=30, engine=engine) is None
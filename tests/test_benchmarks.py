@@ -0,0 +1,21 @@
+from benchmarks.run import compare
+
+
+def _report(**results):
+    return {"results": results}
+
+
+def test_compare_flags_time_and_memory_regressions():
+    baseline = _report(scan={"median": 1.0}, listing={"median": 1.0, "peak_mb": 100.0})
+
+    assert compare(_report(scan={"median": 1.2}, listing={"median": 1.0, "peak_mb": 120.0}), baseline, 0.25) == []
+    assert compare(_report(scan={"median": 1.3}, listing={"median": 0.9, "peak_mb": 100.0}), baseline, 0.25) == \
+        [("scan", "median", 1.3)]
+    # La memoria tiene su propio margen
+    assert compare(_report(scan={"median": 1.0}, listing={"median": 1.0, "peak_mb": 120.0}), baseline, 0.25,
+                   memory_tolerance=0.1) == [("listing", "peak_mb", 1.2)]
+
+
+def test_compare_ignores_cases_missing_on_either_side():
+    baseline = _report(old={"median": 1.0}, listing={"median": 1.0})
+    assert compare(_report(listing={"median": 1.0, "peak_mb": 500.0}, new={"median": 9.0}), baseline, 0.25) == []
@@ -0,0 +1,82 @@
+import json
+import os
+
+import pandas as pd
+
+from benchmarks.fixtures import make_history, make_pool_listing
+from benchmarks.stub_server import StubIndexServer
+from uni_v3_kit import cli
+from uni_v3_kit.analyzer import MarketScanner
+from uni_v3_kit.cli import BatchRunner
+from uni_v3_kit.data_provider import DataProvider, SnapshotDirectoryProvider
+from uni_v3_kit.http_client import HttpClient
+from uni_v3_kit.pool_index import PoolIndex
+
+
+def _runner(tmp_path, jobs, data=None):
+    runner = BatchRunner({"output_dir": str(tmp_path / "out"), "format": "csv", "jobs": jobs})
+    if data is not None:
+        runner.data = data
+    return runner
+
+
+def test_candidates_match_scanner_selection(tmp_path):
+    pools = make_pool_listing(300, seed=2)
+    job = {"target_chains": ["arbitrum", "base"], "min_tvl": 10000, "selected_assets": [" weth ", "Otro"],
+           "custom_asset": "usdc ", "limit": 20}
+    runner = _runner(tmp_path, [])
+    runner.data.get_pools_history = lambda addresses, max_workers=16: [{} for _ in addresses]
+
+    addresses, _ = runner._candidates(job, pools)
+    expected = MarketScanner._select_candidates(PoolIndex(pools), job["target_chains"], job["min_tvl"],
+                                                job["selected_assets"], job["custom_asset"], 20)
+    assert addresses == expected and addresses
+
+
+def test_snapshot_downloads_the_listing_once(tmp_path):
+    pools = make_pool_listing(100, seed=3)
+    job = {"type": "snapshot", "name": "snap", "dir": str(tmp_path / "snap"), "target_chains": None, "limit": 5}
+    with StubIndexServer(pools, history_days=20) as server:
+        provider = DataProvider(http_client=HttpClient(retries=0), store=False, listing_ttl=0, timeout=2)
+        provider.base_url = server.url
+        manifest = _runner(tmp_path, [job], provider).run()
+        # Un listado + un historial por candidato
+        assert server.requests == 1 + 5
+
+    assert "error" not in manifest[0]
+    snapshot = SnapshotDirectoryProvider(job["dir"])
+    assert snapshot.get_all_pools() == pools
+    assert len(os.listdir(tmp_path / "snap" / "history")) == 5
+
+
+def test_backtest_job_passes_token_decimals(tmp_path):
+    address = "0xtick"
+    history = {"pairAddress": address, "history": make_history(address, 60)}
+    data = DataProvider(store=False)
+    data.get_pool_history = lambda a, timeout=None: history if a == address else {}
+
+    job = {"type": "backtest", "name": "ticks", "pools": [address], "grid": {"tick_exact": [True], "sim_days": [30]},
+           "token_decimals": {address: [18, 6]}}
+    manifest = _runner(tmp_path, [job, dict(job, name="sin-decimales", token_decimals=None)], data).run()
+
+    assert manifest[0]["rows"] > 0
+    # Sin decimales el job falla con un error explícito en vez de suponer (18, 18)
+    assert "token_decimals" in manifest[1]["error"]
+    with open(tmp_path / "out" / "manifest.json") as f:
+        assert [j["name"] for j in json.load(f)["jobs"]] == ["ticks", "sin-decimales"]
+
+
+def test_sweep_job_passes_token_decimals(tmp_path, monkeypatch):
+    calls = {}
+
+    class SweepStub:
+        def __init__(self, **kwargs):
+            pass
+
+        def run(self, pools, grid, **kwargs):
+            calls.update(kwargs)
+            return pd.DataFrame()
+
+    monkeypatch.setattr(cli, "ParameterSweep", SweepStub)
+    _runner(tmp_path, []).run_sweep({"pools": ["0xa"], "grid": {}, "token_decimals": {"0xa": [8, 18]}})
+    assert calls["token_decimals"] == {"0xa": (8, 18)}
@@ -0,0 +1,53 @@
+from uni_v3_kit.history_store import HistoryStore
+
+POOL = {"pairAddress": "0xabc", "history": [{"date": "20250101000000", "priceUsd": 1.0}]}
+
+
+def _age(store, address, seconds):
+    with store._lock:
+        store._conn.execute("UPDATE pools SET fetched_at = fetched_at - ? WHERE address = ?", (seconds, address))
+        store._conn.commit()
+
+
+def test_opening_the_store_purges_expired_pools(tmp_path):
+    path = str(tmp_path / "history.db")
+    store = HistoryStore(path, expire_after=3600)
+    store.save("0xabc", POOL)
+    _age(store, "0xabc", 7200)
+    store.close()
+
+    assert HistoryStore(path, expire_after=3600).get("0xabc") == {}
+
+
+def test_expire_runs_at_most_once_per_ttl(tmp_path, monkeypatch):
+    store = HistoryStore(str(tmp_path / "history.db"), ttl=3600)
+    runs = []
+    monkeypatch.setattr(store, "expire", lambda: runs.append(1) or 0)
+
+    for i in range(5):
+        store.save(f"0x{i}", POOL)
+    assert runs == []
+
+    store._last_expire -= 3600
+    store.save("0xdef", POOL)
+    assert runs == [1]
+
+
+def test_revised_snapshot_replaces_the_stored_one(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    older = {"date": "20241231160000", "priceUsd": 0.9, "apr": 10.0}
+    first = {"pairAddress": "0xabc", "history": [{"date": "20250101000000", "priceUsd": 1.0, "apr": 12.0}, older]}
+    assert store.save("0xabc", first) == 2
+
+    # Misma descarga: nada que escribir
+    assert store.save("0xabc", first) == 0
+
+    # La API revisa el snapshot más reciente (misma fecha, otro contenido) y publica uno nuevo
+    revised = {"date": "20250101000000", "priceUsd": 1.02, "apr": 15.5}
+    newest = {"date": "20250101080000", "priceUsd": 1.05, "apr": 14.0}
+    assert store.save("0xabc", {"pairAddress": "0xabc", "history": [newest, revised, older]}) == 2
+    assert store.get("0xabc")["history"] == [newest, revised, older]
+
+    # Una descarga que ya no incluye los snapshots antiguos no los borra
+    assert store.save("0xabc", {"pairAddress": "0xabc", "history": [newest]}) == 0
+    assert len(store.get("0xabc")["history"]) == 3
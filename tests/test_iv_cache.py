@@ -0,0 +1,84 @@
+import itertools
+
+from uni_v3_kit import iv_cache
+from uni_v3_kit.data_provider import DataProvider
+from uni_v3_kit.iv_cache import get_iv_cache
+
+_urls = itertools.count()
+
+
+class _Response:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+class FakeDvolClient:
+    """Cliente HTTP que responde a la consulta DVOL con un valor fijo (en %)."""
+
+    def __init__(self, dvol):
+        self.dvol = dvol
+        self.requests = 0
+
+    def get(self, url, params=None, headers=None, timeout=None, stream=False):
+        self.requests += 1
+        if self.dvol is None:
+            raise ConnectionError("Deribit caído")
+        return _Response({"result": {"data": [[0, 0, 0, 0, self.dvol]]}})
+
+
+def _provider(client, url=None):
+    provider = DataProvider(http_client=client, store=False, timeout=2)
+    # Una URL por test: la caché del proceso se indexa por endpoint
+    provider.dvol_url = url or f"http://dvol.test/{next(_urls)}"
+    return provider
+
+
+def test_providers_on_the_same_endpoint_share_the_cache():
+    first_client, second_client = FakeDvolClient(45.0), FakeDvolClient(45.0)
+    first = _provider(first_client)
+    second = _provider(second_client, first.dvol_url)
+
+    assert first.get_market_iv("BTC") == (0.45, False)
+    assert second.get_market_iv("BTC") == (0.45, False)
+    assert first_client.requests + second_client.requests == 1
+
+
+def test_refresh_uses_the_callers_fetcher():
+    first_client, second_client = FakeDvolClient(60.0), FakeDvolClient(80.0)
+    first = _provider(first_client)
+    second = _provider(second_client, first.dvol_url)
+    assert first.get_market_iv("ETH") == (0.60, False)
+
+    # El refresco va con el cliente del último lector, no con el del primer proveedor
+    second.get_market_iv("ETH")
+    reading = get_iv_cache(first.dvol_url).refresh("ETH")
+    assert reading.value == 0.80
+    assert second_client.requests == 1
+
+
+def test_failed_refresh_keeps_last_value_and_flags_it_stale():
+    client = FakeDvolClient(50.0)
+    provider = _provider(client)
+    assert provider.get_market_iv("ETH") == (0.50, False)
+
+    cache = get_iv_cache(provider.dvol_url)
+    cache.ttl = 0
+    client.dvol = None
+    cache.refresh("ETH")
+    assert provider.get_market_iv("ETH") == (0.50, True)
+
+
+def test_unavailable_iv_is_none_not_a_default():
+    provider = _provider(FakeDvolClient(None))
+    assert provider.get_market_iv("ETH") == (None, True)
+
+
+def test_registry_is_bounded():
+    caches = [get_iv_cache(f"http://bounded.test/{k}") for k in range(iv_cache.MAX_SHARED_CACHES + 3)]
+    assert len(iv_cache._shared_caches) <= iv_cache.MAX_SHARED_CACHES
+    # Las descartadas se paran (su hilo de refresco termina)
+    assert all(c._stop.is_set() for c in caches[:3])
+    assert get_iv_cache(f"http://bounded.test/{len(caches) - 1}") is caches[-1]
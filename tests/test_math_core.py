@@ -0,0 +1,100 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from uni_v3_kit.math_core import RollingVolatility, StreamingVolatility, V3Math
+
+# Sumas acumuladas frente a np.std directo: solo difiere el redondeo
+VOL_TOL = 1e-9
+
+
+def _prices(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    prices = 2500.0 * np.exp(np.cumsum(rng.normal(0.0, 0.03, n)))
+    # Huecos como los de la API: ceros, negativos y NaN se ignoran en el cálculo
+    prices[rng.choice(n, 25, replace=False)] = 0.0
+    prices[rng.choice(n, 10, replace=False)] = -1.0
+    prices[rng.choice(n, 10, replace=False)] = np.nan
+    return prices
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_rolling_volatility_matches_reference(seed):
+    prices = _prices(seed=seed)
+    rolling = RollingVolatility(prices)
+    windows = [(s, e) for s in range(0, len(prices), 17) for e in (s + 1, s + 4, s + 5, s + 6, s + 21, s + 90, len(prices) + 5)]
+
+    starts = np.array([s for s, _ in windows])
+    ends = np.array([e for _, e in windows])
+    many = rolling.annualized_many(starts, ends)
+    for k, (start, end) in enumerate(windows):
+        expected = V3Math.calculate_realized_volatility(prices[start:end])
+        assert rolling.annualized(start, end) == pytest.approx(expected, abs=VOL_TOL)
+        assert many[k] == pytest.approx(expected, abs=VOL_TOL)
+
+
+def test_rolling_volatility_short_or_empty_windows_use_default():
+    rolling = RollingVolatility([0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 1.0])
+    assert rolling.annualized(0, 7) == V3Math.calculate_realized_volatility([0.0] * 6 + [1.0]) == 0.80
+    assert rolling.annualized(3, 6) == 0.80
+
+
+@pytest.mark.parametrize("window", [5, 21, 60])
+def test_streaming_volatility_matches_reference(window):
+    prices = _prices(seed=window)
+    stream = StreamingVolatility(window)
+    for k, price in enumerate(prices):
+        stream.push(price)
+        expected = V3Math.calculate_realized_volatility(prices[max(0, k + 1 - window):k + 1])
+        assert stream.annualized() == pytest.approx(expected, abs=VOL_TOL)
+
+    # Serializado y restaurado sigue dando lo mismo
+    restored = StreamingVolatility.from_dict(json.loads(json.dumps(stream.to_dict())))
+    assert restored.annualized() == pytest.approx(stream.annualized(), abs=VOL_TOL)
+
+
+
+def _il_at_limit_simulated(width):
+    """Versión anterior por simulación: posición de 1000 USD en P=1 valorada en cada límite."""
+    try:
+        width = max(width, 0.001)
+        p_min, p_max = 1.0 - width, 1.0 + width
+        L = V3Math.get_liquidity_for_amount(1000.0, 1.0, p_min, p_max)
+        if L == 0: return 0.0
+        x0, y0 = V3Math.calculate_amounts(L, 1.0, math.sqrt(p_min), math.sqrt(p_max))
+        x_min, y_min = V3Math.calculate_amounts(L, math.sqrt(p_min), math.sqrt(p_min), math.sqrt(p_max))
+        x_max, y_max = V3Math.calculate_amounts(L, math.sqrt(p_max), math.sqrt(p_min), math.sqrt(p_max))
+        hodl_min, hodl_max = x0 * p_min + y0, x0 * p_max + y0
+        il_min = (x_min * p_min + y_min - hodl_min) / hodl_min if hodl_min > 0 else 0
+        il_max = (x_max * p_max + y_max - hodl_max) / hodl_max if hodl_max > 0 else 0
+        return max(abs(il_min), abs(il_max))
+    except Exception:
+        return 0.0
+
+
+WIDTHS = [0.0, 0.0005, 0.001, 0.01, 0.05, 0.2, 0.5, 0.9, 0.999, 1.0, 1.5, 2.5]
+
+
+def test_closed_form_il_matches_simulation():
+    for width in WIDTHS:
+        expected = _il_at_limit_simulated(width)
+        assert V3Math.calculate_v3_il_at_limit(width) == pytest.approx(expected, rel=1e-12, abs=1e-14)
+    np.testing.assert_allclose(V3Math.calculate_v3_il_at_limit(np.array(WIDTHS)),
+                               [V3Math.calculate_v3_il_at_limit(w) for w in WIDTHS], rtol=1e-12)
+
+
+def test_array_amounts_and_liquidity_match_scalar():
+    rng = np.random.default_rng(7)
+    sqrt_p = np.sqrt(rng.uniform(0.5, 2.0, 200))
+    L = rng.uniform(1.0, 1e6, 200)
+    ax, ay = V3Math.calculate_amounts(L, sqrt_p, np.sqrt(0.9), np.sqrt(1.1))
+    for k in range(len(L)):
+        x, y = V3Math.calculate_amounts(float(L[k]), float(sqrt_p[k]), np.sqrt(0.9), np.sqrt(1.1))
+        assert (ax[k], ay[k]) == pytest.approx((x, y), rel=1e-12)
+
+    prices = sqrt_p ** 2
+    liquidity = V3Math.get_liquidity_for_amount(1000.0, prices, 0.8, 1.25)
+    for k, price in enumerate(prices):
+        assert liquidity[k] == pytest.approx(V3Math.get_liquidity_for_amount(1000.0, float(price), 0.8, 1.25), rel=1e-12)
@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from uni_v3_kit.memo import ResultCache
+
+
+def _frame(rows):
+    return pd.DataFrame({"Valor": np.arange(rows, dtype=float), "Pool": ["0xabc"] * rows})
+
+
+def test_memory_tier_is_bounded_by_bytes():
+    one = _frame(1000).memory_usage(deep=True).sum()
+    cache = ResultCache(max_entries=1000, max_bytes=int(one * 3.5))
+    for i in range(10):
+        cache.put(f"k{i}", _frame(1000))
+
+    assert len(cache) == 3
+    assert cache.memory_bytes <= cache.max_bytes
+    # LRU: sobreviven las últimas
+    assert cache.get("k9")[0] and not cache.get("k0")[0]
+
+
+def test_oversized_result_skips_memory_but_stays_on_disk(tmp_path):
+    cache = ResultCache(max_bytes=1024, disk_path=str(tmp_path / "memo.db"))
+    cache.put("big", _frame(10_000))
+    assert len(cache) == 0
+
+    found, value = cache.get("big")
+    assert found and len(value) == 10_000
+    assert cache.memory_bytes == 0
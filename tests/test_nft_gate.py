@@ -0,0 +1,161 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("web3")
+from eth_abi import decode, encode
+
+from uni_v3_kit import nft_gate
+
+BALANCE_OF = "70a08231"
+AGGREGATE3 = "82ad56cb"
+
+
+class RpcStub:
+    """Nodo JSON-RPC mínimo: eth_getCode de Multicall3 y eth_call de balanceOf / aggregate3."""
+
+    def __init__(self, balances, multicall=True, fail_multicall=False):
+        self.balances = {k.lower(): v for k, v in balances.items()}
+        self.multicall = multicall
+        self.fail_multicall = fail_multicall
+        self.calls = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                payload = json.dumps(stub.handle(body)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, kind):
+        return sum(1 for c in self.calls if c == kind)
+
+    def _balance_of(self, calldata):
+        owner = "0x" + calldata[-40:]
+        return self.balances.get(owner.lower(), 0)
+
+    def handle(self, request):
+        method, params = request["method"], request.get("params", [])
+        reply = {"jsonrpc": "2.0", "id": request["id"]}
+        if method == "eth_chainId":
+            reply["result"] = "0xa4b1"
+        elif method == "eth_getCode":
+            self.calls.append("getCode")
+            is_multicall = params[0].lower() == nft_gate.MULTICALL3_ADDRESS.lower()
+            reply["result"] = "0x6080" if is_multicall and self.multicall else "0x"
+        elif method == "eth_call":
+            to = params[0]["to"].lower()
+            data = params[0].get("data") or params[0].get("input")
+            data = data[2:]
+            if to == nft_gate.MULTICALL3_ADDRESS.lower() and data.startswith(AGGREGATE3):
+                self.calls.append("aggregate3")
+                if self.fail_multicall or not self.multicall:
+                    reply["error"] = {"code": -32000, "message": "execution reverted"}
+                    return reply
+                (calls,) = decode(["(address,bool,bytes)[]"], bytes.fromhex(data[8:]))
+                results = [(True, self._balance_of(calldata.hex()).to_bytes(32, "big")) for _, _, calldata in calls]
+                reply["result"] = "0x" + encode(["(bool,bytes)[]"], [results]).hex()
+            elif to == nft_gate.NFT_CONTRACT_ADDRESS.lower() and data.startswith(BALANCE_OF):
+                self.calls.append("balanceOf")
+                reply["result"] = "0x" + self._balance_of(data).to_bytes(32, "big").hex()
+            else:
+                reply["error"] = {"code": -32000, "message": "execution reverted"}
+        else:
+            reply["error"] = {"code": -32601, "message": f"method not found: {method}"}
+        return reply
+
+
+HOLDER = "0x" + "11" * 20
+NON_HOLDER = "0x" + "22" * 20
+OTHER_HOLDER = "0x" + "33" * 20
+BALANCES = {HOLDER: 2, OTHER_HOLDER: 1}
+
+
+@pytest.fixture
+def rpc(monkeypatch):
+    stubs = []
+
+    def start(**kwargs):
+        stub = RpcStub(BALANCES, **kwargs)
+        stubs.append(stub)
+        monkeypatch.setattr(nft_gate, "ARBITRUM_RPC", stub.url)
+        nft_gate.reset_cache()
+        return stub
+
+    yield start
+    nft_gate.reset_cache()
+    for stub in stubs:
+        stub.close()
+
+
+def test_batch_uses_one_multicall(rpc):
+    stub = rpc()
+    balances = nft_gate.get_nft_balances([HOLDER, NON_HOLDER, OTHER_HOLDER])
+
+    assert balances == {HOLDER: 2, NON_HOLDER: 0, OTHER_HOLDER: 1}
+    assert stub.count("aggregate3") == 1
+    assert stub.count("balanceOf") == 0
+
+
+def test_ttl_cache_skips_rpc(rpc, monkeypatch):
+    stub = rpc()
+    nft_gate.get_nft_balances([HOLDER, NON_HOLDER])
+    assert nft_gate.get_nft_balances([HOLDER, NON_HOLDER]) == {HOLDER: 2, NON_HOLDER: 0}
+    assert stub.count("aggregate3") == 1
+
+    # Los no-holders caducan antes: solo se vuelve a consultar esa dirección
+    monkeypatch.setattr(nft_gate, "NON_HOLDER_CACHE_TTL", 0)
+    assert nft_gate.check_access(HOLDER)[0] is True
+    nft_gate.get_nft_balances([HOLDER, NON_HOLDER])
+    assert stub.count("aggregate3") == 2
+    assert stub.count("balanceOf") == 0
+
+
+def test_balance_cache_is_bounded_lru(rpc, monkeypatch):
+    stub = rpc()
+    monkeypatch.setattr(nft_gate, "BALANCE_CACHE_MAX_ENTRIES", 2)
+    nft_gate.get_nft_balances([HOLDER, NON_HOLDER])
+    nft_gate.get_nft_balances([HOLDER])  # HOLDER pasa a ser el más reciente
+    nft_gate.get_nft_balances([OTHER_HOLDER])
+
+    assert len(nft_gate._balance_cache) == 2
+    assert NON_HOLDER.lower() not in nft_gate._balance_cache
+    nft_gate.get_nft_balances([HOLDER, OTHER_HOLDER])
+    assert stub.count("aggregate3") == 2
+
+
+def test_serial_fallback_without_multicall(rpc):
+    stub = rpc(multicall=False)
+    assert nft_gate.get_nft_balances([HOLDER, NON_HOLDER]) == {HOLDER: 2, NON_HOLDER: 0}
+    nft_gate.get_nft_balances([OTHER_HOLDER])
+
+    # eth_getCode se consulta una sola vez y nunca se intenta aggregate3
+    assert stub.count("getCode") == 1
+    assert stub.count("aggregate3") == 0
+    assert stub.count("balanceOf") == 3
+
+
+def test_multicall_error_does_not_fan_out(rpc):
+    stub = rpc(fail_multicall=True)
+    results = nft_gate.check_access_batch([HOLDER, NON_HOLDER])
+
+    assert {addr: access for addr, (access, _) in results.items()} == {HOLDER: False, NON_HOLDER: False}
+    assert stub.count("aggregate3") == 1
+    assert stub.count("balanceOf") == 0
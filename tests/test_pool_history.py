@@ -0,0 +1,85 @@
+import math
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from benchmarks.fixtures import make_history
+from uni_v3_kit.pool_history import PoolHistory, parse_snapshot_dates
+
+
+def _messy_history():
+    """Historial de la API (más reciente primero) con valores faltantes, texto y ceros."""
+    history = make_history("0xmessy", 20)
+    history[3]["priceNative"] = None
+    history[4]["priceNative"] = "0"
+    history[4]["priceUsd"] = "1.5"
+    history[5]["priceNative"] = -2.0
+    history[5]["priceUsd"] = None
+    history[6]["apr"] = "n/a"
+    history[7].pop("Liquidity", None)
+    history[8]["priceUsd"] = "3.25"
+    return history
+
+
+def _float(value):
+    try:
+        return float(value) if value is not None else math.nan
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _reference_price(snap):
+    # Regla del analyzer/backtester anteriores: priceNative > 0, si no priceUsd > 0
+    native, usd = _float(snap.get("priceNative")), _float(snap.get("priceUsd"))
+    if native > 0: return native
+    if usd > 0: return usd
+    return math.nan
+
+
+def test_columns_match_records():
+    history = _messy_history()
+    parsed = PoolHistory.from_records(history)
+    chronological = list(reversed(history))
+
+    assert len(parsed) == len(history)
+    assert [str(d) for d in parsed.date] == [s["date"] for s in chronological]
+    for column, key in (("price_native", "priceNative"), ("price_usd", "priceUsd"), ("apr", "apr"), ("liquidity", "Liquidity")):
+        np.testing.assert_array_equal(getattr(parsed, column), [_float(s.get(key)) for s in chronological])
+    np.testing.assert_array_equal(parsed.price, [_reference_price(s) for s in chronological])
+
+
+def test_unordered_records_are_sorted_by_date():
+    history = make_history("0xorder", 10)
+    shuffled = [history[k] for k in np.random.default_rng(0).permutation(len(history))]
+    parsed = PoolHistory.from_records(shuffled)
+    assert list(parsed.date) == sorted(int(s["date"]) for s in history)
+
+
+def test_round_trip_and_newest():
+    history = make_history("0xround", 15)
+    parsed = PoolHistory.from_pool({"pairAddress": "0xround", "history": history})
+    assert parsed.meta == {"pairAddress": "0xround"}
+    assert parsed.to_records() == [{k: (float(v) if k != "date" else v) for k, v in s.items()} for s in history]
+
+    # newest(n) equivale a history[:n] de la API
+    newest = parsed.newest(9)
+    expected = PoolHistory.from_records(history[:9])
+    np.testing.assert_array_equal(newest.date, expected.date)
+    np.testing.assert_array_equal(newest.price, expected.price)
+    assert parsed.newest(100) is parsed
+
+
+def test_dates_match_strptime():
+    raw = ["20240229080000", "20250101000000", "19991231235959"]
+    assert list(parse_snapshot_dates(np.array([int(d) for d in raw]))) == \
+        [np.datetime64(datetime.strptime(d, "%Y%m%d%H%M%S")) for d in raw]
+    # Fechas inválidas: se parsean una a una y se conserva el valor original
+    assert parse_snapshot_dates(["20240230000000", "20240101000000"]) == ["20240230000000", datetime(2024, 1, 1)]
+
+
+def test_slicing_requires_slices():
+    parsed = PoolHistory.from_records(make_history("0xslice", 5))
+    assert len(parsed[2:]) == len(parsed) - 2
+    with pytest.raises(TypeError):
+        parsed[0]
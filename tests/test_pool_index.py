@@ -0,0 +1,58 @@
+import itertools
+
+import pytest
+
+from benchmarks.fixtures import make_pool_listing
+from uni_v3_kit.pool_index import PoolIndex
+
+
+def naive_select(raw_pools, target_chains, min_tvl, assets, limit):
+    """Filtro lineal anterior de MarketScanner._select_candidates (sobre la lista completa)."""
+    candidates = []
+    for p in raw_pools:
+        if target_chains and p.get('ChainId') not in target_chains: continue
+        try: tvl = float(p.get('Liquidity', 0))
+        except: tvl = 0
+        if tvl < min_tvl: continue
+        if assets:
+            base = str(p.get('BaseToken', '')).upper()
+            quote = str(p.get('QuoteToken', '')).upper()
+            if not any(a in base or a in quote for a in assets): continue
+        candidates.append(p)
+    candidates = sorted(candidates, key=lambda x: float(x.get('Volume', 0)), reverse=True)[:limit]
+    return [p.get('pairAddress') or p.get('_id') for p in candidates]
+
+
+@pytest.fixture(scope="module")
+def listing():
+    pools = make_pool_listing(3000, seed=5)
+    # Empates de volumen (el orden estable debe coincidir), TVL no numérico y símbolos en minúsculas
+    for p in pools[::7]:
+        p["Volume"] = "1000.0"
+    pools[1]["Liquidity"] = "n/a"
+    pools[2]["Liquidity"] = None
+    pools[3]["BaseToken"] = "weth.e"
+    pools[4]["pairAddress"] = None
+    return pools
+
+
+QUERIES = list(itertools.product(
+    [None, ["arbitrum"], ["base", "optimism", "desconocida"]],
+    [0, 1e5, 1e7],
+    [None, ["WETH"], ["BTC", "USD"], ["NOEXISTE"]],
+    [1, 150, None],
+))
+
+
+@pytest.mark.parametrize("chains,min_tvl,assets,limit", QUERIES)
+def test_select_matches_naive_filter(listing, chains, min_tvl, assets, limit):
+    expected = naive_select(listing, chains, min_tvl, assets, limit)
+    assert PoolIndex(listing).select(chains, min_tvl, assets, limit) == expected
+    assert PoolIndex.from_stream(iter(listing)).select(chains, min_tvl, assets, limit) == expected
+
+
+def test_streamed_index_keeps_indexed_fields(listing):
+    index = PoolIndex.from_stream(iter(listing))
+    assert len(index) == len(listing)
+    assert index.pools[0]["pairAddress"] == listing[0]["pairAddress"]
+    assert index.pools[0]["ChainId"] == listing[0]["ChainId"]
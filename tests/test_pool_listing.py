@@ -0,0 +1,44 @@
+from benchmarks.fixtures import make_pool_listing
+from benchmarks.stub_server import StubIndexServer
+from uni_v3_kit.data_provider import DataProvider
+from uni_v3_kit.http_client import HttpClient
+
+
+def _provider(url):
+    provider = DataProvider(http_client=HttpClient(retries=0), store=False, listing_ttl=0, timeout=1)
+    provider.base_url = url
+    return provider
+
+
+def test_revalidation_reuses_index_on_304():
+    pools = make_pool_listing(50)
+    with StubIndexServer(pools) as server:
+        provider = _provider(server.url)
+        first = provider.get_pool_index()
+        second = provider.get_pool_index()
+
+    assert len(first) == 50
+    assert second is first
+    assert server.not_modified == 1
+
+
+def test_failed_revalidation_serves_stale_index():
+    pools = make_pool_listing(50)
+    server = StubIndexServer(pools).start()
+    provider = _provider(server.url)
+    first = provider.get_pool_index()
+    server.stop()
+
+    # Listado caído: se sigue usando el índice anterior en vez de un universo vacío
+    assert provider.get_pool_index() is first
+
+
+def test_all_pools_is_decoded_from_the_stream(monkeypatch):
+    pools = make_pool_listing(200)
+    with StubIndexServer(pools) as server:
+        provider = _provider(server.url)
+        calls = []
+        original = provider.http.get
+        monkeypatch.setattr(provider.http, "get", lambda *a, **kw: calls.append(kw.get("stream")) or original(*a, **kw))
+        assert provider.get_all_pools() == pools
+    assert calls == [True]
@@ -0,0 +1,40 @@
+import numpy as np
+
+from benchmarks.fixtures import make_history
+from uni_v3_kit.portfolio import PortfolioBacktester
+
+
+def _positions(auto):
+    # Historial más reciente primero: la segunda posición deja de tener snapshots 10 periodos antes
+    return [
+        {"history": make_history("0xa", 90), "name": "a", "auto_rebalance": auto, "sd_multiplier": 0.3},
+        {"history": make_history("0xb", 90)[10:], "name": "b", "auto_rebalance": auto, "sd_multiplier": 0.3},
+    ]
+
+
+def test_stale_pool_is_held_and_reported():
+    positions = _positions(False)
+    result = PortfolioBacktester().run(positions, sim_days=30)
+    assert result["metadata"]["stale_periods"] == {"b": 10}
+    assert len(result["portfolio"]) == 90
+
+    # El pool parado conserva su último valor y no cobra fees en los periodos sin datos
+    value, fees = result["value"]["b"].to_numpy(), result["fees"]["b"].to_numpy()
+    assert np.all(value[-10:] == value[-11])
+    assert np.all(fees[-10:] == fees[-11])
+
+    # La otra posición no se recorta: mismo resultado que simulada sola
+    alone = PortfolioBacktester().run(positions[:1], sim_days=30)
+    assert list(alone["value"].index) == list(result["value"].index)
+    np.testing.assert_allclose(result["value"]["a"].to_numpy(), alone["value"]["a"].to_numpy())
+
+
+def test_rebalanced_positions_restart_in_range():
+    result = PortfolioBacktester().run(_positions(True), sim_days=60)
+    summary = result["summary"].set_index("Posición")
+    assert (summary["Rebalanceos"] > 0).all()
+
+    # Tras cada salida de rango se rebalancea en ese mismo periodo: nunca dos periodos seguidos fuera
+    in_range = result["in_range"].to_numpy()
+    out = ~in_range
+    assert not np.any(out[1:] & out[:-1])
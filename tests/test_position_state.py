@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from benchmarks.fixtures import make_history
+from uni_v3_kit.backtester import Backtester
+from uni_v3_kit.position_state import PositionState, PositionStore
+
+SIM_DAYS, VOL_DAYS = 40, 7
+FIELDS = ("Price", "Range Min", "Range Max", "Fees Acum", "Valor Principal", "Valor Total", "HODL Value")
+
+
+def _history(address):
+    # Exactamente (sim + vol) días: el incremental y la simulación completa entran en el mismo snapshot
+    return make_history(address, SIM_DAYS + VOL_DAYS)
+
+
+@pytest.mark.parametrize("auto", [False, True])
+@pytest.mark.parametrize("address", ["0xa", "0xb"])
+def test_incremental_store_matches_full_replay(tmp_path, address, auto):
+    history = _history(address)
+    new_snapshots = history[:30][::-1]  # los 30 más recientes, en orden cronológico
+
+    store = PositionStore(str(tmp_path / "positions.db"))
+    opened = PositionState.from_history(history[30:], 1000.0, 0.5, sim_days=SIM_DAYS, vol_days=VOL_DAYS,
+                                        auto_rebalance=auto, pool=address)
+    store.save_many({"manual": opened, "batch": opened})
+    rows = []
+    for snap in new_snapshots:
+        # Un snapshot por ejecución: el estado pasa siempre por SQLite/JSON
+        state = store.load("manual")
+        rows.append(state.step(snap))
+        store.save("manual", state)
+    store.advance_pool(address, new_snapshots)  # "batch": todos de una vez (y "manual" ya no cambia)
+
+    df, _, _, meta = Backtester(cache=False).run_simulation(history, 1000.0, 0.5, sim_days=SIM_DAYS, vol_days=VOL_DAYS,
+                                                             auto_rebalance=auto, engine="loop")
+    expected = df.iloc[-len(new_snapshots):]
+    for row, (_, full) in zip(rows, expected.iterrows()):
+        assert row["Date"] == full["Date"]
+        assert row["In Range"] == bool(full["In Range"])
+        for field in FIELDS:
+            assert row[field] == pytest.approx(float(full[field]), rel=1e-12)
+
+    resumed, batch = store.load("manual"), store.load("batch")
+    assert resumed.to_dict() == batch.to_dict()
+    assert resumed.rebalances == meta["rebalances"]
+    assert resumed.initial_volatility == pytest.approx(float(meta["initial_volatility"]), rel=1e-12)
+
+
+def test_replayed_snapshots_are_ignored():
+    history = _history("0xc")
+    state = PositionState.from_history(history, 1000.0, 1.0, sim_days=SIM_DAYS, vol_days=VOL_DAYS)
+    before = json.dumps(state.to_dict())
+    for snap in history[:5]:
+        assert state.step(snap) is None
+    assert json.dumps(state.to_dict()) == before
+
+
+def test_state_round_trips_through_json():
+    state = PositionState.from_history(_history("0xd"), 1000.0, 1.0, sim_days=SIM_DAYS, vol_days=VOL_DAYS, auto_rebalance=True)
+    restored = PositionState.from_dict(json.loads(json.dumps(state.to_dict())))
+    assert restored.to_dict() == state.to_dict()
+    assert restored.volatility.annualized() == pytest.approx(state.volatility.annualized(), rel=1e-12)
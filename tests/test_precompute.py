@@ -0,0 +1,22 @@
+import subprocess
+import sys
+
+import pandas as pd
+
+from uni_v3_kit.precompute import ResultsStore
+
+
+def test_results_store_creates_its_folder(tmp_path):
+    store = ResultsStore(str(tmp_path / "nuevo" / "scan_results.db"))
+    df = pd.DataFrame({"Address": ["0xa", "0xb"], "TVL": [1.5, 2.0]})
+    store.save({"days_window": 7}, df, name="preset")
+
+    loaded, computed_at = store.load({"days_window": 7})
+    pd.testing.assert_frame_equal(loaded, df)
+    assert computed_at is not None
+
+
+def test_import_does_not_load_pandas():
+    code = "import sys, uni_v3_kit.precompute; print('pandas' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+from benchmarks.fixtures import make_pool_listing
+from benchmarks.stub_server import StubIndexServer
+from uni_v3_kit.analyzer import MarketScanner
+from uni_v3_kit.data_provider import DataProvider
+from uni_v3_kit.http_client import HttpClient
+
+N_POOLS = 24
+LATENCY = 0.05
+SLOW_DELAY = 5.0
+TIMEOUT = 0.5
+SCAN_ARGS = (None, 0, 7, 1.0, 0, None)
+
+
+@pytest.fixture(scope="module")
+def pools():
+    return make_pool_listing(N_POOLS, seed=1)
+
+
+def _scanner(server):
+    # Cliente con la configuración por defecto (reintentos, backoff, AIMD) y sin almacén
+    provider = DataProvider(http_client=HttpClient(), store=False, listing_ttl=0)
+    provider.base_url = server.url
+    return MarketScanner(provider, cache=False)
+
+
+def _timed_scan(scanner, workers):
+    started = time.perf_counter()
+    df = scanner.scan(*SCAN_ARGS, max_workers=workers, timeout=TIMEOUT)
+    return df, time.perf_counter() - started
+
+
+def test_history_batch_keeps_candidate_order(pools):
+    with StubIndexServer(pools, history_days=40, latency=LATENCY) as server:
+        provider = _scanner(server).data
+        addresses = [p["pairAddress"] for p in reversed(pools)]
+        for workers in (1, 8):
+            details = provider.get_pools_history(addresses, max_workers=workers, timeout=TIMEOUT)
+            assert [d["pairAddress"] for d in details] == addresses
+
+
+def test_parallel_scan_matches_serial_and_is_faster(pools):
+    with StubIndexServer(pools, history_days=40, latency=LATENCY) as server:
+        scanner = _scanner(server)
+        serial, serial_time = _timed_scan(scanner, 1)
+        parallel, parallel_time = _timed_scan(scanner, 8)
+
+    assert len(serial) == N_POOLS
+    assert list(parallel["Address"]) == list(serial["Address"])
+    assert parallel_time < serial_time / 2
+
+
+def test_slow_endpoint_times_out_into_skipped_pool(pools):
+    slow_address = pools[3]["pairAddress"]
+    with StubIndexServer(pools, history_days=40, slow={slow_address: SLOW_DELAY}) as server:
+        scanner = _scanner(server)
+        limiter = scanner.data.http.limiter_for(server.url)
+        initial_limit = limiter.limit
+        for workers in (1, 8):
+            df, elapsed = _timed_scan(scanner, workers)
+            # El timeout es el plazo total del pool: los reintentos del cliente no lo multiplican
+            assert elapsed < 3 * TIMEOUT
+            assert slow_address not in set(df["Address"])
+            assert len(df) == N_POOLS - 1
+        # Un timeout no es pushback del servidor: el límite de concurrencia del host no baja
+        assert limiter.limit >= initial_limit
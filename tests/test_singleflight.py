@@ -0,0 +1,98 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from uni_v3_kit.singleflight import SingleFlight
+
+N_CALLERS = 8
+
+
+def _run_concurrently(flight, key, fn, timeout=None):
+    """Lanza N_CALLERS llamadas a flight.do; devuelve los futures cuando todas han entrado."""
+    executor = ThreadPoolExecutor(max_workers=N_CALLERS)
+    futures = [executor.submit(flight.do, key, fn, timeout) for _ in range(N_CALLERS)]
+    executor.shutdown(wait=False)
+    return futures
+
+
+def _wait_followers(flight, started, deadline=2.0):
+    # El líder ya está dentro de fn; damos tiempo a que el resto se agrupe
+    assert started.wait(deadline)
+    time.sleep(0.3)
+    assert flight.in_flight() == 1
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test")
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"pool": "shared"}
+
+    futures = _run_concurrently(flight, "pool", fetch)
+    _wait_followers(flight, started)
+    release.set()
+    results = [f.result(5) for f in futures]
+
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    assert flight.in_flight() == 0
+
+
+def test_exception_reaches_every_caller():
+    flight = SingleFlight("test")
+    started, release = threading.Event(), threading.Event()
+
+    def fetch():
+        started.set()
+        release.wait(5)
+        raise ValueError("upstream caído")
+
+    futures = _run_concurrently(flight, "pool", fetch)
+    _wait_followers(flight, started)
+    release.set()
+    for future in futures:
+        with pytest.raises(ValueError, match="upstream caído"):
+            future.result(5)
+    assert flight.in_flight() == 0
+
+
+def test_key_removed_after_call():
+    flight = SingleFlight("test")
+    calls = []
+    fetch = lambda: calls.append(1) or len(calls)
+
+    assert flight.do("pool", fetch) == 1
+    assert flight.do("pool", fetch) == 2
+    assert flight.in_flight() == 0
+
+
+def test_follower_gives_up_after_timeout():
+    flight = SingleFlight("test")
+    started, release = threading.Event(), threading.Event()
+
+    def fetch():
+        started.set()
+        release.wait(5)
+        return "late"
+
+    leader = ThreadPoolExecutor(max_workers=1)
+    leader_future = leader.submit(flight.do, "pool", fetch)
+    assert started.wait(2)
+
+    t0 = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        flight.do("pool", fetch, timeout=0.2)
+    assert time.perf_counter() - t0 < 2
+
+    # La llamada en curso no se ve afectada
+    release.set()
+    assert leader_future.result(5) == "late"
+    leader.shutdown()
+    assert flight.in_flight() == 0
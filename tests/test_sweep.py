@@ -0,0 +1,23 @@
+import pytest
+
+from benchmarks.fixtures import make_history
+from uni_v3_kit.sweep import ParameterSweep
+
+POOLS = {"0xa": make_history("0xa", 60), "0xb": make_history("0xb", 60)}
+
+
+def test_tick_exact_requires_token_decimals():
+    sweep = ParameterSweep(max_workers=1)
+    with pytest.raises(ValueError, match="token_decimals"):
+        sweep.run(POOLS, {"tick_exact": [False, True]})
+
+    with pytest.raises(ValueError, match="0xb"):
+        sweep.run(POOLS, {"tick_exact": True}, token_decimals={"0xa": (18, 6)})
+
+
+def test_tick_exact_sweep_with_decimals():
+    sweep = ParameterSweep(max_workers=1)
+    df = sweep.run(POOLS, {"tick_exact": [False, True], "sd_multiplier": [1.0, 2.0]},
+                   token_decimals={"0xa": (18, 6), "0xb": (8, 18)})
+    assert len(df) == 8
+    assert df["Valor Final"].notna().all()
@@ -0,0 +1,92 @@
+import math
+
+import pytest
+
+from uni_v3_kit.math_core import V3Math
+from uni_v3_kit.ticks import (MAX_SQRT_RATIO, MAX_TICK, MAX_UINT128, MIN_SQRT_RATIO, MIN_TICK, Q96, TickGrid,
+                              get_amount0_delta, get_amount1_delta, get_amounts_for_mint, get_liquidity_for_amounts,
+                              get_sqrt_ratio_at_tick, get_tick_grid)
+
+
+def encode_price_sqrt(reserve1, reserve0):
+    """encodePriceSqrt de los tests de Uniswap: floor(sqrt(reserve1 / reserve0) * 2^96)."""
+    return math.isqrt(reserve1 * 2 ** 192 // reserve0)
+
+
+# Valores de los tests de TickMath del contrato (v3-core)
+@pytest.mark.parametrize("tick,expected", [
+    (0, Q96),
+    (1, 79232123823359799118286999568),
+    (-1, 79224201403219477170569942574),
+    (MIN_TICK, MIN_SQRT_RATIO),
+    (MIN_TICK + 1, 4295343490),
+    (MAX_TICK, MAX_SQRT_RATIO),
+    (MAX_TICK - 1, 1461373636630004318706518188784493106690254656249),
+])
+def test_sqrt_ratio_at_tick_matches_contract(tick, expected):
+    assert get_sqrt_ratio_at_tick(tick) == expected
+
+
+def test_sqrt_ratio_rejects_out_of_range_ticks():
+    for tick in (MIN_TICK - 1, MAX_TICK + 1):
+        with pytest.raises(ValueError):
+            get_sqrt_ratio_at_tick(tick)
+
+
+def test_amount_deltas_match_contract():
+    # SqrtPriceMath: 1e18 de liquidez entre precio 1 y 1.21
+    sqrt_a, sqrt_b = encode_price_sqrt(1, 1), encode_price_sqrt(121, 100)
+    assert get_amount0_delta(sqrt_a, sqrt_b, 10 ** 18, True) == 90909090909090910
+    assert get_amount0_delta(sqrt_a, sqrt_b, 10 ** 18, False) == 90909090909090909
+    assert get_amount1_delta(sqrt_a, sqrt_b, 10 ** 18, True) == 100000000000000000
+    assert get_amount1_delta(sqrt_a, sqrt_b, 10 ** 18, False) == 99999999999999999
+
+
+@pytest.mark.parametrize("price,expected", [((1, 1), 2148), ((99, 110), 1048), ((111, 100), 2097)])
+def test_liquidity_for_amounts_matches_contract(price, expected):
+    # LiquidityAmounts (v3-periphery): rango [100/110, 110/100], 100 token0 y 200 token1
+    sqrt_a, sqrt_b = encode_price_sqrt(100, 110), encode_price_sqrt(110, 100)
+    assert get_liquidity_for_amounts(encode_price_sqrt(*price), sqrt_a, sqrt_b, 100, 200) == expected
+
+
+@pytest.mark.parametrize("tick_lower,tick_upper,tick_price", [(-600, 600, 0), (-600, 600, -900), (-600, 600, 900),
+                                                               (-60, 60000, 1234)])
+def test_mint_round_trip(tick_lower, tick_upper, tick_price):
+    sqrt_a, sqrt_b = get_sqrt_ratio_at_tick(tick_lower), get_sqrt_ratio_at_tick(tick_upper)
+    sqrt_p = get_sqrt_ratio_at_tick(tick_price)
+    amount0, amount1 = 10 ** 21, 3 * 10 ** 21
+
+    liquidity = get_liquidity_for_amounts(sqrt_p, sqrt_a, sqrt_b, amount0, amount1)
+    owed0, owed1 = get_amounts_for_mint(sqrt_p, sqrt_a, sqrt_b, liquidity)
+    # El mint nunca pide más de lo aportado, y una unidad más de liquidez ya no cabe
+    assert owed0 <= amount0 and owed1 <= amount1
+    more0, more1 = get_amounts_for_mint(sqrt_p, sqrt_a, sqrt_b, liquidity + 1)
+    assert more0 > amount0 or more1 > amount1
+
+
+def test_liquidity_overflow_reverts_like_the_contract():
+    sqrt_a, sqrt_b = get_sqrt_ratio_at_tick(-1), get_sqrt_ratio_at_tick(1)
+    with pytest.raises(ValueError, match="uint128"):
+        get_liquidity_for_amounts(get_sqrt_ratio_at_tick(0), sqrt_a, sqrt_b, MAX_UINT128, MAX_UINT128)
+
+
+def test_grid_requires_token_decimals():
+    with pytest.raises(TypeError):
+        TickGrid(3000)
+    with pytest.raises(TypeError):
+        get_tick_grid(3000)
+
+
+def test_tick_position_close_to_float_math():
+    # WETH/USDC: 18 y 6 decimales, precio humano 2500 USDC por WETH
+    grid = get_tick_grid(500, (18, 6))
+    tick_lower, tick_upper = grid.snap_range(2000.0, 3000.0)
+    assert grid.tick_price(tick_lower) <= 2000.0 < grid.tick_price(tick_lower + grid.spacing)
+    assert grid.tick_price(tick_upper - grid.spacing) < 3000.0 <= grid.tick_price(tick_upper)
+
+    _, tokens0, tokens1 = grid.position_for_usd(10_000.0, 2500.0, 2500.0, tick_lower, tick_upper)
+    assert tokens0 * 2500.0 + tokens1 == pytest.approx(10_000.0, rel=1e-6)
+
+    x, y = V3Math.calculate_amounts(1.0, math.sqrt(2500.0), math.sqrt(grid.tick_price(tick_lower)),
+                                    math.sqrt(grid.tick_price(tick_upper)))
+    assert tokens1 / tokens0 == pytest.approx(y / x, rel=1e-6)
@@ -1 +1,54 @@
+"""
+uni_v3_kit: análisis y backtesting de posiciones de liquidez en Uniswap V3.
 
+Las clases principales se exportan de forma diferida (PEP 562): `import uni_v3_kit` no
+carga NumPy, pandas, requests ni web3; cada submódulo se importa la primera vez que se
+usa uno de sus nombres. `from uni_v3_kit import V3Math` solo necesita NumPy.
+"""
+import importlib
+
+# nombre exportado -> submódulo que lo define
+_EXPORTS = {
+    "V3Math": "math_core",
+    "RollingVolatility": "math_core",
+    "StreamingVolatility": "math_core",
+    "PoolHistory": "pool_history",
+    "PoolIndex": "pool_index",
+    "DataProvider": "data_provider",
+    "SnapshotDirectoryProvider": "data_provider",
+    "HistoryStore": "history_store",
+    "HttpClient": "http_client",
+    "get_shared_client": "http_client",
+    "MarketScanner": "analyzer",
+    "Backtester": "backtester",
+    "PortfolioBacktester": "portfolio",
+    "ParameterSweep": "sweep",
+    "RangeSurvivalSimulator": "monte_carlo",
+    "SnapshotArchive": "archive",
+    "ArchiveDataProvider": "archive",
+    "PositionState": "position_state",
+    "PositionStore": "position_state",
+    "TickGrid": "ticks",
+    "get_tick_grid": "ticks",
+    "SingleFlight": "singleflight",
+    "get_singleflight": "singleflight",
+    "ResultCache": "memo",
+    "get_result_cache": "memo",
+    "get_registry": "metrics",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    # Se guarda en el paquete: los siguientes accesos no pasan por __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
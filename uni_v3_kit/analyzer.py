@@ -1,12 +1,37 @@
 from .data_provider import DataProvider
 from .math_core import V3Math
-import pandas as pd
+from .monte_carlo import RangeSurvivalSimulator
+from .pool_history import PoolHistory
+from .memo import get_result_cache, history_digest, make_key
+from . import metrics
+import numpy as np
+import heapq
 import math
+import time
+
+
+def _pd():
+    # pandas tarda ~300 ms en importarse: solo se carga al construir el primer DataFrame
+    import pandas
+    return pandas
+
 
 class MarketScanner:
-    def __init__(self):
-        self.data = DataProvider()
+    def __init__(self, data_provider=None, probability_model="normal", simulator=None, cache=None):
+        """
+        probability_model: "normal" (erf del multiplicador SD) o "mc" (Monte Carlo sobre los
+        retornos realizados de cada pool, ver monte_carlo.RangeSurvivalSimulator).
+        cache: ResultCache para memoizar las métricas por pool (por defecto la del proceso; False la desactiva).
+        """
+        if probability_model not in ("normal", "mc"):
+            raise ValueError(f"Modelo de probabilidad desconocido: {probability_model}")
+        self.data = data_provider or DataProvider()
         self.math = V3Math()
+        self.probability_model = probability_model
+        self.simulator = simulator
+        if probability_model == "mc" and simulator is None:
+            self.simulator = RangeSurvivalSimulator()
+        self.cache = get_result_cache() if cache is None else (None if cache is False else cache)
 
     def _calculate_probability_in_range(self, sd_multiplier):
         """Calcula probabilidad de estar en rango (distribución normal)"""
@@ -14,34 +39,41 @@ class MarketScanner:
         return math.erf(sd_multiplier / math.sqrt(2))
 
     def _process_pool_data(self, pool_detail, days_window, sd_multiplier=1.0):
-        """Procesa datos de un pool y devuelve métricas clave."""
-        history = pool_detail.get('history', [])
+        """Procesa datos de un pool (dict de la API o PoolHistory) y devuelve métricas clave."""
+        history = PoolHistory.from_pool(pool_detail)
+        if self.cache is None:
+            return self._compute_pool_data(history, days_window, sd_multiplier)
+
+        # Clave = contenido del pool + parámetros: solo un snapshot nuevo invalida el resultado
+        params = {"days_window": days_window, "sd_multiplier": float(sd_multiplier), "model": self.probability_model}
+        if self.probability_model == "mc":
+            params["simulator"] = (self.simulator.n_paths, self.simulator.method, self.simulator.seed)
+        key = make_key("pool_metrics", history_digest(history), **params)
+        return self.cache.get_or_compute(key, lambda: self._compute_pool_data(history, days_window, sd_multiplier))
+
+    def _compute_pool_data(self, history, days_window, sd_multiplier):
+        meta = history.meta
         
         # Necesitamos historial suficiente para calcular volatilidad
         min_history_days = max(days_window, 30)
-        recent_data = history[:min_history_days * 3] if history else []
+        recent_data = history.newest(min_history_days * 3)
         
-        if not recent_data: return None
+        if not len(recent_data): return None
 
         # --- 1. APR Promedio (Ventana seleccionada) ---
-        data_window = history[:days_window * 3]
-        aprs = [x.get('apr', 0) for x in data_window if x.get('apr') is not None]
+        aprs = history.newest(days_window * 3).apr
+        aprs = aprs[~np.isnan(aprs)]
         
-        if aprs:
+        if len(aprs):
             # API devuelve 50.5 para 50.5%. Pasamos a decimal 0.505
-            apr_promedio_anual = sum(aprs) / len(aprs) / 100.0 
+            apr_promedio_anual = float(aprs.mean()) / 100.0 
         else:
             apr_promedio_anual = 0.0
 
         # --- 2. Volatilidad Real (Anualizada) ---
-        prices = []
-        for x in recent_data:
-            p_native = x.get('priceNative')
-            p_usd = x.get('priceUsd')
-            if p_native is not None and isinstance(p_native, (int, float)) and p_native > 0:
-                prices.append(float(p_native))
-            elif p_usd is not None and isinstance(p_usd, (int, float)) and p_usd > 0:
-                prices.append(float(p_usd))
+        # `price` ya aplica el fallback priceNative -> priceUsd (NaN si ninguno es válido)
+        prices = recent_data.price
+        prices = prices[~np.isnan(prices)]
         
         vol_annual = self.math.calculate_realized_volatility(prices)
         
@@ -52,17 +84,27 @@ class MarketScanner:
         range_width_pct = max(0.005, min(range_width_pct, 2.0)) # Safety caps
 
         prob_in_range = self._calculate_probability_in_range(sd_multiplier)
+        mc = None
+        if self.probability_model == "mc":
+            # Fracción de tiempo en rango simulada con los retornos reales del pool
+            mc = self.simulator.simulate(self.simulator.log_returns(prices), days_window, range_width_pct, apr_promedio_anual)
+            if mc is not None:
+                prob_in_range = mc["in_range_fraction"]
 
         # --- 4. Proyección: Fees vs IL ---
         
         # A. Fees Totales Teóricas (Si nunca sale del rango)
         total_yield_theoretical = apr_promedio_anual * (days_window / 365.0)
         
-        # B. Fees Probables (Ajustadas por la probabilidad estadística de mantenerse dentro)
-        probable_yield = total_yield_theoretical * prob_in_range
+        # B. Fees Probables (Ajustadas por la probabilidad estadística de mantenerse dentro);
+        # con Monte Carlo se usan las fees esperadas que ya devuelve la simulación
+        if mc is not None:
+            probable_yield = mc["expected_fees"]
+        else:
+            probable_yield = total_yield_theoretical * prob_in_range
         
         # C. Riesgo de Salida (Max IL)
-        # Usamos la función de math_core que simula la pérdida real de V3 al tocar el límite
+        # Usamos la función de math_core que calcula la pérdida real de V3 al tocar el límite
         il_loss_at_limit = self.math.calculate_v3_il_at_limit(range_width_pct)
         
         # --- 5. Métricas de Decisión ---
@@ -75,31 +117,29 @@ class MarketScanner:
         ratio_br = probable_yield / riesgo_safe
         
         # --- 6. Datos Básicos ---
-        nombre_par = pool_detail.get('poolName')
+        nombre_par = meta.get('poolName')
         if not nombre_par: 
-            base = pool_detail.get('BaseToken') or '?'
-            quote = pool_detail.get('QuoteToken') or '?'
+            base = meta.get('BaseToken') or '?'
+            quote = meta.get('QuoteToken') or '?'
             try:
-                raw_fee = pool_detail.get('feeTier') or 0
+                raw_fee = meta.get('feeTier') or 0
                 fee_calc = float(raw_fee) / 10000.0
                 fee_str = f"{fee_calc:g}%"
             except:
                 fee_str = "?%"
             nombre_par = f"{base} / {quote} {fee_str}"
 
-        dex_id = str(pool_detail.get('DexId', 'Unknown')).capitalize().replace("-v3", "").replace(" v3", "")
-        chain_id = str(pool_detail.get('ChainId', 'Unknown')).capitalize()
+        dex_id = str(meta.get('DexId', 'Unknown')).capitalize().replace("-v3", "").replace(" v3", "")
+        chain_id = str(meta.get('ChainId', 'Unknown')).capitalize()
         
-        # TVL con Fallback
-        tvl = float(pool_detail.get('Liquidity', 0) or 0)
-        if tvl == 0 and history:
-            for snap in history:
-                snap_liq = float(snap.get('Liquidity', 0) or 0)
-                if snap_liq > 0:
-                    tvl = snap_liq
-                    break
-
-        return {
+        # TVL con Fallback (snapshot más reciente con liquidez)
+        tvl = float(meta.get('Liquidity', 0) or 0)
+        if tvl == 0 and len(history):
+            positive = np.flatnonzero(history.liquidity > 0)
+            if len(positive):
+                tvl = float(history.liquidity[positive[-1]])
+
+        result = {
             "Par": nombre_par,
             "Red": chain_id,
             "DEX": dex_id,
@@ -113,74 +153,161 @@ class MarketScanner:
             "Ratio F/IL": ratio_br,                 # Ratio numérico
             "Margen": margen * 100.0                # %
         }
+        if self.probability_model == "mc":
+            # IL medio al cierre del periodo (solo con el modelo Monte Carlo)
+            result["IL Esperado"] = mc["expected_il"] * 100.0 if mc else float('nan')
+        return result
 
     def analyze_single_pool(self, address, days_window=7, sd_multiplier=1.0):
         pool_detail = self.data.get_pool_history(address)
-        if not pool_detail: return pd.DataFrame()
+        if not pool_detail: return _pd().DataFrame()
         
         result = self._process_pool_data(pool_detail, days_window, sd_multiplier)
         if result:
             result['Address'] = address
-            return pd.DataFrame([result])
-        return pd.DataFrame()
+            return _pd().DataFrame([result])
+        return _pd().DataFrame()
 
-    def scan(self, target_chains, min_tvl, days_window, sd_multiplier, min_apr, selected_assets, custom_asset=None):
-        raw_pools = self.data.get_all_pools()
-        candidates = []
-        
+    @staticmethod
+    def _select_candidates(index, target_chains, min_tvl, selected_assets, custom_asset=None, limit=150):
+        """Filtra el universo de pools (PoolIndex) y devuelve las direcciones a analizar (por volumen)."""
         # Preparar búsqueda de activos
         assets_to_search = []
         if selected_assets:
-            assets_to_search = [a.upper() for a in selected_assets if a != "Otro"]
+            assets_to_search = [a.strip().upper() for a in selected_assets if a != "Otro"]
         if custom_asset:
-            assets_to_search.append(custom_asset.upper())
-            
-        for p in raw_pools:
-            # 1. Filtro Red
-            p_chain = p.get('ChainId')
-            if target_chains and p_chain not in target_chains:
-                continue
+            assets_to_search.append(custom_asset.strip().upper())
+
+        # 1. Red, 2. TVL, 3. Activos -> priorizado por Volumen
+        return index.select(target_chains, min_tvl, assets_to_search, limit)
+
+    def _score_pool(self, address, pool_detail, days_window, sd_multiplier, min_apr):
+        """Métricas de un pool si pasa el filtro de APR mínimo (o None)."""
+        registry = metrics.get_registry()
+        result = self._process_pool_data(pool_detail, days_window, sd_multiplier)
+        if not result:
+            registry.inc("pools_dropped_total", reason="missing_history")
+            return None
+
+        # 4. Filtro APR Mínimo
+        apr_calc = result.get(f"APR ({days_window}d)", 0) * 100
+        if apr_calc < min_apr:
+            registry.inc("pools_dropped_total", reason="min_apr")
+            return None
+
+        registry.inc("pools_scored_total")
+        result['Address'] = address
+        return result
+
+    def scan(self, target_chains, min_tvl, days_window, sd_multiplier, min_apr, selected_assets, custom_asset=None, max_workers=16, timeout=10):
+        registry = metrics.get_registry()
+        with registry.stage("scan.total"):
+            with registry.stage("scan.listing"):
+                index = self.data.get_pool_index()
+            with registry.stage("scan.select"):
+                addresses = self._select_candidates(index, target_chains, min_tvl, selected_assets, custom_asset)
+            registry.inc("scan_candidates_total", len(addresses))
+
+            # Descarga concurrente (acotada por max_workers), resultados en orden de candidatos
+            with registry.stage("scan.fetch_history"):
+                details = self.data.get_pools_history(addresses, max_workers=max_workers, timeout=timeout)
+
+            results = []
+            with registry.stage("scan.process"):
+                for address, pool_detail in zip(addresses, details):
+                    result = self._score_pool(address, pool_detail, days_window, sd_multiplier, min_apr)
+                    if result:
+                        results.append(result)
                 
-            # 2. Filtro TVL
-            try: tvl = float(p.get('Liquidity', 0))
-            except: tvl = 0
-            if tvl < min_tvl: continue
+            with registry.stage("scan.dataframe"):
+                df = _pd().DataFrame(results)
+                
+                if not df.empty:
+                    # Ordenar por Ratio F/IL descendente y devolver Top 100
+                    df = df.sort_values(by="Ratio F/IL", ascending=False).head(100)
             
-            # 3. Filtro Activos
-            if assets_to_search:
-                base = str(p.get('BaseToken', '')).upper()
-                quote = str(p.get('QuoteToken', '')).upper()
-                found = False
-                for asset in assets_to_search:
-                    if asset in base or asset in quote:
-                        found = True
-                        break
-                if not found: continue
-
-            candidates.append(p)
-        
-        # Priorizar por Volumen
-        candidates = sorted(candidates, key=lambda x: float(x.get('Volume', 0)), reverse=True)[:150]
-        
-        results = []
-        for pool in candidates:
-            address = pool.get('pairAddress') 
-            if not address: address = pool.get('_id') 
+        return df
 
-            pool_detail = self.data.get_pool_history(address)
-            result = self._process_pool_data(pool_detail, days_window, sd_multiplier)
-            
+    def scan_from_store(self, results_store, target_chains, min_tvl, days_window, sd_multiplier, min_apr, selected_assets,
+                        custom_asset=None, max_age=None, **scan_kwargs):
+        """
+        Lee el scan pre-calculado (precompute.ResultsStore) y devuelve (df, computed_at).
+        Si no existe o es más antiguo que `max_age`, lo calcula en el momento y lo guarda.
+        Un scan vacío (p.ej. listado caído) no se guarda: se devuelve el anterior si lo hay.
+        """
+        params = {"target_chains": target_chains, "min_tvl": min_tvl, "days_window": days_window,
+                  "sd_multiplier": sd_multiplier, "min_apr": min_apr, "selected_assets": selected_assets,
+                  "custom_asset": custom_asset}
+        df, computed_at = results_store.load(params, max_age=max_age)
+        if df is not None:
+            metrics.get_registry().inc("results_store_total", result="hit")
+            return df, computed_at
+
+        metrics.get_registry().inc("results_store_total", result="miss")
+        df = self.scan(**params, **scan_kwargs)
+        computed_at = time.time()
+        if df.empty:
+            stale_df, stale_at = results_store.load(params)
+            if stale_df is not None:
+                return stale_df, stale_at
+            return df, computed_at
+
+        results_store.save(params, df, computed_at=computed_at)
+        return df, computed_at
+
+    def scan_stream(self, target_chains, min_tvl, days_window, sd_multiplier, min_apr, selected_assets, custom_asset=None,
+                    max_workers=16, timeout=10, top_k=100, metric="Ratio F/IL"):
+        """
+        Versión incremental de scan: genera (fila, ranking) en cuanto llega cada pool.
+        `ranking` es un TopK con los mejores `top_k` pools hasta el momento según `metric`
+        (ranking.to_frame() devuelve la tabla parcial, lista para pintar en la UI).
+        """
+        index = self.data.get_pool_index()
+        addresses = self._select_candidates(index, target_chains, min_tvl, selected_assets, custom_asset)
+
+        ranking = TopK(top_k, metric)
+        for address, pool_detail in self.data.iter_pools_history(addresses, max_workers=max_workers, timeout=timeout):
+            result = self._score_pool(address, pool_detail, days_window, sd_multiplier, min_apr)
             if result:
-                # 4. Filtro APR Mínimo
-                apr_calc = result.get(f"APR ({days_window}d)", 0) * 100
-                if apr_calc >= min_apr:
-                    result['Address'] = address
-                    results.append(result)
-            
-        df = pd.DataFrame(results)
-        
-        if not df.empty:
-            # Ordenar por Ratio F/IL descendente y devolver Top 100
-            df = df.sort_values(by="Ratio F/IL", ascending=False).head(100)
-            
-        return df
+                ranking.push(result)
+                yield result, ranking
+
+
+class TopK:
+    """Top-K incremental (min-heap) de filas de resultados por una métrica (mayor es mejor)."""
+
+    def __init__(self, k=100, metric="Ratio F/IL"):
+        self.k = k
+        self.metric = metric
+        self._heap = []
+        self._seq = 0   # desempate estable: a igualdad, se queda el que llegó antes
+
+    def _key(self, row):
+        value = row.get(self.metric)
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return float('-inf')
+        return value if value == value else float('-inf')   # NaN al final
+
+    def push(self, row):
+        """Añade una fila; devuelve True si entra en el top."""
+        entry = (self._key(row), -self._seq, row)
+        self._seq += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+            return True
+        if entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+            return True
+        return False
+
+    def __len__(self):
+        return len(self._heap)
+
+    def rows(self):
+        """Filas ordenadas de mejor a peor."""
+        return [entry[2] for entry in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
+
+    def to_frame(self):
+        return _pd().DataFrame(self.rows())
@@ -0,0 +1,152 @@
+"""
+Archivo binario de snapshots para historiales largos, abierto con np.memmap (sin copias).
+
+    <dir>/snapshots.bin   registros de ancho fijo (RECORD_DTYPE), en bloques por pool y en orden cronológico
+    <dir>/index.json      {address: {"offset", "count", "meta"}} + listado /pools opcional
+
+Varios procesos que abren el mismo archivo comparten la caché de páginas del sistema
+operativo en lugar de tener cada uno su copia del historial.
+"""
+import json
+import os
+
+import numpy as np
+
+from .data_provider import DataProvider, save_snapshot_dir
+from .iv_cache import IVReading
+from .pool_history import PoolHistory
+
+ARCHIVE_VERSION = 1
+DATA_FILE = "snapshots.bin"
+INDEX_FILE = "index.json"
+
+# 40 bytes por snapshot (little-endian, sin relleno)
+RECORD_DTYPE = np.dtype([
+    ("date", "<i8"),
+    ("price_native", "<f8"),
+    ("price_usd", "<f8"),
+    ("apr", "<f8"),
+    ("liquidity", "<f8"),
+])
+
+
+class SnapshotArchive:
+    """Lectura de un archivo de snapshots: cada pool es una vista PoolHistory sobre el memmap."""
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        with open(os.path.join(self.path, INDEX_FILE)) as f:
+            index = json.load(f)
+        if index.get("version") != ARCHIVE_VERSION:
+            raise ValueError(f"Versión de archivo no soportada: {index.get('version')}")
+        self.pools = index.get("pools", {})
+        self.listing = index.get("listing")
+
+        data_path = os.path.join(self.path, DATA_FILE)
+        # np.memmap no admite ficheros vacíos
+        if os.path.getsize(data_path):
+            self._records = np.memmap(data_path, dtype=RECORD_DTYPE, mode="r")
+        else:
+            self._records = np.empty(0, dtype=RECORD_DTYPE)
+
+    def __len__(self):
+        return len(self.pools)
+
+    def __contains__(self, address):
+        return address in self.pools
+
+    def addresses(self):
+        return list(self.pools)
+
+    def get(self, address):
+        """PoolHistory del pool (columnas = vistas del memmap, sin copiar) o None."""
+        entry = self.pools.get(address)
+        if entry is None: return None
+        block = self._records[entry["offset"]:entry["offset"] + entry["count"]]
+        return PoolHistory(block["date"], block["price_native"], block["price_usd"],
+                           block["apr"], block["liquidity"], meta=entry.get("meta"))
+
+    def pool_listing(self):
+        """Listado /pools guardado con el archivo (o uno mínimo a partir de la info de cada pool)."""
+        if self.listing is not None:
+            return self.listing
+        return [dict(e.get("meta") or {}, pairAddress=a) for a, e in self.pools.items()]
+
+    # --- Exportación al formato de la API ---
+    def get_pool(self, address):
+        """Objeto pool con la forma de get_pool_history (info + history, más reciente primero)."""
+        history = self.get(address)
+        return history.to_pool() if history is not None else {}
+
+    def export_dir(self, directory):
+        """Vuelca el archivo a un directorio de snapshots JSON (ver SnapshotDirectoryProvider)."""
+        return save_snapshot_dir(directory, self.pool_listing(), {a: self.get_pool(a) for a in self.pools})
+
+    # --- Importación ---
+    @classmethod
+    def write(cls, path, pools, listing=None):
+        """
+        Crea (o reemplaza) un archivo a partir de {address: objeto pool de get_pool_history}
+        (también acepta PoolHistory o listas de snapshots). Los pools con fechas no numéricas
+        se omiten. Devuelve el SnapshotArchive abierto.
+        """
+        os.makedirs(path, exist_ok=True)
+        data_path = os.path.join(path, DATA_FILE)
+        index = {}
+        offset = 0
+        with open(data_path + ".tmp", "wb") as f:
+            for address, pool in pools.items():
+                history = PoolHistory.coerce(pool)
+                if history.date.dtype != np.int64:
+                    print(f"Pool {address}: fechas no numéricas, se omite del archivo")
+                    continue
+                records = np.empty(len(history), dtype=RECORD_DTYPE)
+                for field in RECORD_DTYPE.names:
+                    records[field] = getattr(history, field)
+                f.write(records.tobytes())
+                index[address] = {"offset": offset, "count": len(records), "meta": history.meta}
+                offset += len(records)
+
+        with open(os.path.join(path, INDEX_FILE) + ".tmp", "w") as f:
+            json.dump({"version": ARCHIVE_VERSION, "dtype": RECORD_DTYPE.descr, "records": offset,
+                       "pools": index, "listing": listing}, f, default=str)
+        # Datos antes que índice: un lector nunca ve un índice que apunte fuera del fichero
+        os.replace(data_path + ".tmp", data_path)
+        os.replace(os.path.join(path, INDEX_FILE) + ".tmp", os.path.join(path, INDEX_FILE))
+        return cls(path)
+
+    @classmethod
+    def from_provider(cls, path, data_provider, addresses, include_listing=True):
+        """Importa desde un DataProvider (API, almacén o directorio de snapshots)."""
+        addresses = list(addresses)
+        details = data_provider.get_pools_history(addresses)
+        pools = {a: d for a, d in zip(addresses, details) if d}
+        listing = data_provider.get_all_pools() if include_listing else None
+        return cls.write(path, pools, listing=listing)
+
+
+class ArchiveDataProvider(DataProvider):
+    """
+    DataProvider sin red sobre un SnapshotArchive: get_pool_history devuelve PoolHistory
+    (vistas del memmap), que MarketScanner y Backtester aceptan directamente.
+    """
+
+    def __init__(self, archive, **kwargs):
+        kwargs.setdefault("store", False)
+        super().__init__(**kwargs)
+        self.archive = archive if isinstance(archive, SnapshotArchive) else SnapshotArchive(archive)
+        # Clave propia en la caché de índices compartida
+        self.base_url = f"archive://{self.archive.path}"
+
+    def get_all_pools(self):
+        return self.archive.pool_listing()
+
+    def _listing_source(self, validators):
+        return self.get_all_pools(), {}
+
+    def _fetch_pool_history(self, pool_address, timeout=None):
+        history = self.archive.get(pool_address)
+        return history if history is not None else {}
+
+    def get_market_iv_reading(self, currency="ETH"):
+        return IVReading(currency.upper(), None, None, True, "sin red (archivo de snapshots)")
@@ -1,11 +1,37 @@
-import pandas as pd
+import numpy as np
 import math
 from datetime import datetime
-from .math_core import V3Math
+from .math_core import V3Math, RollingVolatility
+from .data_provider import DataProvider
+from .pool_history import PoolHistory
+from .memo import get_result_cache, history_digest, make_key
+from .ticks import get_tick_grid
+from . import metrics
+
+
+def _pd():
+    # Import diferido: el motor trabaja con NumPy y solo el resultado final es un DataFrame
+    import pandas
+    return pandas
+
 
 class Backtester:
-    def __init__(self):
+    def __init__(self, data_provider=None, cache=None):
+        """cache: ResultCache para memoizar simulaciones (por defecto la del proceso; False la desactiva)."""
         self.math = V3Math()
+        self._data = data_provider
+        self.cache = get_result_cache() if cache is None else (None if cache is False else cache)
+
+    @property
+    def data(self):
+        # Se crea bajo demanda: run_simulation con historial propio no necesita red
+        if self._data is None:
+            self._data = DataProvider()
+        return self._data
+
+    def load_history(self, pool_address):
+        """Historial del pool como PoolHistory, leído del almacén local si existe."""
+        return PoolHistory.from_pool(self.data.get_pool_history(pool_address))
 
     def _parse_date(self, date_val):
         try:
@@ -42,21 +68,231 @@ class Backtester:
         
         return L, amount_x_unit * L, amount_y_unit * L
 
-    def _calculate_dynamic_range(self, full_data, current_idx, vol_days, sd_multiplier):
-        """Calcula el ancho del rango basándose en la volatilidad reciente."""
+    def _calculate_dynamic_range(self, full_data, current_idx, vol_days, sd_multiplier, rolling_vol=None, offset=0):
+        """Calcula el ancho del rango basándose en la volatilidad reciente.
+
+        Con `rolling_vol` (RollingVolatility sobre la serie cronológica, desplazada
+        `offset` posiciones respecto a full_data) la volatilidad es una consulta O(1).
+        """
         samples_needed = vol_days * 3
         start_idx = max(0, current_idx - samples_needed)
         
-        recent_window = full_data[start_idx : current_idx]
-        prices = [x.get('priceNative') or x.get('priceUsd') for x in recent_window]
-        
-        vol_annual = self.math.calculate_realized_volatility(prices)
+        if rolling_vol is not None:
+            vol_annual = rolling_vol.annualized(offset + start_idx, offset + current_idx)
+        else:
+            recent_window = full_data[start_idx : current_idx]
+            prices = [x.get('priceNative') or x.get('priceUsd') for x in recent_window]
+            vol_annual = self.math.calculate_realized_volatility(prices)
+
         time_scaling = math.sqrt(vol_days / 365.0)
         
         range_width_pct = vol_annual * time_scaling * sd_multiplier
         return max(0.01, min(range_width_pct, 1.0)), vol_annual
 
-    def run_simulation(self, history, investment_usd, sd_multiplier, sim_days=30, vol_days=7, fee_tier=0.003, auto_rebalance=False):
+    def run_simulation(self, history, investment_usd, sd_multiplier, sim_days=30, vol_days=7, fee_tier=0.003, auto_rebalance=False, engine="vector", rolling_vol=None,
+                       tick_exact=False, token_decimals=None):
+        """
+        Simula una posición LP. `history` puede ser la lista de la API (más reciente primero)
+        o un PoolHistory ya parseado (recomendado si se simula varias veces).
+        engine="vector" (por defecto) usa el motor NumPy; engine="loop" el bucle original.
+        rolling_vol: RollingVolatility precalculado con `build_rolling_volatility(history)`,
+        reutilizable entre llamadas con distintos parámetros (sweeps).
+        tick_exact=True ajusta los rangos al tick spacing de `fee_tier` y calcula liquidez y
+        depósitos con la aritmética Q64.96 del contrato; necesita `token_decimals` = (d0, d1) del par
+        (la API no los da y con decimales erróneos los ticks no corresponden al precio).
+        El resultado se memoiza por (hash del historial, parámetros) en `self.cache`.
+        """
+        grid = None
+        if tick_exact:
+            if engine == "loop":
+                raise ValueError("tick_exact solo está disponible en el motor vectorizado")
+            if token_decimals is None:
+                raise ValueError("tick_exact necesita token_decimals=(d0, d1) del par, p.ej. (18, 6) para WETH/USDC")
+            grid = get_tick_grid(fee_tier, tuple(token_decimals))
+
+        if self.cache is None or history is None:
+            return self._simulate(history, investment_usd, sd_multiplier, sim_days, vol_days, fee_tier, auto_rebalance, engine, rolling_vol, grid)
+
+        # Clave = contenido del historial + parámetros: solo un snapshot nuevo invalida el resultado
+        pool_history = PoolHistory.coerce(history)
+        if engine != "loop": history = pool_history
+        key = make_key("backtest", history_digest(pool_history, include_meta=False),
+                       investment_usd=float(investment_usd), sd_multiplier=float(sd_multiplier), sim_days=int(sim_days),
+                       vol_days=int(vol_days), fee_tier=float(fee_tier), auto_rebalance=bool(auto_rebalance), engine=engine,
+                       # Solo en modo tick: las claves del modo float no cambian
+                       **({"tick_spacing": grid.spacing, "token_decimals": list(token_decimals)} if grid else {}))
+        return self.cache.get_or_compute(key, lambda: self._simulate(
+            history, investment_usd, sd_multiplier, sim_days, vol_days, fee_tier, auto_rebalance, engine, rolling_vol, grid
+        ))
+
+    def _simulate(self, history, investment_usd, sd_multiplier, sim_days, vol_days, fee_tier, auto_rebalance, engine, rolling_vol, grid=None):
+        registry = metrics.get_registry()
+        with registry.stage(f"backtest.{engine}"):
+            if engine == "loop":
+                if isinstance(history, PoolHistory): history = history.to_records()
+                result = self._run_simulation_loop(history, investment_usd, sd_multiplier, sim_days, vol_days, fee_tier, auto_rebalance)
+            else:
+                result = self._run_simulation_vector(history, investment_usd, sd_multiplier, sim_days, vol_days, fee_tier, auto_rebalance, rolling_vol, grid)
+
+        registry.inc("backtests_total", engine=engine, result="ok" if result else "insufficient_history")
+        if result:
+            registry.inc("backtest_rebalances_total", result[3]["rebalances"])
+        return result
+
+    def build_rolling_volatility(self, history):
+        """Acumulador de volatilidad sobre TODO el historial (orden cronológico)."""
+        return RollingVolatility(PoolHistory.coerce(history).price)
+
+    # --- MOTOR VECTORIZADO ---
+    @staticmethod
+    def _first_exit(prices, start, lower, upper):
+        """Primer índice >= start con precio fuera de [lower, upper] (o len si no sale)."""
+        n = len(prices)
+        step = 64
+        pos = start
+        while pos < n:
+            end = min(n, pos + step)
+            chunk = prices[pos:end]
+            out = np.flatnonzero((chunk < lower) | (chunk > upper))
+            if len(out): return pos + int(out[0])
+            pos = end
+            step *= 2
+        return n
+
+    def _open_position(self, principal_usd, p_native, p_base_usd, range_width_pct, grid=None):
+        """(lower, upper, L, tokens x, tokens y) de una posición centrada en p_native.
+        Con `grid` (TickGrid) el rango se ajusta a ticks y L sale de la aritmética entera del contrato."""
+        lower = p_native * (1 - range_width_pct)
+        upper = p_native * (1 + range_width_pct)
+        if grid is None:
+            return (lower, upper) + tuple(self._calculate_liquidity_and_amounts(principal_usd, p_native, p_base_usd, lower, upper))
+        tick_lower, tick_upper = grid.snap_range(lower, upper)
+        liquidity, amount_x, amount_y = grid.position_for_usd(principal_usd, p_native, p_base_usd, tick_lower, tick_upper)
+        return grid.tick_price(tick_lower), grid.tick_price(tick_upper), liquidity, amount_x, amount_y
+
+    def _run_simulation_vector(self, history, investment_usd, sd_multiplier, sim_days, vol_days, fee_tier, auto_rebalance, rolling_vol=None, grid=None):
+        if history is None or not len(history): return None
+        pool_history = PoolHistory.coerce(history)
+
+        # 1. Preparar Datos (mismo recorte que el motor original, ya en orden cronológico)
+        total_samples = (sim_days + vol_days) * 3
+        window = pool_history.newest(total_samples)
+
+        min_warmup_samples = vol_days * 3
+        if len(window) < min_warmup_samples + 1:
+            return None
+
+        sim_start_idx = min_warmup_samples
+        sim_rows = window[sim_start_idx:]
+
+        # Volatilidad por ventana en O(1). La serie completa empieza `offset` posiciones antes.
+        if rolling_vol is None:
+            rolling_vol = RollingVolatility(window.price)
+        offset = rolling_vol.size - len(window)
+
+        # Columnas (NaN -> 0, como los `.get(..., 0)` del motor original)
+        p_usd_all = np.nan_to_num(sim_rows.price_usd, nan=0.0)
+        p_native_all = np.nan_to_num(sim_rows.price, nan=0.0)
+        apr_all = np.nan_to_num(sim_rows.apr, nan=0.0)
+
+        p_base_usd_0 = p_usd_all[0]
+        p_native_0 = p_native_all[0]
+        if not p_base_usd_0 or not p_native_0: return None
+
+        # Filas válidas (el bucle original las saltaba con `continue`)
+        valid = (p_native_all != 0) & (p_usd_all != 0)
+        row_idx = np.flatnonzero(valid)
+        P = p_native_all[valid]
+        P_usd = p_usd_all[valid]
+        apr = apr_all[valid]
+        P_quote = P_usd / P
+        sqrt_P = np.sqrt(P)
+        n = len(P)
+
+        # --- 2. Inicialización ---
+        range_width_pct, initial_vol = self._calculate_dynamic_range(window, sim_start_idx, vol_days, sd_multiplier, rolling_vol, offset)
+        lower_price, upper_price, liquidity, hodl_x, hodl_y = self._open_position(
+            investment_usd, p_native_0, p_base_usd_0, range_width_pct, grid
+        )
+        initial_min_p = lower_price
+        initial_max_p = upper_price
+        rebalance_count = 0
+
+        # Estado de la posición por fila (constante dentro de cada segmento)
+        range_min = np.empty(n)
+        range_max = np.empty(n)
+        width_col = np.empty(n)
+        liquidity_col = np.empty(n)
+
+        # --- 3. Segmentos entre rebalanceos: solo se localizan salidas de rango ---
+        seg_start = 0
+        while seg_start < n:
+            if auto_rebalance:
+                # La primera fila de un segmento nuevo ya está en rango (recién rebalanceado)
+                search_from = seg_start if rebalance_count == 0 else seg_start + 1
+                seg_end = self._first_exit(P, search_from, lower_price, upper_price)
+            else:
+                seg_end = n
+
+            range_min[seg_start:seg_end] = lower_price
+            range_max[seg_start:seg_end] = upper_price
+            width_col[seg_start:seg_end] = range_width_pct * 100
+            liquidity_col[seg_start:seg_end] = liquidity
+
+            if seg_end >= n: break
+
+            # --- Rebalanceo en seg_end ---
+            j = seg_end
+            p_t = P[j]
+            ax, ay = self.math.calculate_amounts(liquidity, sqrt_P[j], math.sqrt(lower_price), math.sqrt(upper_price))
+            current_principal_usd = (ax * P_usd[j] + ay * P_quote[j]) * 0.997  # Coste swap
+
+            range_width_pct, _ = self._calculate_dynamic_range(window, sim_start_idx + int(row_idx[j]), vol_days, sd_multiplier, rolling_vol, offset)
+            lower_price, upper_price, liquidity, _, _ = self._open_position(
+                current_principal_usd, p_t, P_usd[j], range_width_pct, grid
+            )
+            rebalance_count += 1
+            seg_start = j
+
+        # --- 4. Valoración en bloque ---
+        ax, ay = self.math.calculate_amounts(liquidity_col, sqrt_P, np.sqrt(range_min), np.sqrt(range_max))
+        val_pos = ax * P_usd + ay * P_quote
+        in_range = (range_min <= P) & (P <= range_max)
+
+        # --- 5. Fees y HODL en bloque ---
+        fees_period = np.where(in_range & (apr != 0), val_pos * ((apr / 100.0) / 1095.0), 0.0)
+        fees_acum = np.cumsum(fees_period)
+        hodl_value = hodl_x * P_usd + hodl_y * P_quote
+
+        dates = sim_rows.datetimes()
+        dates = dates[row_idx] if isinstance(dates, np.ndarray) else [dates[k] for k in row_idx]
+
+        df = _pd().DataFrame({
+            "Date": dates,
+            "Price": P,
+            "Range Min": range_min,
+            "Range Max": range_max,
+            "Range Width %": width_col,
+            "In Range": in_range,
+            "APR Period": apr,
+            "Fees Period": fees_period,
+            "Fees Acum": fees_acum,
+            "Valor Principal": val_pos,
+            "Valor Total": val_pos + fees_acum,
+            "HODL Value": hodl_value
+        })
+
+        metadata = {
+            "initial_volatility": initial_vol,
+            "rebalances": rebalance_count,
+            "initial_range_width_pct": range_width_pct,
+            "avg_efficiency": 1.0
+        }
+
+        return df, initial_min_p, initial_max_p, metadata
+
+    # --- MOTOR ORIGINAL (bucle, referencia) ---
+    def _run_simulation_loop(self, history, investment_usd, sd_multiplier, sim_days=30, vol_days=7, fee_tier=0.003, auto_rebalance=False):
         if not history: return None
         
         # 1. Preparar Datos
@@ -173,5 +409,5 @@ class Backtester:
             "initial_range_width_pct": range_width_pct,
             "avg_efficiency": 1.0
         }
-            
-        return pd.DataFrame(results), initial_min_p, initial_max_p, metadata
+
+        return _pd().DataFrame(results), initial_min_p, initial_max_p, metadata
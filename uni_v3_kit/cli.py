@@ -0,0 +1,225 @@
+"""
+Modo batch sin interfaz: ejecuta scans, análisis de pools, sweeps y backtests desde un JSON
+y guarda los resultados en formato columnar (Parquet / Arrow IPC con zstd).
+
+    python -m uni_v3_kit jobs.json
+    python -m uni_v3_kit jobs.json --snapshot-dir snapshots/2025-01-01 --format arrow --workers 8
+    python -m uni_v3_kit jobs.json --archive archive/2025-01-01
+
+jobs.json:
+    {
+      "output_dir": "results",
+      "format": "parquet",                 # parquet | arrow | csv
+      "compression": "zstd",
+      "snapshot_dir": null,                # directorio local en vez de la API (ver SnapshotDirectoryProvider)
+      "archive": null,                     # o un archivo binario memmap (ver archive.SnapshotArchive)
+      "workers": null,                     # procesos para sweeps (por defecto, todos los núcleos)
+      "jobs": [
+        {"type": "snapshot", "name": "snap", "dir": "snapshots/hoy", "target_chains": ["arbitrum"], "min_tvl": 100000},
+        {"type": "archive", "name": "arch", "dir": "archive/hoy", "target_chains": ["arbitrum"], "min_tvl": 100000},
+        {"type": "scan", "name": "arb-7d", "target_chains": ["arbitrum"], "min_tvl": 100000, "days_window": 7},
+        {"type": "analyze", "name": "weth-usdc", "addresses": ["0x..."], "days_window": 7, "sd_multiplier": 1.0},
+        {"type": "sweep", "name": "grid", "pools": ["0x..."], "grid": {"sd_multiplier": [0.5, 1, 2]}},
+                                           # sin "pools" y con "archive": todos los pools del archivo
+        {"type": "backtest", "name": "series", "pools": ["0x..."], "grid": {"sd_multiplier": [1, 2]}},
+        {"type": "backtest", "name": "ticks", "pools": ["0x..."], "grid": {"tick_exact": [true]},
+         "token_decimals": {"0x...": [18, 6]}}  # decimales (token0, token1) por pool: necesarios con tick_exact
+      ]
+    }
+
+Cada job escribe <output_dir>/<name>.<ext>; manifest.json resume ficheros, filas y tiempos.
+"""
+import argparse
+import json
+import os
+import time
+
+import pandas as pd
+
+from .analyzer import MarketScanner
+from .archive import ArchiveDataProvider, SnapshotArchive
+from .backtester import Backtester
+from .data_provider import DataProvider, SnapshotDirectoryProvider, save_snapshot_dir
+from .pool_index import PoolIndex
+from .precompute import SCAN_DEFAULTS, SCAN_PARAMS
+from .sweep import ParameterSweep
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow", "csv": ".csv"}
+CONFIG_DEFAULTS = {"output_dir": "results", "format": "parquet", "compression": "zstd",
+                   "snapshot_dir": None, "archive": None, "workers": None, "jobs": []}
+
+
+def require_pyarrow(fmt):
+    """Parquet y Arrow necesitan pyarrow (dependencia opcional, no la usa la app)."""
+    if fmt == "csv": return
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError(f"El formato '{fmt}' necesita pyarrow: pip install pyarrow (o usa --format csv)")
+
+
+def write_table(df, path, fmt="parquet", compression="zstd"):
+    df = df.reset_index(drop=True)
+    if fmt == "parquet":
+        df.to_parquet(path, compression=compression, index=False)
+    elif fmt == "arrow":
+        df.to_feather(path, compression=compression)
+    elif fmt == "csv":
+        df.to_csv(path, index=False)
+    else:
+        raise ValueError(f"Formato desconocido: {fmt}")
+    return path
+
+
+class BatchRunner:
+    """Ejecuta los jobs de una configuración y escribe un fichero por job."""
+
+    def __init__(self, config):
+        self.config = dict(CONFIG_DEFAULTS)
+        self.config.update(config)
+        if self.config["format"] not in FORMATS:
+            raise ValueError(f"Formato desconocido: {self.config['format']}")
+
+        snapshot_dir = self.config["snapshot_dir"]
+        self.archive = SnapshotArchive(self.config["archive"]) if self.config["archive"] else None
+        if self.archive is not None:
+            self.data = ArchiveDataProvider(self.archive)
+        elif snapshot_dir:
+            self.data = SnapshotDirectoryProvider(snapshot_dir)
+        else:
+            self.data = DataProvider()
+        self.workers = self.config["workers"] or os.cpu_count() or 1
+
+    # --- Jobs ---
+    def _scan_args(self, job):
+        args = dict(SCAN_DEFAULTS)
+        args.update({k: job[k] for k in SCAN_PARAMS if k in job})
+        return args
+
+    def run_scan(self, job):
+        scanner = MarketScanner(self.data, probability_model=job.get("probability_model", "normal"))
+        return scanner.scan(**self._scan_args(job), max_workers=job.get("max_workers", 16))
+
+    def run_analyze(self, job):
+        scanner = MarketScanner(self.data, probability_model=job.get("probability_model", "normal"))
+        addresses = job.get("addresses") or [job["address"]]
+        frames = [scanner.analyze_single_pool(a, job.get("days_window", 7), job.get("sd_multiplier", 1.0)) for a in addresses]
+        frames = [f for f in frames if not f.empty]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def run_sweep(self, job):
+        sweep = ParameterSweep(max_workers=self.workers, data_provider=self.data)
+        # Con archivo y sin lista de pools, los workers abren el memmap directamente
+        pools = job.get("pools") or self.archive
+        return sweep.run(pools, job.get("grid", {}), investment_usd=job.get("investment_usd", 1000.0),
+                         fee_tier=job.get("fee_tier", 0.003), token_decimals=self._token_decimals(job))
+
+    def run_backtest(self, job):
+        """Series temporales completas (formato largo: una fila por pool, parámetros y fecha)."""
+        backtester = Backtester(self.data)
+        combos = ParameterSweep.expand_grid(job.get("grid", {}))
+        token_decimals = self._token_decimals(job)
+        frames = []
+        for address in job["pools"]:
+            history = backtester.load_history(address)
+            if not len(history): continue
+            rolling = backtester.build_rolling_volatility(history)
+            for params in combos:
+                result = backtester.run_simulation(history, job.get("investment_usd", 1000.0), fee_tier=job.get("fee_tier", 0.003),
+                                                   rolling_vol=rolling, token_decimals=token_decimals.get(address), **params)
+                if not result: continue
+                df = result[0]
+                df.insert(0, "Pool", address)
+                for i, (key, value) in enumerate(params.items()):
+                    df.insert(1 + i, key, value)
+                frames.append(df)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    @staticmethod
+    def _token_decimals(job):
+        """{pool: (d0, d1)} del job (el listado no trae decimales; tick_exact los necesita)."""
+        return {address: tuple(pair) for address, pair in (job.get("token_decimals") or {}).items()}
+
+    def _candidates(self, job, pools):
+        """Mismo filtro que el scan, sobre el listado `pools` ya descargado."""
+        args = self._scan_args(job)
+        addresses = MarketScanner._select_candidates(PoolIndex(pools, keep_pools=False), args["target_chains"], args["min_tvl"],
+                                                     args["selected_assets"], args["custom_asset"], job.get("limit", 150))
+        details = self.data.get_pools_history(addresses, max_workers=job.get("max_workers", 16))
+        return addresses, details
+
+    def run_snapshot(self, job):
+        """Descarga listado + historiales de los candidatos a un directorio de snapshots."""
+        # Una sola descarga del listado: sirve para elegir candidatos y se guarda completa
+        pools = self.data.get_all_pools()
+        addresses, details = self._candidates(job, pools)
+        save_snapshot_dir(job["dir"], pools, dict(zip(addresses, details)))
+        return pd.DataFrame({"Address": addresses, "Guardado": [bool(d) for d in details]})
+
+    def run_archive(self, job):
+        """Como snapshot, pero en un archivo binario para abrir con memmap."""
+        pools = self.data.get_all_pools()
+        addresses, details = self._candidates(job, pools)
+        archive = SnapshotArchive.write(job["dir"], {a: d for a, d in zip(addresses, details) if d}, listing=pools)
+        return pd.DataFrame({"Address": addresses, "Guardado": [a in archive for a in addresses]})
+
+    def run(self, only=None):
+        output_dir = self.config["output_dir"]
+        fmt = self.config["format"]
+        require_pyarrow(fmt)
+        os.makedirs(output_dir, exist_ok=True)
+
+        manifest = []
+        for k, job in enumerate(self.config["jobs"]):
+            job_type = job.get("type")
+            name = job.get("name") or f"{job_type}-{k + 1}"
+            if only and name not in only: continue
+
+            handler = getattr(self, f"run_{job_type}", None)
+            if handler is None:
+                print(f"Job {name}: tipo desconocido '{job_type}'")
+                manifest.append({"name": name, "type": job_type, "error": "tipo desconocido"})
+                continue
+
+            started = time.time()
+            try:
+                df = handler(job)
+                path = write_table(df, os.path.join(output_dir, name + FORMATS[fmt]), fmt, self.config["compression"])
+            except Exception as e:
+                print(f"Error en job {name}: {e}")
+                manifest.append({"name": name, "type": job_type, "error": str(e)})
+                continue
+
+            elapsed = time.time() - started
+            print(f"Job {name}: {len(df)} filas -> {path} ({elapsed:.1f}s)")
+            manifest.append({"name": name, "type": job_type, "path": path, "rows": len(df), "seconds": elapsed})
+
+        with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+            json.dump({"created_at": time.time(), "format": fmt, "jobs": manifest}, f, indent=2)
+        return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m uni_v3_kit", description="Scans, sweeps y backtests en batch")
+    parser.add_argument("config", help="JSON con la configuración y la lista de jobs")
+    parser.add_argument("--output-dir", help="directorio de resultados")
+    parser.add_argument("--format", choices=sorted(FORMATS), help="formato de salida")
+    parser.add_argument("--snapshot-dir", help="leer los pools de un directorio local en vez de la API")
+    parser.add_argument("--archive", help="leer los pools de un archivo binario (SnapshotArchive)")
+    parser.add_argument("--workers", type=int, help="procesos para los sweeps")
+    parser.add_argument("--only", nargs="+", help="ejecutar solo estos jobs (por nombre)")
+    args = parser.parse_args(argv)
+
+    with open(args.config) as f:
+        config = json.load(f)
+    for key in ("output_dir", "format", "snapshot_dir", "archive", "workers"):
+        value = getattr(args, key)
+        if value is not None:
+            config[key] = value
+
+    try:
+        manifest = BatchRunner(config).run(only=args.only)
+    except (ImportError, ValueError) as e:
+        print(f"Error: {e}")
+        return 2
+    return 1 if any("error" in job for job in manifest) else 0
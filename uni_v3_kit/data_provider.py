@@ -1,45 +1,321 @@
-import requests
+import json
+import logging
+import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .history_store import HistoryStore
+from .http_client import get_shared_client
+from .json_stream import CHUNK_SIZE, iter_array_items
+from .pool_index import PoolIndex
+from .iv_cache import IVReading, get_iv_cache
+from .singleflight import get_singleflight
+from . import metrics
+
+# Índice DVOL de Deribit (volatilidad implícita a 30 días)
+DVOL_URL = "https://www.deribit.com/api/v2/public/get_volatility_index_data"
+
+logger = logging.getLogger(__name__)
 
 class DataProvider:
-    def __init__(self):
+    # Índices del listado compartidos por todas las instancias del proceso:
+    # {base_url: (PoolIndex, timestamp, validadores HTTP {"etag", "last_modified"})}
+    _index_cache = {}
+    _index_lock = threading.Lock()
+
+    def __init__(self, timeout=10, max_workers=16, store=None, http_client=None, listing_ttl=300):
         self.headers = {'User-Agent': 'Mozilla/5.0'}
         self.base_url = "https://apiindex.mucho.finance"
+        self.dvol_url = DVOL_URL
+        # Sesiones keep-alive por host + reintentos + límite AIMD, compartidas por proceso
+        self.http = http_client or get_shared_client()
+        # Timeout por petición (segundos) y paralelismo máximo para descargas en lote
+        self.timeout = timeout
+        self.max_workers = max_workers
+        # Segundos que se reutiliza el índice del listado /pools antes de refrescarlo
+        self.listing_ttl = listing_ttl
+        # Peticiones iguales en curso (de cualquier sesión del proceso) comparten una sola descarga
+        self.flight = get_singleflight()
+
+        # Almacén local opcional (ruta o HistoryStore). También vía UNI_V3_HISTORY_DB; False lo desactiva.
+        if store is None:
+            store = os.environ.get("UNI_V3_HISTORY_DB")
+        if isinstance(store, str):
+            store = HistoryStore(store)
+        self.store = store or None
 
     def get_market_iv(self, currency="ETH"):
-        """Obtiene IV desde Deribit (DVOL)"""
-        try:
-            url = "https://www.deribit.com/api/v2/public/get_volatility_index_data"
-            params = {
-                "currency": currency.upper(),
-                "resolution": "1D",
-                "end_timestamp": int(time.time()*1000)
-            }
-            data = requests.get(url, params=params).json()
+        """
+        IV desde Deribit (DVOL) vía la caché compartida: (valor, stale). Sin lectura buena
+        todavía el valor es None; nunca se sustituye por una IV inventada.
+        """
+        reading = self.get_market_iv_reading(currency)
+        if reading.stale:
+            logger.warning("IV %s caducada o no disponible (%s); última lectura: %s", currency,
+                           reading.error or "sin datos todavía", reading.value)
+        return reading.value, reading.stale
+
+    def get_market_iv_reading(self, currency="ETH"):
+        """
+        IVReading(currency, value, updated_at, stale, error): no bloquea salvo en la
+        primera lectura del proceso (como mucho `timeout` segundos).
+        """
+        # Caché por endpoint; el fetcher (cliente y timeout de este proveedor) va en cada lectura
+        return get_iv_cache(self.dvol_url).get(currency, wait=self.timeout, fetcher=self._fetch_market_iv)
+
+    def _fetch_market_iv(self, currency):
+        """Descarga solo las últimas velas diarias del DVOL (no la serie completa)"""
+        end_ms = int(time.time()*1000)
+        params = {
+            "currency": currency.upper(),
+            "resolution": "1D",
+            "start_timestamp": end_ms - 3 * 24 * 3600 * 1000,
+            "end_timestamp": end_ms
+        }
+        try:
+            with metrics.get_registry().stage("iv.fetch"):
+                data = self.http.get(self.dvol_url, params=params, timeout=self.timeout).json()
             return data['result']['data'][-1][4] / 100.0
-        except Exception as e:
-            print(f"Error Deribit: {e}")
-            return 0.55 
+        except Exception:
+            metrics.get_registry().inc("fetch_errors_total", endpoint="deribit")
+            raise
 
     def get_all_pools(self):
-        """API 1: Listado general"""
+        """API 1: Listado general (las llamadas simultáneas comparten la descarga)"""
+        try:
+            return self.flight.do(("pools", self.base_url), self._get_all_pools, timeout=self.timeout)
+        except TimeoutError as e:
+            metrics.get_registry().inc("fetch_errors_total", endpoint="pools")
+            print(f"Error listado pools: {e}")
+            return []
+
+    def _get_all_pools(self):
         endpoint = f"{self.base_url}/pools"
+        registry = metrics.get_registry()
         try:
-            response = requests.get(endpoint, headers=self.headers)
-            return response.json().get('pools', [])
+            with registry.stage("listing.fetch"):
+                response = self.http.get(endpoint, headers=self.headers, timeout=self.timeout, stream=True)
+            # Pool a pool desde la red: nunca están a la vez el cuerpo entero y los dicts decodificados
+            with registry.stage("listing.json_decode"):
+                return list(self._stream_pools(response))
         except Exception as e:
+            registry.inc("fetch_errors_total", endpoint="pools")
+            print(f"Error listado pools: {e}")
             return []
 
-    def get_pool_history(self, pool_address):
-        """API 2: Devuelve el OBJETO COMPLETO del pool (info + history)"""
+    def _listing_source(self, validators):
+        """
+        (pools, validadores) del listado /pools. Petición condicional (If-None-Match /
+        If-Modified-Since): si no ha cambiado (304) devuelve (None, validadores) sin cuerpo.
+        `pools` es un generador que decodifica la respuesta en streaming, pool a pool.
+        """
+        headers = dict(self.headers)
+        if validators.get("etag"): headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"): headers["If-Modified-Since"] = validators["last_modified"]
+
+        response = self.http.get(f"{self.base_url}/pools", headers=headers, timeout=self.timeout, stream=True)
+        if response.status_code == 304:
+            response.close()
+            return None, validators
+        validators = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+        return self._stream_pools(response), validators
+
+    @staticmethod
+    def _stream_pools(response):
+        try:
+            yield from iter_array_items(response.iter_content(CHUNK_SIZE), "pools")
+        finally:
+            response.close()
+
+    def get_pool_index(self):
+        """
+        Índice del listado /pools; se reconstruye solo al refrescar el listado (cada `listing_ttl`).
+        El listado se parsea en streaming guardando solo los campos indexados, y al caducar se
+        revalida con ETag / Last-Modified: si no ha cambiado se reutiliza el índice.
+        Si la revalidación falla se sigue sirviendo el índice anterior.
+        """
+        cls = DataProvider
+        registry = metrics.get_registry()
+        with cls._index_lock:
+            cached = cls._index_cache.get(self.base_url)
+            if cached and time.time() - cached[1] < self.listing_ttl:
+                registry.inc("listing_cache_total", result="hit")
+                return cached[0]
+
+            try:
+                with registry.stage("listing.fetch"):
+                    pools, validators = self._listing_source(cached[2] if cached else {})
+                if pools is None and cached:
+                    registry.inc("listing_cache_total", result="not_modified")
+                    cls._index_cache[self.base_url] = (cached[0], time.time(), validators)
+                    return cached[0]
+
+                registry.inc("listing_cache_total", result="miss")
+                with registry.stage("listing.index_build"):
+                    index = PoolIndex.from_stream(pools or [])
+            except Exception as e:
+                registry.inc("fetch_errors_total", endpoint="pools")
+                print(f"Error listado pools: {e}")
+                index = PoolIndex([])
+
+            # Un listado vacío (error de red) no se cachea: mejor el índice anterior, aunque esté caducado
+            if len(index):
+                cls._index_cache[self.base_url] = (index, time.time(), validators)
+            elif cached:
+                registry.inc("listing_cache_total", result="stale")
+                return cached[0]
+            return index
+
+    def get_pool_history(self, pool_address, timeout=None):
+        """
+        API 2: Devuelve el OBJETO COMPLETO del pool (info + history).
+        Las peticiones simultáneas del mismo pool comparten una sola descarga (y sincronización
+        del almacén) y reciben el mismo objeto; ninguna espera a la otra más de `timeout` segundos.
+        """
+        key = ("pool_history", self.base_url, getattr(self.store, "path", None), pool_address)
+        try:
+            return self.flight.do(key, lambda: self._get_pool_history(pool_address, timeout),
+                                  timeout=timeout or self.timeout)
+        except TimeoutError as e:
+            # Igual que un fallo de red: lo que haya en local (aunque esté caducado) o {}
+            metrics.get_registry().inc("fetch_errors_total", endpoint="history")
+            print(f"Error historial {pool_address}: {e}")
+            return self.store.get(pool_address) if self.store is not None else {}
+
+    def _get_pool_history(self, pool_address, timeout=None):
+        if self.store is None:
+            return self._fetch_pool_history(pool_address, timeout)
+
+        # Copia local fresca -> sin red
+        registry = metrics.get_registry()
+        if self.store.is_fresh(pool_address):
+            registry.inc("store_total", result="hit")
+            return self.store.get(pool_address)
+        registry.inc("store_total", result="miss")
+
+        # Sincronizamos: solo se añaden los snapshots nuevos
+        fresh = self._fetch_pool_history(pool_address, timeout)
+        if fresh:
+            self.store.save(pool_address, fresh)
+        # Si la API falla devolvemos lo que haya en local (aunque esté caducado)
+        return self.store.get(pool_address)
+
+    def _fetch_pool_history(self, pool_address, timeout=None):
         endpoint = f"{self.base_url}/pool/history"
         params = {"id": pool_address}
+        registry = metrics.get_registry()
         try:
-            response = requests.get(endpoint, params=params, headers=self.headers)
-            data = response.json()
+            with registry.stage("history.fetch"):
+                # `timeout` es el plazo TOTAL del pool (reintentos y esperas incluidos), no por intento
+                budget = timeout or self.timeout
+                response = self.http.get(endpoint, params=params, headers=self.headers, timeout=budget, deadline=budget)
+            with registry.stage("history.json_decode"):
+                data = response.json()
             # Devolvemos todo el objeto 'pool', no solo 'history', para acceder a poolName
             if "pool" in data and data["pool"]:
                 return data["pool"]
             return {}
-        except:
+        except Exception as e:
+            registry.inc("fetch_errors_total", endpoint="history")
+            print(f"Error historial {pool_address}: {e}")
             return {}
+
+    def get_pools_history(self, pool_addresses, max_workers=None, timeout=None):
+        """Descarga el historial de varios pools en paralelo.
+
+        Devuelve una lista en el MISMO orden que `pool_addresses` ({} si falla).
+        El tiempo total es aproximadamente el del lote más lento, no la suma.
+        """
+        addresses = list(pool_addresses)
+        if not addresses: return []
+
+        workers = max(1, min(max_workers or self.max_workers, len(addresses)))
+        if workers == 1:
+            return [self.get_pool_history(a, timeout=timeout) for a in addresses]
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # executor.map conserva el orden de entrada
+            return list(executor.map(lambda a: self.get_pool_history(a, timeout=timeout), addresses))
+
+    def iter_pools_history(self, pool_addresses, max_workers=None, timeout=None):
+        """Como get_pools_history, pero genera (address, pool) según van llegando (sin orden)."""
+        addresses = list(pool_addresses)
+        if not addresses: return
+
+        workers = max(1, min(max_workers or self.max_workers, len(addresses)))
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            futures = {executor.submit(self.get_pool_history, a, timeout): a for a in addresses}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            # Si el consumidor deja de iterar, cancelamos lo pendiente
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class SnapshotDirectoryProvider(DataProvider):
+    """
+    DataProvider sin red que lee un directorio de snapshots con la misma forma que la API:
+
+        <dir>/pools.json                 {"pools": [...]}           (listado /pools)
+        <dir>/history/<address>.json     {"pool": {..., "history"}} (/pool/history)
+
+    Se crea con `save_snapshot_dir` (o el job "snapshot" del CLI).
+    """
+
+    def __init__(self, directory, **kwargs):
+        kwargs.setdefault("store", False)
+        super().__init__(**kwargs)
+        self.directory = os.path.abspath(directory)
+        # Clave propia en la caché de índices compartida
+        self.base_url = f"file://{self.directory}"
+
+    def _read_json(self, path):
+        with open(path) as f:
+            return json.load(f)
+
+    def _listing_source(self, validators):
+        return self.get_all_pools(), {}
+
+    def get_all_pools(self):
+        registry = metrics.get_registry()
+        try:
+            with registry.stage("listing.json_decode"):
+                data = self._read_json(os.path.join(self.directory, "pools.json"))
+            return data.get('pools', []) if isinstance(data, dict) else data
+        except Exception as e:
+            registry.inc("fetch_errors_total", endpoint="pools")
+            print(f"Error listado pools ({self.directory}): {e}")
+            return []
+
+    def _fetch_pool_history(self, pool_address, timeout=None):
+        path = os.path.join(self.directory, "history", f"{pool_address}.json")
+        if not os.path.exists(path): return {}
+        registry = metrics.get_registry()
+        try:
+            with registry.stage("history.json_decode"):
+                data = self._read_json(path)
+            if isinstance(data, dict) and "pool" in data:
+                return data["pool"] or {}
+            return data or {}
+        except Exception as e:
+            registry.inc("fetch_errors_total", endpoint="history")
+            print(f"Error historial {pool_address}: {e}")
+            return {}
+
+    def get_market_iv_reading(self, currency="ETH"):
+        return IVReading(currency.upper(), None, None, True, "sin red (directorio de snapshots)")
+
+
+def save_snapshot_dir(directory, pools, details):
+    """Escribe un directorio de snapshots: listado + {address: objeto pool} de historiales."""
+    os.makedirs(os.path.join(directory, "history"), exist_ok=True)
+    with open(os.path.join(directory, "pools.json"), "w") as f:
+        json.dump({"pools": pools}, f)
+    written = 0
+    for address, pool in details.items():
+        if not pool: continue
+        with open(os.path.join(directory, "history", f"{address}.json"), "w") as f:
+            json.dump({"pool": pool}, f)
+        written += 1
+    return written
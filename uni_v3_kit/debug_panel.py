@@ -0,0 +1,39 @@
+import pandas as pd
+
+from . import metrics
+
+
+def render_metrics_panel(registry=None, expanded=False):
+    """
+    Panel de depuración (Streamlit) con los tiempos por etapa y los contadores.
+    Uso en una página: `render_metrics_panel()` dentro del sidebar o al final.
+    """
+    import streamlit as st
+
+    registry = registry or metrics.get_registry()
+    snapshot = registry.snapshot()
+
+    with st.expander("🛠️ Métricas de rendimiento", expanded=expanded):
+        stages = [
+            {"Etapa": h["labels"].get("stage", ""), "Llamadas": h["count"],
+             "Total (s)": h["sum"], "Media (ms)": h["avg"] * 1000.0}
+            for h in snapshot["histograms"] if h["metric"] == "stage_seconds"
+        ]
+        if stages:
+            st.dataframe(pd.DataFrame(stages).sort_values("Total (s)", ascending=False),
+                         hide_index=True, use_container_width=True)
+
+        counters = [
+            {"Métrica": c["metric"], "Etiquetas": ", ".join(f"{k}={v}" for k, v in c["labels"].items()),
+             "Valor": c["value"]}
+            for c in snapshot["counters"]
+        ]
+        if counters:
+            st.dataframe(pd.DataFrame(counters), hide_index=True, use_container_width=True)
+
+        if not stages and not counters:
+            st.caption("Sin métricas todavía.")
+
+        st.code(registry.render_prometheus(), language="text")
+        if st.button("Reiniciar métricas"):
+            registry.reset()
@@ -0,0 +1,143 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Un snapshot nuevo cada 8 horas
+SNAPSHOT_PERIOD_SECONDS = 8 * 3600
+
+class HistoryStore:
+    """
+    Almacén local (SQLite) del historial de pools, indexado por (dirección, date).
+
+    - `ttl`: segundos durante los que una copia se considera fresca (sin red).
+    - `expire_after`: segundos sin sincronizar tras los que un pool se borra
+      (se purga al abrir y, como mucho una vez cada `ttl`, al sincronizar).
+    El historial se devuelve igual que la API: más reciente primero.
+    """
+
+    def __init__(self, path="pool_history.db", ttl=SNAPSHOT_PERIOD_SECONDS, expire_after=7 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self.expire_after = expire_after
+        self._lock = threading.Lock()
+        self._last_expire = 0.0
+
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+
+        # Una conexión compartida entre hilos (protegida por el lock)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pools ("
+                " address TEXT PRIMARY KEY, meta TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                " address TEXT NOT NULL, date TEXT NOT NULL, data TEXT NOT NULL,"
+                " PRIMARY KEY (address, date))"
+            )
+            self._conn.commit()
+        self.maybe_expire()
+
+    @staticmethod
+    def _key(address):
+        return str(address).lower()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def is_fresh(self, address):
+        """True si el pool se sincronizó hace menos de `ttl` segundos."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched_at FROM pools WHERE address = ?", (self._key(address),)
+            ).fetchone()
+        return bool(row) and (time.time() - row[0]) < self.ttl
+
+    def latest_date(self, address):
+        """Fecha del snapshot más reciente guardado (o None)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(date) FROM snapshots WHERE address = ?", (self._key(address),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get(self, address):
+        """Devuelve el objeto pool (info + history) guardado, o {} si no existe."""
+        key = self._key(address)
+        with self._lock:
+            meta_row = self._conn.execute(
+                "SELECT meta FROM pools WHERE address = ?", (key,)
+            ).fetchone()
+            if not meta_row: return {}
+            rows = self._conn.execute(
+                "SELECT data FROM snapshots WHERE address = ? ORDER BY date DESC", (key,)
+            ).fetchall()
+
+        pool = json.loads(meta_row[0])
+        pool['history'] = [json.loads(r[0]) for r in rows]
+        return pool
+
+    def save(self, address, pool_detail):
+        """
+        Sincroniza un pool descargado de la API.
+        Se insertan los snapshots nuevos y se reescriben los ya guardados cuyo contenido
+        haya cambiado (la API puede revisar un snapshot reciente conservando su fecha).
+        Devuelve el número de snapshots añadidos o actualizados.
+        """
+        if not pool_detail: return 0
+
+        key = self._key(address)
+        meta = {k: v for k, v in pool_detail.items() if k != 'history'}
+        incoming = {}
+        for snap in pool_detail.get('history') or []:
+            date = snap.get('date')
+            if date is None: continue
+            incoming[str(date)] = snap
+
+        with self._lock:
+            # Solo se compara el tramo que cubre la descarga (la API devuelve una ventana reciente)
+            stored = {}
+            if incoming:
+                stored = dict(self._conn.execute(
+                    "SELECT date, data FROM snapshots WHERE address = ? AND date >= ?", (key, min(incoming))
+                ).fetchall())
+            changed = [(key, date, json.dumps(snap)) for date, snap in incoming.items()
+                       if date not in stored or json.loads(stored[date]) != snap]
+
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pools (address, meta, fetched_at) VALUES (?, ?, ?)",
+                (key, json.dumps(meta), time.time())
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO snapshots (address, date, data) VALUES (?, ?, ?)", changed
+            )
+            self._conn.commit()
+        self.maybe_expire()
+        return len(changed)
+
+    def maybe_expire(self):
+        """Llama a expire() si no se ha hecho en los últimos `ttl` segundos (coste amortizado)."""
+        now = time.time()
+        with self._lock:
+            if now - self._last_expire < self.ttl: return 0
+            self._last_expire = now
+        return self.expire()
+
+    def expire(self):
+        """Borra los pools que no se sincronizan desde hace `expire_after` segundos."""
+        cutoff = time.time() - self.expire_after
+        with self._lock:
+            stale = [r[0] for r in self._conn.execute(
+                "SELECT address FROM pools WHERE fetched_at < ?", (cutoff,)
+            ).fetchall()]
+            for key in stale:
+                self._conn.execute("DELETE FROM snapshots WHERE address = ?", (key,))
+                self._conn.execute("DELETE FROM pools WHERE address = ?", (key,))
+            self._conn.commit()
+        return len(stale)
@@ -0,0 +1,211 @@
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+from . import metrics
+
+# Códigos que indican saturación/fallo transitorio del servidor -> reintentar
+RETRY_STATUS = (429, 500, 502, 503, 504)
+# Códigos con los que la API nos pide explícitamente que bajemos el ritmo
+PUSHBACK_STATUS = (429, 503)
+
+
+class AIMDLimiter:
+    """
+    Limitador de concurrencia adaptativo (Additive Increase / Multiplicative Decrease).
+    Cada respuesta correcta sube el límite en `increase`; cada rechazo (429/503)
+    lo multiplica por `decrease`. Nunca baja de `minimum` ni sube de `maximum`.
+    """
+
+    def __init__(self, initial=8, minimum=1, maximum=64, increase=1.0, decrease=0.5):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self._limit = float(max(minimum, min(initial, maximum)))
+        self._in_flight = 0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    def acquire(self):
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+    def on_success(self):
+        with self._cond:
+            # Incremento aditivo repartido entre la ventana actual (como TCP)
+            self._limit = min(self.maximum, self._limit + self.increase / max(self._limit, 1.0))
+            self._cond.notify_all()
+
+    def on_pushback(self):
+        with self._cond:
+            self._limit = max(self.minimum, self._limit * self.decrease)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+
+class HttpClient:
+    """
+    Cliente HTTP con una sesión keep-alive por host, timeouts, reintentos con
+    backoff exponencial (429/5xx y errores de red) y limitador AIMD por host.
+    """
+
+    def __init__(self, timeout=10, retries=3, backoff_factor=0.5, max_backoff=30.0,
+                 pool_size=32, headers=None, limiter_factory=None):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.pool_size = pool_size
+        self.headers = headers or {'User-Agent': 'Mozilla/5.0'}
+        self.limiter_factory = limiter_factory or (lambda: AIMDLimiter(maximum=pool_size))
+        self._sessions = {}
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def _host(self, url):
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc}"
+
+    def session_for(self, url):
+        """Sesión (pool de conexiones keep-alive) compartida para el host de `url`."""
+        host = self._host(url)
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                # requests se importa con la primera sesión (no al importar el paquete)
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                session.headers.update(self.headers)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+                self._limiters[host] = self.limiter_factory()
+            return session
+
+    def limiter_for(self, url):
+        self.session_for(url)
+        return self._limiters[self._host(url)]
+
+    def _sleep_backoff(self, attempt, response=None, ends_at=None):
+        """Espera antes del siguiente intento; False si no cabe antes de `ends_at` (no se reintenta)."""
+        delay = None
+        if response is not None:
+            # Respetamos Retry-After si el servidor lo indica en segundos
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                delay = float(retry_after)
+        if delay is None:
+            delay = self.backoff_factor * (2 ** attempt)
+            delay *= random.uniform(0.5, 1.5)  # jitter para no sincronizar reintentos
+        delay = min(delay, self.max_backoff)
+        if ends_at is not None and time.monotonic() + delay >= ends_at:
+            return False
+        time.sleep(delay)
+        return True
+
+    def get(self, url, params=None, headers=None, timeout=None, stream=False, deadline=None):
+        """
+        GET con reintentos. Devuelve la respuesta (status < 400) o lanza
+        la última excepción cuando se agotan los reintentos.
+        stream=True no descarga el cuerpo: quien llama lo lee (iter_content) y cierra la respuesta.
+        deadline: segundos TOTALES para todos los intentos y esperas (cada intento usa como
+        mucho lo que quede); sin él, cada intento tiene `timeout` y los reintentos se suman.
+        """
+        import requests
+
+        session = self.session_for(url)
+        limiter = self.limiter_for(url)
+        host = urlparse(url).netloc
+        registry = metrics.get_registry()
+        last_error = None
+        timeout = timeout or self.timeout
+        ends_at = None if deadline is None else time.monotonic() + deadline
+
+        for attempt in range(self.retries + 1):
+            attempt_timeout = timeout
+            if ends_at is not None:
+                remaining = ends_at - time.monotonic()
+                if remaining <= 0: break
+                attempt_timeout = min(timeout, remaining)
+            if attempt:
+                registry.inc("http_retries_total", host=host)
+            try:
+                with limiter, registry.timer("http_request_seconds", host=host):
+                    response = session.get(url, params=params, headers=headers, timeout=attempt_timeout, stream=stream)
+            except requests.Timeout as e:
+                # Un endpoint lento no es el servidor pidiendo que bajemos el ritmo: no toca el límite AIMD
+                registry.inc("http_requests_total", host=host, status="timeout")
+                last_error = e
+                if attempt < self.retries and not self._sleep_backoff(attempt, ends_at=ends_at): break
+                continue
+            except requests.ConnectionError as e:
+                registry.inc("http_requests_total", host=host, status="error")
+                last_error = e
+                limiter.on_pushback()
+                if attempt < self.retries and not self._sleep_backoff(attempt, ends_at=ends_at): break
+                continue
+
+            registry.inc("http_requests_total", host=host, status=response.status_code)
+            if response.status_code in RETRY_STATUS:
+                if response.status_code in PUSHBACK_STATUS:
+                    registry.inc("http_pushback_total", host=host)
+                    limiter.on_pushback()
+                last_error = requests.HTTPError(f"HTTP {response.status_code} en {url}", response=response)
+                if stream: response.close()
+                if attempt < self.retries and not self._sleep_backoff(attempt, response, ends_at): break
+                continue
+
+            limiter.on_success()
+            if stream and response.status_code >= 400: response.close()
+            response.raise_for_status()
+            if stream:
+                # El cuerpo aún no se ha leído: se cuenta lo que anuncia el servidor
+                size = response.headers.get('Content-Length', '')
+                if size.isdigit(): registry.inc("http_response_bytes_total", int(size), host=host)
+            else:
+                registry.inc("http_response_bytes_total", len(response.content), host=host)
+            return response
+
+        if last_error is None:
+            last_error = requests.Timeout(f"Sin tiempo para pedir {url} (deadline {deadline}s)")
+        raise last_error
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._limiters.clear()
+
+
+_shared_client = None
+_shared_lock = threading.Lock()
+
+def get_shared_client():
+    """Cliente único por proceso: todas las instancias reutilizan las mismas conexiones."""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = HttpClient()
+        return _shared_client
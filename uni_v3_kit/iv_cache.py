@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from . import metrics
+
+# value: IV anualizada en decimal (None si nunca se obtuvo); updated_at: epoch de la última lectura buena
+# stale: True si falta o es más antigua que el TTL; error: último error de refresco (o None)
+IVReading = namedtuple("IVReading", ["currency", "value", "updated_at", "stale", "error"])
+
+
+# Fuentes (endpoints) con caché propia; cada una mantiene un hilo de refresco
+MAX_SHARED_CACHES = 8
+
+
+class _Entry:
+    __slots__ = ("value", "updated_at", "error", "refreshing", "ready", "fetcher")
+
+    def __init__(self):
+        self.fetcher = None
+        self.value = None
+        self.updated_at = None
+        self.error = None
+        self.refreshing = False
+        self.ready = threading.Event()
+
+
+class ImpliedVolCache:
+    """
+    Caché de volatilidad implícita por divisa, compartida por todo el proceso.
+
+    Los lectores nunca esperan a la red: reciben el último valor con su antigüedad y
+    una marca `stale`. Un hilo en segundo plano refresca cada `refresh_interval`
+    segundos todas las divisas consultadas; si una lectura encuentra el valor caducado
+    dispara además un refresco asíncrono (uno solo en vuelo por divisa).
+
+    El `fetcher(currency)` llega en cada lectura (cliente HTTP y timeout del proveedor que
+    pregunta) y el hilo de fondo usa el último recibido para esa divisa.
+    """
+
+    def __init__(self, fetcher=None, ttl=900, refresh_interval=300):
+        self.fetcher = fetcher
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _entry(self, currency, fetcher=None):
+        with self._lock:
+            entry = self._entries.get(currency)
+            if entry is None:
+                entry = self._entries[currency] = _Entry()
+            if fetcher is not None:
+                entry.fetcher = fetcher
+            return entry
+
+    def _reading(self, currency, entry):
+        stale = entry.updated_at is None or (time.time() - entry.updated_at) > self.ttl
+        return IVReading(currency, entry.value, entry.updated_at, stale, entry.error)
+
+    def refresh(self, currency, fetcher=None):
+        """Refresco síncrono de una divisa (lo usa el hilo de fondo)."""
+        currency = currency.upper()
+        entry = self._entry(currency, fetcher)
+        try:
+            value = (entry.fetcher or self.fetcher)(currency)
+            with self._lock:
+                entry.value = value
+                entry.updated_at = time.time()
+                entry.error = None
+        except Exception as e:
+            with self._lock:
+                entry.error = str(e)
+            print(f"Error refrescando IV {currency}: {e}")
+        finally:
+            with self._lock:
+                entry.refreshing = False
+            entry.ready.set()
+        return self._reading(currency, entry)
+
+    def _refresh_async(self, currency, entry):
+        with self._lock:
+            if entry.refreshing: return
+            entry.refreshing = True
+        threading.Thread(target=self.refresh, args=(currency,), daemon=True).start()
+
+    def get(self, currency="ETH", wait=0, fetcher=None):
+        """
+        Lectura no bloqueante. Con `wait` > 0 y sin ningún valor previo, espera como
+        mucho `wait` segundos a la primera descarga (compartida entre lectores).
+        """
+        currency = currency.upper()
+        self.start()
+        entry = self._entry(currency, fetcher)
+        reading = self._reading(currency, entry)
+        registry = metrics.get_registry()
+
+        if reading.stale:
+            self._refresh_async(currency, entry)
+            # Se mira la lectura tomada antes del refresco: si ya ha terminado, se relee igualmente
+            if reading.value is None and wait:
+                entry.ready.wait(wait)
+                reading = self._reading(currency, entry)
+        registry.inc("iv_cache_total", result="empty" if reading.value is None else ("stale" if reading.stale else "hit"))
+        return reading
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            with self._lock:
+                currencies = list(self._entries)
+            for currency in currencies:
+                self.refresh(currency)
+
+    def start(self):
+        """Arranca el hilo de refresco (idempotente)."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="iv-cache-refresh", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+_shared_caches = OrderedDict()
+_shared_lock = threading.Lock()
+
+def get_iv_cache(key):
+    """
+    Caché única por proceso para cada fuente `key` (la URL del endpoint). Como mucho
+    MAX_SHARED_CACHES fuentes: al pasar del límite se para y descarta la menos usada.
+    """
+    with _shared_lock:
+        cache = _shared_caches.get(key)
+        if cache is None:
+            cache = _shared_caches[key] = ImpliedVolCache()
+            while len(_shared_caches) > MAX_SHARED_CACHES:
+                _shared_caches.popitem(last=False)[1].stop()
+        else:
+            _shared_caches.move_to_end(key)
+        return cache
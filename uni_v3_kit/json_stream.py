@@ -0,0 +1,117 @@
+"""
+Lectura incremental de un array JSON grande (p.ej. el listado /pools) a partir de trozos
+de bytes: cada elemento se decodifica con el decodificador C de `json` en cuanto está
+completo en el buffer, sin tener nunca el documento entero (ni su árbol) en memoria.
+"""
+import codecs
+import json
+import re
+
+CHUNK_SIZE = 256 * 1024
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "0123456789.eE+-"
+_decoder = json.JSONDecoder()
+# Separador tras un elemento del array (y espacios hasta el siguiente)
+_SEPARATOR = re.compile(r"[ \t\n\r]*([,\]])[ \t\n\r]*")
+
+
+class _Reader:
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        """Añade el siguiente trozo al buffer (descartando lo ya consumido). False al final."""
+        if self.eof: return False
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self.eof = True
+            text = self._utf8.decode(b"", final=True)
+        else:
+            text = self._utf8.decode(chunk) if isinstance(chunk, bytes) else chunk
+        self.buf = self.buf[self.pos:] + text
+        self.pos = 0
+        return bool(text) or not self.eof
+
+    def peek(self):
+        """Siguiente carácter que no es espacio (sin consumirlo)."""
+        while True:
+            buf, pos = self.buf, self.pos
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(buf): return buf[pos]
+            if not self._fill():
+                raise ValueError("JSON incompleto")
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"JSON inesperado: se esperaba '{char}' y hay '{found}'")
+        self.pos += 1
+
+    def decode(self):
+        """Siguiente valor JSON completo."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Valor cortado por el final del trozo: se lee más y se reintenta
+                if not self._fill(): raise
+                continue
+            # Un número cortado ("1." de "1.5") se decodifica igual: hace falta ver lo que le sigue
+            if not isinstance(value, (dict, list, str)) and (end == len(self.buf) or self.buf[end] in _NUMBER_CHARS):
+                if self._fill(): continue
+            self.pos = end
+            return value
+
+
+def iter_array_items(chunks, key=None):
+    """
+    Genera los elementos del array `key` del objeto raíz (o del array raíz; también si el
+    documento es directamente un array). El resto de claves del objeto se decodifican y
+    se descartan. `chunks`: iterable de bytes/str (p.ej. response.iter_content()).
+    """
+    reader = _Reader(chunks)
+    if reader.peek() == "{":
+        reader.expect("{")
+        if reader.peek() == "}": return
+        while True:
+            name = reader.decode()
+            reader.expect(":")
+            if key is not None and name == key: break
+            reader.decode()
+            if reader.peek() == "}": return
+            reader.expect(",")
+
+    reader.expect("[")
+    if reader.peek() == "]": return
+    scan = _decoder.scan_once
+    while True:
+        # Camino rápido: todos los elementos completos que ya están en el buffer
+        reader.peek()
+        buf, pos = reader.buf, reader.pos
+        while True:
+            try:
+                value, end = scan(buf, pos)
+            except (StopIteration, json.JSONDecodeError):
+                break
+            separator = _SEPARATOR.match(buf, end)
+            # Sin separador visible: fin del buffer (quizá a mitad de un número) o JSON inválido
+            if separator is None: break
+            yield value
+            if separator.group(1) == "]":
+                reader.pos = separator.end()
+                return
+            pos = separator.end()
+        reader.pos = pos
+
+        # El elemento que cruza el final del trozo (o un error de formato)
+        yield reader.decode()
+        if reader.peek() == "]": return
+        reader.expect(",")
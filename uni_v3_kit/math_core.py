@@ -1,6 +1,41 @@
 import math
+from collections import deque
+from functools import lru_cache
 import numpy as np
 
+
+def _is_array(*values):
+    return any(isinstance(v, np.ndarray) for v in values)
+
+
+def _il_at_limit_array(range_width_pct):
+    """IL al límite en forma cerrada (vectorizado). Por unidad de liquidez, entrando en P=1:
+    x0 = 1 - 1/√Pb, y0 = 1 - √Pa; en Pa el pool vale √Pa(√Pb-√Pa)/√Pb y en Pb vale √Pb-√Pa.
+    """
+    w = np.maximum(range_width_pct, 0.001)
+    # Con w >= 1 el límite inferior es <= 0 y la simulación original no tiene solución (-> 0)
+    valid = w < 1.0
+    w = np.where(valid, w, 0.5)
+
+    p_min, p_max = 1.0 - w, 1.0 + w
+    sqrt_a, sqrt_b = np.sqrt(p_min), np.sqrt(p_max)
+    x0 = 1.0 - 1.0 / sqrt_b
+    y0 = 1.0 - sqrt_a
+
+    val_hodl_min = x0 * p_min + y0
+    val_pool_min = sqrt_a * (sqrt_b - sqrt_a) / sqrt_b
+    val_hodl_max = x0 * p_max + y0
+    val_pool_max = sqrt_b - sqrt_a
+
+    il_min = np.abs(val_pool_min / val_hodl_min - 1.0)
+    il_max = np.abs(val_pool_max / val_hodl_max - 1.0)
+    return np.where(valid, np.maximum(il_min, il_max), 0.0)
+
+
+@lru_cache(maxsize=4096)
+def _il_at_limit_scalar(range_width_pct):
+    return float(_il_at_limit_array(np.array(range_width_pct)))
+
 class V3Math:
     @staticmethod
     def calculate_realized_volatility(price_history):
@@ -20,74 +55,37 @@ class V3Math:
     def calculate_il_risk_cost(volatility_annual):
         return (volatility_annual ** 2) / 2
 
-    # --- CÁLCULO EXACTO DE IL EN V3 (SIMULACIÓN) ---
+    # --- CÁLCULO EXACTO DE IL EN V3 (FORMA CERRADA) ---
     @staticmethod
     def calculate_v3_il_at_limit(range_width_pct):
         """
         Calcula el Impermanent Loss exacto de Uniswap V3 al tocar el límite del rango.
-        Simula una posición de 1000 USD y compara el valor final en el pool vs HODL.
+        Acepta un escalar o un array de anchos (devuelve lo mismo).
+
+        Equivale a simular una posición en P=1 con rango [1-w, 1+w] y comparar pool vs HODL
+        en cada límite; L se cancela, así que se evalúa en forma cerrada.
         """
-        try:
-            width = max(range_width_pct, 0.001)
-            
-            # 1. Definimos escenario normalizado
-            P_entry = 1.0
-            
-            # Rango simétrico porcentual: P * (1 +/- width)
-            P_min = P_entry * (1 - width)
-            P_max = P_entry * (1 + width)
-            
-            # 2. Inversión teórica de 1000 USD para simular
-            investment = 1000.0
-            
-            # 3. Calcular Liquidez (L) y Tokens Iniciales (HODL Stack) al entrar
-            # Usamos las fórmulas de V3 para obtener x0 (Base) e y0 (Quote)
-            L = V3Math.get_liquidity_for_amount(investment, P_entry, P_min, P_max)
-            
-            if L == 0: return 0.0
-            
-            # Tokens iniciales que compramos (x0=Base, y0=Quote)
-            x0, y0 = V3Math.calculate_amounts(L, math.sqrt(P_entry), math.sqrt(P_min), math.sqrt(P_max))
-            
-            # --- ESCENARIO A: El precio baja hasta P_min (Límite Inferior) ---
-            # En P_min, el pool se llena de Token Base (x). y = 0.
-            
-            # Valor HODL en P_min (nuestros tokens originales valorados a precio bajo)
-            val_hodl_min = (x0 * P_min) + y0
-            
-            # Valor POOL en P_min
-            # Calculamos qué tokens tenemos realmente en el pool a precio P_min
-            # (Todo X, nada Y)
-            x_min, y_min = V3Math.calculate_amounts(L, math.sqrt(P_min), math.sqrt(P_min), math.sqrt(P_max))
-            val_pool_min = (x_min * P_min) + y_min
-            
-            il_min = (val_pool_min - val_hodl_min) / val_hodl_min if val_hodl_min > 0 else 0
-            
-            # --- ESCENARIO B: El precio sube hasta P_max (Límite Superior) ---
-            # En P_max, el pool se llena de Token Quote (y). x = 0.
-            
-            # Valor HODL en P_max
-            val_hodl_max = (x0 * P_max) + y0
-            
-            # Valor POOL en P_max
-            # (Nada X, todo Y)
-            x_max, y_max = V3Math.calculate_amounts(L, math.sqrt(P_max), math.sqrt(P_min), math.sqrt(P_max))
-            val_pool_max = (x_max * P_max) + y_max
-            
-            il_max = (val_pool_max - val_hodl_max) / val_hodl_max if val_hodl_max > 0 else 0
-            
-            # Devolvemos la peor pérdida (máximo IL posible en el rango) en valor absoluto positivo
-            # Nota: IL siempre es negativo, devolvemos el % de pérdida como positivo (ej 0.05 para 5%)
-            return max(abs(il_min), abs(il_max))
-            
-        except Exception as e:
-            print(f"Error calculando IL: {e}")
-            return 0.0
+        if np.ndim(range_width_pct) == 0:
+            try:
+                return _il_at_limit_scalar(float(range_width_pct))
+            except Exception as e:
+                print(f"Error calculando IL: {e}")
+                return 0.0
+        return _il_at_limit_array(np.asarray(range_width_pct, dtype=float))
 
     # --- Fórmulas Oficiales Uniswap V3 ---
     @staticmethod
     def get_liquidity_for_amount(amount_usd, price_current, price_min, price_max):
-        """Calcula L dado un valor en USD y el rango (Asumiendo P_quote = 1 USD)"""
+        """Calcula L dado un valor en USD y el rango (Asumiendo P_quote = 1 USD). Admite arrays."""
+        if _is_array(amount_usd, price_current, price_min, price_max):
+            amount_usd, p, pa, pb = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (amount_usd, price_current, price_min, price_max)))
+            inside = (p > pa) & (p < pb)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                sqrt_p, sqrt_a, sqrt_b = np.sqrt(p), np.sqrt(pa), np.sqrt(pb)
+                cost_unit_usd = ((1 / sqrt_p) - (1 / sqrt_b)) * p + (sqrt_p - sqrt_a)
+                L = amount_usd / cost_unit_usd
+            return np.where(inside & (cost_unit_usd != 0), L, 0.0)
+
         if price_current <= price_min or price_current >= price_max: return 0 
         
         sqrt_p = math.sqrt(price_current)
@@ -111,7 +109,18 @@ class V3Math:
 
     @staticmethod
     def calculate_amounts(liquidity, sqrt_p, sqrt_a, sqrt_b):
-        """Calcula cantidad real de tokens x e y dado L y precios (Raíces)"""
+        """Calcula cantidad real de tokens x e y dado L y precios (Raíces). Admite arrays (broadcasting)."""
+        if _is_array(liquidity, sqrt_p, sqrt_a, sqrt_b):
+            L, sp, sa, sb = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (liquidity, sqrt_p, sqrt_a, sqrt_b)))
+            below = sp <= sa
+            above = ~below & (sp >= sb)
+            # El precio efectivo se acota al rango: debajo -> sqrt_a, encima -> sqrt_b
+            sp_eff = np.clip(sp, sa, np.maximum(sa, sb))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                amount_x = np.where(above, 0.0, L * (sb - sp_eff) / (sp_eff * sb))
+            amount_y = np.where(below, 0.0, L * (sp_eff - sa))
+            return amount_x, amount_y
+
         # Caso 1: Precio debajo del rango (P <= Pa) -> Todo es Token X (Base)
         if sqrt_p <= sqrt_a:
             amount_x = liquidity * (sqrt_b - sqrt_a) / (sqrt_a * sqrt_b)
@@ -139,3 +148,144 @@ class V3Math:
             return min(multiplier, 100.0)
         except:
             return 1.0
+
+
+class RollingVolatility:
+    """
+    Volatilidad realizada de cualquier ventana [start, end) en O(1).
+
+    Precalcula una vez las sumas acumuladas de los log-retornos (y sus cuadrados)
+    de la serie cronológica de precios. Reproduce calculate_realized_volatility:
+    se ignoran precios <= 0 / inválidos, desviación poblacional y 0.80 por defecto
+    si la ventana tiene menos de 5 muestras o menos de 2 precios válidos.
+    """
+
+    DEFAULT_VOL = 0.80
+
+    def __init__(self, prices):
+        prices = np.asarray(prices, dtype=float)
+        self.size = len(prices)
+
+        valid = np.isfinite(prices) & (prices > 0)
+        # Posiciones (en la serie original) de los precios válidos
+        self._pos = np.flatnonzero(valid)
+        returns = np.diff(np.log(prices[valid]))
+
+        # Centramos los retornos para evitar cancelación numérica en sum(r²) - sum(r)²/n
+        self._shift = float(returns.mean()) if len(returns) else 0.0
+        centered = returns - self._shift
+        self._s1 = np.concatenate(([0.0], np.cumsum(centered)))
+        self._s2 = np.concatenate(([0.0], np.cumsum(centered * centered)))
+
+    def annualized(self, start, end):
+        """Volatilidad anualizada de los precios[start:end]."""
+        # Camino escalar sin arrays temporales: se llama en cada rebalanceo
+        start = min(max(int(start), 0), self.size)
+        end = min(max(int(end), 0), self.size)
+        if end - start < 5: return self.DEFAULT_VOL
+
+        a = int(self._pos.searchsorted(start, side='left'))
+        b = int(self._pos.searchsorted(end, side='left'))
+        n = b - a - 1
+        if n < 1: return self.DEFAULT_VOL
+
+        mean = float(self._s1[b - 1] - self._s1[a]) / n
+        var = float(self._s2[b - 1] - self._s2[a]) / n - mean * mean
+        return math.sqrt(max(var, 0.0)) * math.sqrt(365)
+
+    def annualized_many(self, starts, ends):
+        """Versión vectorizada: una volatilidad por cada par (start, end)."""
+        starts = np.clip(np.asarray(starts, dtype=np.int64), 0, self.size)
+        ends = np.clip(np.asarray(ends, dtype=np.int64), 0, self.size)
+
+        a = np.searchsorted(self._pos, starts, side='left')
+        b = np.searchsorted(self._pos, ends, side='left')
+        n_returns = b - a - 1
+
+        ok = ((ends - starts) >= 5) & (n_returns >= 1)
+        lo = np.where(ok, a, 0)
+        hi = np.where(ok, b - 1, 0)
+        n = np.where(ok, n_returns, 1)
+
+        mean = (self._s1[hi] - self._s1[lo]) / n
+        var = (self._s2[hi] - self._s2[lo]) / n - mean * mean
+        vol = np.sqrt(np.maximum(var, 0.0)) * math.sqrt(365)
+        return np.where(ok, vol, self.DEFAULT_VOL)
+
+
+class StreamingVolatility:
+    """
+    Volatilidad realizada de los últimos `window` precios, actualizable en O(1) por precio.
+
+    Misma regla que calculate_realized_volatility sobre esa ventana: se ignoran precios
+    <= 0 / inválidos, desviación poblacional y 0.80 si hay menos de 5 filas o menos de
+    2 precios válidos. Guarda sumas de los retornos (y sus cuadrados) entre precios
+    válidos consecutivos dentro de la ventana; se recalculan cada `window` precios para
+    no acumular error de redondeo.
+    """
+
+    DEFAULT_VOL = 0.80
+
+    def __init__(self, window):
+        self.window = int(window)
+        self.prices = deque()
+        self._returns = deque()
+        self._last_valid = None
+        self._s1 = 0.0
+        self._s2 = 0.0
+        self._since_resync = 0
+
+    @staticmethod
+    def _clean(price):
+        try:
+            price = float(price)
+        except (TypeError, ValueError):
+            return float('nan')
+        return price if math.isfinite(price) and price > 0 else float('nan')
+
+    def push(self, price):
+        price = self._clean(price)
+        if self.window <= 0: return
+
+        if len(self.prices) == self.window:
+            old = self.prices.popleft()
+            if old == old:
+                # El retorno más antiguo siempre sale del precio válido más antiguo
+                if self._returns:
+                    r = self._returns.popleft()
+                    self._s1 -= r
+                    self._s2 -= r * r
+                else:
+                    self._last_valid = None
+
+        if price == price:
+            if self._last_valid is not None:
+                r = math.log(price / self._last_valid)
+                self._returns.append(r)
+                self._s1 += r
+                self._s2 += r * r
+            self._last_valid = price
+        self.prices.append(price)
+
+        self._since_resync += 1
+        if self._since_resync >= self.window:
+            self._s1 = math.fsum(self._returns)
+            self._s2 = math.fsum(r * r for r in self._returns)
+            self._since_resync = 0
+
+    def annualized(self):
+        n = len(self._returns)
+        if len(self.prices) < 5 or n < 1: return self.DEFAULT_VOL
+        mean = self._s1 / n
+        var = self._s2 / n - mean * mean
+        return math.sqrt(max(var, 0.0)) * math.sqrt(365)
+
+    def to_dict(self):
+        return {"window": self.window, "prices": [p if p == p else None for p in self.prices]}
+
+    @classmethod
+    def from_dict(cls, data):
+        vol = cls(data["window"])
+        for price in data.get("prices", []):
+            vol.push(price)
+        return vol
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from .pool_history import PoolHistory
+from . import metrics
+
+# Versión del formato de resultados: se cambia si cambian los cálculos cacheados
+MEMO_VERSION = 1
+# Tope del nivel en memoria: un backtest de años son DataFrames de varios MB, así que no
+# basta con limitar el número de entradas
+MEMO_MAX_ENTRIES = 2048
+MEMO_MAX_BYTES = 64 * 1024 * 1024
+
+
+def history_digest(history, include_meta=True):
+    """
+    Hash del CONTENIDO del historial (columnas + meta). Un snapshot nuevo cambia el hash;
+    mientras no cambien los datos, el resultado cacheado sigue siendo válido.
+    """
+    ph = PoolHistory.coerce(history)
+    h = hashlib.blake2b(digest_size=20)
+    for column in (ph.date, ph.price_native, ph.price_usd, ph.apr, ph.liquidity):
+        if column.dtype == object:
+            h.update(repr(column.tolist()).encode())
+        else:
+            h.update(column.tobytes())
+        h.update(b"|")
+    if include_meta:
+        h.update(json.dumps(ph.meta, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def make_key(kind, digest, **params):
+    """Clave de caché: tipo de cálculo + hash del historial + parámetros (orden indiferente)."""
+    payload = json.dumps(params, sort_keys=True, default=str)
+    return f"{kind}:v{MEMO_VERSION}:{digest}:{hashlib.blake2b(payload.encode(), digest_size=12).hexdigest()}"
+
+
+def _copy(value):
+    # Los resultados se devuelven como copias: quien llama puede modificarlos (p.ej. añadir 'Address')
+    # Sin pandas cargado no puede haber DataFrames: no se importa solo para comprobarlo
+    pd = sys.modules.get("pandas")
+    if pd is not None and isinstance(value, pd.DataFrame):
+        return value.copy()
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, (tuple, list)):
+        return type(value)(_copy(v) for v in value)
+    return value
+
+
+def _approx_size(value):
+    """Bytes aproximados de un resultado (DataFrames con memory_usage(deep=True))."""
+    pd = sys.modules.get("pandas")
+    if pd is not None and isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_approx_size(k) + _approx_size(v) for k, v in value.items())
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(_approx_size(v) for v in value)
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """
+    Memoización direccionada por contenido de métricas de pool y backtests.
+
+    - Nivel en memoria: LRU acotado a `max_entries` y a `max_bytes` (tamaño aproximado;
+      un resultado mayor que `max_bytes` solo se guarda en disco).
+    - Nivel en disco opcional (SQLite, `disk_path`), compartido entre procesos y reinicios.
+    Las entradas no caducan por tiempo: la clave incluye el hash de los datos.
+    """
+
+    def __init__(self, max_entries=MEMO_MAX_ENTRIES, max_bytes=MEMO_MAX_BYTES, disk_path=None, name="results"):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.name = name
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # clave -> (valor, bytes)
+        self._bytes = 0
+        self._conn = None
+        if disk_path:
+            folder = os.path.dirname(os.path.abspath(disk_path))
+            os.makedirs(folder, exist_ok=True)
+            self._conn = sqlite3.connect(disk_path, check_same_thread=False)
+            with self._lock:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS memo ("
+                    " key TEXT PRIMARY KEY, value BLOB NOT NULL, created_at REAL NOT NULL)"
+                )
+                self._conn.commit()
+
+    def __len__(self):
+        return len(self._memory)
+
+    @property
+    def memory_bytes(self):
+        return self._bytes
+
+    def _remember(self, key, value):
+        # Llamar con el lock tomado
+        size = _approx_size(value)
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        if size > self.max_bytes: return
+
+        self._memory[key] = (value, size)
+        self._bytes += size
+        while len(self._memory) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted) = self._memory.popitem(last=False)
+            self._bytes -= evicted
+
+    def get(self, key):
+        """(True, valor) o (False, None)."""
+        registry = metrics.get_registry()
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                registry.inc("memo_cache_total", cache=self.name, result="hit")
+                return True, _copy(self._memory[key][0])
+
+            if self._conn is not None:
+                row = self._conn.execute("SELECT value FROM memo WHERE key = ?", (key,)).fetchone()
+                if row:
+                    try:
+                        value = pickle.loads(row[0])
+                    except Exception as e:
+                        print(f"Entrada de caché ilegible ({e}), se recalcula")
+                    else:
+                        self._remember(key, value)
+                        registry.inc("memo_cache_total", cache=self.name, result="disk_hit")
+                        return True, _copy(value)
+
+        registry.inc("memo_cache_total", cache=self.name, result="miss")
+        return False, None
+
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO memo (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), time.time())
+                )
+                self._conn.commit()
+
+    def get_or_compute(self, key, compute):
+        found, value = self.get(key)
+        if found: return value
+        value = compute()
+        # None (historial insuficiente) también se cachea: con los mismos datos sigue siendo None
+        self.put(key, value)
+        return _copy(value)
+
+    def clear(self, disk=False):
+        with self._lock:
+            self._memory.clear()
+            self._bytes = 0
+            if disk and self._conn is not None:
+                self._conn.execute("DELETE FROM memo")
+                self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+def get_result_cache():
+    """Caché única por proceso (sobrevive a los reruns de Streamlit). Disco vía UNI_V3_MEMO_DB."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ResultCache(disk_path=os.environ.get("UNI_V3_MEMO_DB"))
+        return _shared_cache
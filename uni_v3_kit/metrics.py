@@ -0,0 +1,162 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Buckets de latencia (segundos) estilo Prometheus
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PREFIX = "uni_v3_"
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs: return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Contadores e histogramas en memoria, thread-safe, exportables en formato
+    de texto de Prometheus. Los nombres se exportan con el prefijo `uni_v3_`.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = _Histogram(self.buckets)
+            hist.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def stage(self, stage):
+        """Temporizador de una etapa del pipeline (histograma `stage_seconds{stage=...}`)."""
+        return self.timer("stage_seconds", stage=stage)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        """Estado actual como dicts planos (para tablas / debug)."""
+        with self._lock:
+            counters = [
+                {"metric": name, "labels": dict(key), "value": value}
+                for (name, key), value in sorted(self._counters.items())
+            ]
+            histograms = [
+                {"metric": name, "labels": dict(key), "count": h.count, "sum": h.total,
+                 "avg": h.total / h.count if h.count else 0.0}
+                for (name, key), h in sorted(self._histograms.items())
+            ]
+        return {"counters": counters, "histograms": histograms}
+
+    def render_prometheus(self):
+        """Exposición en formato de texto de Prometheus (v0.0.4)."""
+        lines = []
+        with self._lock:
+            by_name = {}
+            for (name, key), value in self._counters.items():
+                by_name.setdefault(name, []).append((key, value))
+            for name in sorted(by_name):
+                full = PREFIX + name
+                if name in self._help: lines.append(f"# HELP {full} {self._help[name]}")
+                lines.append(f"# TYPE {full} counter")
+                for key, value in sorted(by_name[name]):
+                    lines.append(f"{full}{_format_labels(key)} {value}")
+
+            by_name = {}
+            for (name, key), hist in self._histograms.items():
+                by_name.setdefault(name, []).append((key, hist))
+            for name in sorted(by_name):
+                full = PREFIX + name
+                if name in self._help: lines.append(f"# HELP {full} {self._help[name]}")
+                lines.append(f"# TYPE {full} histogram")
+                for key, hist in sorted(by_name[name], key=lambda x: x[0]):
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        cumulative += count
+                        lines.append(f"{full}_bucket{_format_labels(key, [('le', repr(bound))])} {cumulative}")
+                    lines.append(f"{full}_bucket{_format_labels(key, [('le', '+Inf')])} {hist.count}")
+                    lines.append(f"{full}_sum{_format_labels(key)} {hist.total}")
+                    lines.append(f"{full}_count{_format_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+class NullRegistry(MetricsRegistry):
+    """Registro que no hace nada: desactiva la instrumentación sin tocar el código."""
+
+    def inc(self, name, value=1, **labels):
+        pass
+
+    def observe(self, name, value, **labels):
+        pass
+
+    @contextmanager
+    def timer(self, name, **labels):
+        yield
+
+
+_registry = MetricsRegistry()
+_registry.describe("stage_seconds", "Duración de cada etapa de scan/backtest")
+_registry.describe("http_request_seconds", "Latencia de peticiones HTTP por host")
+_registry.describe("http_requests_total", "Peticiones HTTP por host y código")
+_registry.describe("singleflight_total", "Llamadas que ejecutan la descarga (leader), reutilizan una en curso (coalesced) o se cansan de esperarla (timeout)")
+
+
+def get_registry():
+    """Registro global del proceso (el que usan DataProvider, MarketScanner y Backtester)."""
+    return _registry
+
+
+def set_registry(registry):
+    """Sustituye el registro global (p.ej. NullRegistry() o uno propio). Devuelve el anterior."""
+    global _registry
+    previous, _registry = _registry, registry
+    return previous
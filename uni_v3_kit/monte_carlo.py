@@ -0,0 +1,148 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from .math_core import V3Math
+
+# Pasos por día: snapshots de 8h
+STEPS_PER_DAY = 3
+# Horizontes / tablas de índices que se conservan (LRU): con 10k trayectorias cada una ocupa
+# n_steps * 80 KB, así que sin límite un barrido de ventanas y longitudes de historial crecería sin fin
+MAX_CACHED_DRAWS = 4
+MAX_CACHED_INDICES = 8
+
+
+def _lru_get(cache, key):
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+    return value
+
+
+def _lru_put(cache, key, value, max_entries):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > max_entries:
+        cache.popitem(last=False)
+
+
+class RangeSurvivalSimulator:
+    """
+    Monte Carlo vectorizado de permanencia en rango para posiciones V3.
+
+    Genera `n_paths` trayectorias de precio (pasos de 8h) a partir de los log-retornos
+    realizados de cada pool:
+    - method="bootstrap": remuestrea los retornos históricos (respeta colas gruesas);
+    - method="gbm": movimiento browniano geométrico con la desviación realizada.
+    Los retornos se centran (sin deriva) para no extrapolar tendencias pasadas.
+
+    Los números aleatorios (uniformes para bootstrap, normales para GBM) se generan una
+    vez por horizonte y se comparten entre pools: cada pool los transforma con sus propios
+    retornos, así que las estimaciones son independientes del orden y comparables entre sí
+    (números aleatorios comunes).
+    """
+
+    def __init__(self, n_paths=10_000, method="bootstrap", seed=42, dtype=np.float32):
+        if method not in ("bootstrap", "gbm"):
+            raise ValueError(f"Método desconocido: {method}")
+        self.n_paths = n_paths
+        self.method = method
+        self.seed = seed
+        self.dtype = dtype
+        self._draws = OrderedDict()
+        self._indices = OrderedDict()
+
+    def _shared_draws(self, n_steps):
+        # Forma (n_steps, n_paths): el cumsum por pasos recorre filas contiguas
+        draws = _lru_get(self._draws, n_steps)
+        if draws is None:
+            rng = np.random.default_rng((self.seed, n_steps))
+            if self.method == "bootstrap":
+                draws = rng.random((n_steps, self.n_paths), dtype=np.float64)
+            else:
+                draws = rng.standard_normal((n_steps, self.n_paths), dtype=self.dtype)
+            _lru_put(self._draws, n_steps, draws, MAX_CACHED_DRAWS)
+        return draws
+
+    def _bootstrap_indices(self, n_steps, n_returns):
+        # Casi todos los pools tienen la misma longitud de historial: se reutilizan los índices
+        key = (n_steps, n_returns)
+        idx = _lru_get(self._indices, key)
+        if idx is None:
+            idx = (self._shared_draws(n_steps) * n_returns).astype(np.intp)
+            _lru_put(self._indices, key, idx, MAX_CACHED_INDICES)
+        return idx
+
+    @staticmethod
+    def log_returns(prices):
+        """Log-retornos de una serie de precios (ignora precios <= 0 / NaN)."""
+        prices = np.asarray(prices, dtype=float)
+        prices = prices[np.isfinite(prices) & (prices > 0)]
+        return np.diff(np.log(prices))
+
+    def simulate_paths(self, log_returns, n_steps):
+        """Trayectorias de log-precio relativas a la entrada: array (n_steps, n_paths)."""
+        r = np.asarray(log_returns, dtype=float)
+        r = r[np.isfinite(r)]
+        if len(r) < 2:
+            return None
+        r = r - r.mean()
+
+        if self.method == "bootstrap":
+            increments = r.astype(self.dtype)[self._bootstrap_indices(n_steps, len(r))]
+        else:
+            increments = self._shared_draws(n_steps) * self.dtype(r.std())
+        return np.cumsum(increments, axis=0, out=increments)
+
+    def simulate(self, log_returns, days_window, range_width_pct, apr_annual=0.0):
+        """
+        Métricas de una posición con rango simétrico [1-w, 1+w] durante `days_window` días:
+        - in_range_fraction: fracción media del tiempo dentro del rango (pondera las fees);
+        - survival: probabilidad de no salir del rango en todo el periodo;
+        - expected_fees: APR * tiempo * in_range_fraction (decimal);
+        - expected_il: IL medio al final del periodo vs HODL (decimal, positivo = pérdida);
+        - il_p95: IL en el percentil 95.
+        """
+        n_steps = max(1, int(round(days_window * STEPS_PER_DAY)))
+        paths = self.simulate_paths(log_returns, n_steps)
+        if paths is None:
+            return None
+
+        w = float(max(range_width_pct, 0.001))
+        # Límites en espacio logarítmico (con w >= 1 el límite inferior no existe)
+        log_lower = np.log(1.0 - w) if w < 1.0 else -np.inf
+        log_upper = np.log(1.0 + w)
+
+        inside = (paths >= log_lower) & (paths <= log_upper)
+        in_range_fraction = float(inside.mean())
+        survival = float(inside.all(axis=0).mean())
+
+        final_prices = np.exp(paths[-1].astype(float))
+        il = self.exit_il(final_prices, w)
+
+        return {
+            "in_range_fraction": in_range_fraction,
+            "survival": survival,
+            "expected_fees": apr_annual * (days_window / 365.0) * in_range_fraction,
+            "expected_il": float(il.mean()),
+            "il_p95": float(np.percentile(il, 95)),
+        }
+
+    @staticmethod
+    def exit_il(final_prices, range_width_pct):
+        """
+        IL (positivo = pérdida) de una posición abierta en P=1 con rango [1-w, 1+w]
+        al cerrar en `final_prices` (array), usando las fórmulas de V3Math.
+        """
+        w = float(max(range_width_pct, 0.001))
+        p_min = max(1.0 - w, 1e-12)
+        p_max = 1.0 + w
+
+        L = V3Math.get_liquidity_for_amount(1.0, 1.0, p_min, p_max)
+        if not L: return np.zeros_like(final_prices)
+        x0, y0 = V3Math.calculate_amounts(L, 1.0, np.sqrt(p_min), np.sqrt(p_max))
+
+        x_t, y_t = V3Math.calculate_amounts(L, np.sqrt(final_prices), np.sqrt(p_min), np.sqrt(p_max))
+        val_pool = x_t * final_prices + y_t
+        val_hodl = x0 * final_prices + y0
+        return np.maximum(0.0, 1.0 - val_pool / val_hodl)
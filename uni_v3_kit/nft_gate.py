@@ -1,10 +1,24 @@
-from web3 import Web3
-from eth_account.messages import encode_defunct
+import os
+import threading
+import time
+from collections import OrderedDict
 
 # --- CONFIGURACIÓN ---
-ARBITRUM_RPC = "https://arb1.arbitrum.io/rpc"
+# Se puede sobreescribir con la variable de entorno (p.ej. un nodo EVM local para pruebas)
+ARBITRUM_RPC = os.environ.get("ARBITRUM_RPC", "https://arb1.arbitrum.io/rpc")
 # Contrato NFT (Ejemplo: Arbitrum Odyssey) - CÁMBIALO POR EL TUYO
-NFT_CONTRACT_ADDRESS = "0xF4820467171695F4d2760614C77503147A9CB1E8" 
+NFT_CONTRACT_ADDRESS = "0xF4820467171695F4d2760614C77503147A9CB1E8"
+# Multicall3 (misma dirección en Arbitrum y en casi todas las redes EVM)
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+RPC_TIMEOUT = 10
+# Segundos que se recuerda el estado de un holder (los no-holders menos, por si acaban de comprar)
+HOLDER_CACHE_TTL = 300
+NON_HOLDER_CACHE_TTL = 60
+# Direcciones recordadas como máximo (se descartan las menos usadas)
+BALANCE_CACHE_MAX_ENTRIES = 10000
+# Máximo de direcciones por llamada a Multicall
+MULTICALL_BATCH_SIZE = 500
 
 ERC721_ABI = [
     {
@@ -16,41 +30,256 @@ ERC721_ABI = [
     }
 ]
 
+MULTICALL3_ABI = [
+    {
+        "inputs": [{
+            "components": [
+                {"name": "target", "type": "address"},
+                {"name": "allowFailure", "type": "bool"},
+                {"name": "callData", "type": "bytes"}
+            ],
+            "name": "calls",
+            "type": "tuple[]"
+        }],
+        "name": "aggregate3",
+        "outputs": [{
+            "components": [
+                {"name": "success", "type": "bool"},
+                {"name": "returnData", "type": "bytes"}
+            ],
+            "name": "returnData",
+            "type": "tuple[]"
+        }],
+        "stateMutability": "payable",
+        "type": "function"
+    }
+]
+
+# Proveedor, contratos y caché reutilizados entre comprobaciones (todo bajo _lock)
+_lock = threading.Lock()
+_w3 = None
+_contracts = {}
+_balance_cache = OrderedDict()  # dirección (minúsculas) -> (balance, timestamp), orden LRU
+_multicall_deployed = None  # None = aún no comprobado (eth_getCode)
+
+
+def _web3_class():
+    # web3 tarda ~1 s en importarse: solo se carga cuando hace falta de verdad
+    from web3 import Web3
+    return Web3
+
+
+def _get_web3():
+    global _w3
+    with _lock:
+        if _w3 is None:
+            Web3 = _web3_class()
+            try:
+                # web3 >= 7: cachea peticiones invariables (eth_chainId) en vez de repetirlas en cada llamada
+                provider = Web3.HTTPProvider(ARBITRUM_RPC, request_kwargs={"timeout": RPC_TIMEOUT}, cache_allowed_requests=True)
+            except TypeError:
+                provider = Web3.HTTPProvider(ARBITRUM_RPC, request_kwargs={"timeout": RPC_TIMEOUT})
+            _w3 = Web3(provider)
+        return _w3
+
+
+def _get_contract(address, abi):
+    w3 = _get_web3()
+    with _lock:
+        contract = _contracts.get(address)
+        if contract is None:
+            contract = w3.eth.contract(address=_web3_class().to_checksum_address(address), abi=abi)
+            _contracts[address] = contract
+        return contract
+
+
+def reset_cache():
+    """Olvida proveedor, contratos y balances (p.ej. tras cambiar ARBITRUM_RPC)."""
+    global _w3, _multicall_deployed
+    with _lock:
+        _w3 = None
+        _multicall_deployed = None
+        _contracts.clear()
+        _balance_cache.clear()
+
+
+def _cached_balance(address):
+    key = address.lower()
+    with _lock:
+        entry = _balance_cache.get(key)
+        if not entry: return None
+        balance, ts = entry
+        ttl = HOLDER_CACHE_TTL if balance > 0 else NON_HOLDER_CACHE_TTL
+        if time.time() - ts >= ttl:
+            del _balance_cache[key]
+            return None
+        _balance_cache.move_to_end(key)
+        return balance
+
+
+def _store_balance(address, balance):
+    key = address.lower()
+    with _lock:
+        _balance_cache[key] = (balance, time.time())
+        _balance_cache.move_to_end(key)
+        while len(_balance_cache) > BALANCE_CACHE_MAX_ENTRIES:
+            _balance_cache.popitem(last=False)
+
+
+def _encode_balance_of(nft, owner):
+    # web3 v7 usa encode_abi; v6 encodeABI
+    if hasattr(nft, "encode_abi"):
+        return nft.encode_abi("balanceOf", args=[owner])
+    return nft.encodeABI(fn_name="balanceOf", args=[owner])
+
+
+def _has_multicall():
+    """True si Multicall3 está desplegado en el RPC (eth_getCode, se comprueba una vez)."""
+    global _multicall_deployed
+    with _lock:
+        deployed = _multicall_deployed
+    if deployed is None:
+        # La llamada RPC va fuera del lock; si dos hilos la hacen a la vez, ambos obtienen lo mismo
+        code = _get_web3().eth.get_code(_web3_class().to_checksum_address(MULTICALL3_ADDRESS))
+        deployed = len(code) > 0
+        with _lock:
+            _multicall_deployed = deployed
+    return deployed
+
+
+def _fetch_balances_serial(checksum_addresses):
+    """balanceOf una a una (nodos sin Multicall3)."""
+    nft = _get_contract(NFT_CONTRACT_ADDRESS, ERC721_ABI)
+    balances = {}
+    for checksum in checksum_addresses:
+        try:
+            balances[checksum] = nft.functions.balanceOf(checksum).call()
+        except Exception as e:
+            print(f"Error balanceOf {checksum}: {e}")
+    return balances
+
+
+def _fetch_balances(checksum_addresses):
+    """balanceOf de muchas direcciones en una sola llamada eth_call (Multicall3.aggregate3)."""
+    nft = _get_contract(NFT_CONTRACT_ADDRESS, ERC721_ABI)
+    multicall = _get_contract(MULTICALL3_ADDRESS, MULTICALL3_ABI)
+
+    balances = {}
+    for i in range(0, len(checksum_addresses), MULTICALL_BATCH_SIZE):
+        chunk = checksum_addresses[i:i + MULTICALL_BATCH_SIZE]
+        calls = [(nft.address, True, _encode_balance_of(nft, addr)) for addr in chunk]
+        results = multicall.functions.aggregate3(calls).call()
+        for addr, (success, data) in zip(chunk, results):
+            # Si la llamada individual falla no inventamos un 0: se deja sin resultado
+            if success and len(data) >= 32:
+                balances[addr] = int.from_bytes(bytes(data[:32]), "big")
+    return balances
+
+
+def get_nft_balances(user_addresses):
+    """
+    Balance del NFT para varias direcciones: caché TTL primero y el resto en
+    una sola petición Multicall. Devuelve {dirección original: balance o None}.
+    Las direcciones inválidas devuelven None.
+    """
+    result = {}
+    pending = {}
+    for addr in user_addresses:
+        if not addr: continue
+        cached = _cached_balance(addr)
+        if cached is not None:
+            result[addr] = cached
+            continue
+        try:
+            pending.setdefault(_web3_class().to_checksum_address(addr), []).append(addr)
+        except ValueError:
+            result[addr] = None
+
+    if pending:
+        checksums = list(pending)
+        try:
+            if _has_multicall():
+                balances = _fetch_balances(checksums)
+            else:
+                # Sin Multicall (p.ej. nodo local sin el contrato): llamadas individuales
+                balances = _fetch_balances_serial(checksums)
+        except Exception as e:
+            # RPC caído o limitado: no lo multiplicamos con N llamadas sueltas, el lote queda sin resultado
+            print(f"Error consultando balances NFT: {e}")
+            balances = {}
+
+        for checksum, originals in pending.items():
+            balance = balances.get(checksum)
+            if balance is not None:
+                _store_balance(checksum, balance)
+            for addr in originals:
+                result[addr] = balance
+    return result
+
+
 def verify_signature(address, signature, message_text="Acceso a Cazador V3"):
     """
     Recupera la dirección que firmó el mensaje y comprueba si coincide.
     """
     try:
-        w3 = Web3()
+        from eth_account import Account
+        from eth_account.messages import encode_defunct
+
         # Codificar el mensaje según el estándar EIP-191
         message_encoded = encode_defunct(text=message_text)
-        
-        # Recuperar la dirección pública del firmante
-        signer = w3.eth.account.recover_message(message_encoded, signature=signature)
-        
+
+        # Recuperar la dirección pública del firmante (sin crear un proveedor Web3)
+        signer = Account.recover_message(message_encoded, signature=signature)
+
         return signer.lower() == address.lower()
     except Exception as e:
         print(f"Error firma: {e}")
         return False
 
+
+def _access_message(balance):
+    if balance is None:
+        return False, "Error verificando NFT: sin respuesta del RPC o dirección inválida"
+    if balance > 0:
+        return True, f"¡Holder verificado! Tienes {balance} NFT(s)."
+    return False, "No tienes el NFT requerido."
+
+
 def check_access(user_address):
     """
-    Verifica saldo NFT en Arbitrum.
+    Verifica saldo NFT en Arbitrum (con caché por dirección).
     """
     if not user_address: return False, "Dirección vacía"
-    
+
     try:
-        w3 = Web3(Web3.HTTPProvider(ARBITRUM_RPC))
-        if not w3.is_connected(): return False, "Error conexión RPC"
-        
-        checksum_addr = w3.to_checksum_address(user_address)
-        contract_addr = w3.to_checksum_address(NFT_CONTRACT_ADDRESS)
-        contract = w3.eth.contract(address=contract_addr, abi=ERC721_ABI)
-        
+        cached = _cached_balance(user_address)
+        if cached is not None:
+            return _access_message(cached)
+
+        checksum_addr = _web3_class().to_checksum_address(user_address)
+        contract = _get_contract(NFT_CONTRACT_ADDRESS, ERC721_ABI)
+
         balance = contract.functions.balanceOf(checksum_addr).call()
-        
-        if balance > 0:
-            return True, f"¡Holder verificado! Tienes {balance} NFT(s)."
-        return False, "No tienes el NFT requerido."
+        _store_balance(checksum_addr, balance)
+
+        return _access_message(balance)
     except Exception as e:
         return False, f"Error verificando NFT: {str(e)}"
+
+
+def check_access_batch(user_addresses):
+    """
+    Verifica muchas direcciones a la vez (una petición Multicall para las no cacheadas).
+    Devuelve {dirección: (acceso, mensaje)}.
+    """
+    results = {addr: (False, "Dirección vacía") for addr in user_addresses if not addr}
+    try:
+        balances = get_nft_balances(user_addresses)
+    except Exception as e:
+        for addr in user_addresses:
+            if addr: results[addr] = (False, f"Error verificando NFT: {str(e)}")
+        return results
+
+    for addr, balance in balances.items():
+        results[addr] = _access_message(balance)
+    return results
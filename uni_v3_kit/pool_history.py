@@ -0,0 +1,144 @@
+from datetime import datetime
+
+import numpy as np
+
+# Columnas numéricas de cada snapshot de 8h (nombre en la API -> atributo)
+SNAPSHOT_FIELDS = (
+    ("priceNative", "price_native"),
+    ("priceUsd", "price_usd"),
+    ("apr", "apr"),
+    ("Liquidity", "liquidity"),
+)
+
+
+def _to_float(value):
+    try:
+        return float(value) if value is not None else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def parse_snapshot_dates(raw_dates):
+    """
+    Convierte fechas YYYYmmddHHMMSS a datetime64 en bloque.
+    Si alguna no es válida se parsean una a una y se deja el valor original en las que fallen.
+    """
+    try:
+        if isinstance(raw_dates, np.ndarray) and raw_dates.dtype == np.int64:
+            v = raw_dates
+        else:
+            v = np.asarray([int(d) for d in raw_dates], dtype=np.int64)
+        month, day = v // 10**8 % 100, v // 10**6 % 100
+        hh, mm, ss = v // 10**4 % 100, v // 100 % 100, v % 100
+        if ((month < 1) | (month > 12) | (day < 1) | (hh > 23) | (mm > 59) | (ss > 59)).any():
+            raise ValueError("fecha fuera de rango")
+
+        months = ((v // 10**10 - 1970) * 12 + month - 1).astype('datetime64[M]')
+        days = months.astype('datetime64[D]') + (day - 1)
+        if (days.astype('datetime64[M]') != months).any():
+            raise ValueError("día fuera de mes")
+        return days.astype('datetime64[us]') + (hh * 3600 + mm * 60 + ss) * 1_000_000
+    except (ValueError, TypeError, OverflowError):
+        parsed = []
+        for d in raw_dates:
+            try:
+                parsed.append(datetime.strptime(str(d), "%Y%m%d%H%M%S"))
+            except (ValueError, TypeError):
+                parsed.append(d)
+        return parsed
+
+
+class PoolHistory:
+    """
+    Historial de un pool en formato columnar (arrays NumPy), en orden CRONOLÓGICO
+    (el más antiguo primero, al revés que la API).
+
+    - `date`: int64 YYYYmmddHHMMSS (o array de objetos si la API trae otro formato).
+    - `price_native`, `price_usd`, `apr`, `liquidity`: float64, NaN si falta/no es numérico.
+    - `price`: precio de referencia = priceNative si es > 0, si no priceUsd si es > 0, si no NaN.
+    - `meta`: datos del pool sin el historial (poolName, tokens, feeTier...).
+    """
+
+    __slots__ = ("meta", "date", "price_native", "price_usd", "apr", "liquidity", "price")
+
+    def __init__(self, date, price_native, price_usd, apr, liquidity, meta=None):
+        self.meta = meta or {}
+        self.date = date
+        self.price_native = price_native
+        self.price_usd = price_usd
+        self.apr = apr
+        self.liquidity = liquidity
+
+        valid_native = np.isfinite(price_native) & (price_native > 0)
+        valid_usd = np.isfinite(price_usd) & (price_usd > 0)
+        self.price = np.where(valid_native, price_native, np.where(valid_usd, price_usd, np.nan))
+
+    @classmethod
+    def from_records(cls, history, meta=None):
+        """Construye desde la lista de snapshots de la API (más reciente primero)."""
+        history = history or []
+        raw_dates = [x.get('date') for x in history]
+        columns = [np.array([_to_float(x.get(key)) for x in history], dtype=float) for key, _ in SNAPSHOT_FIELDS]
+
+        try:
+            date = np.array([int(d) for d in raw_dates], dtype=np.int64)
+        except (ValueError, TypeError, OverflowError):
+            date = np.array(raw_dates, dtype=object)
+
+        # Orden cronológico: la API es más-reciente-primero; si las fechas son numéricas ordenamos por ellas
+        if date.dtype == np.int64 and len(date) > 1:
+            order = np.argsort(date[::-1], kind='stable')
+            order = len(date) - 1 - order
+        else:
+            order = np.arange(len(date) - 1, -1, -1)
+
+        return cls(date[order], *(c[order] for c in columns), meta=meta)
+
+    @classmethod
+    def from_pool(cls, pool_detail):
+        """Construye desde el objeto pool de `get_pool_history` (info + history)."""
+        if isinstance(pool_detail, cls): return pool_detail
+        pool_detail = pool_detail or {}
+        meta = {k: v for k, v in pool_detail.items() if k != 'history'}
+        return cls.from_records(pool_detail.get('history', []), meta=meta)
+
+    @classmethod
+    def coerce(cls, history):
+        """Acepta PoolHistory, lista de snapshots u objeto pool y devuelve un PoolHistory."""
+        if isinstance(history, cls): return history
+        if isinstance(history, dict): return cls.from_pool(history)
+        return cls.from_records(history)
+
+    def __len__(self):
+        return len(self.price)
+
+    def __getitem__(self, key):
+        """Slicing cronológico sin copiar (vistas sobre los mismos arrays)."""
+        if not isinstance(key, slice):
+            raise TypeError("PoolHistory solo admite slicing")
+        return PoolHistory(self.date[key], self.price_native[key], self.price_usd[key],
+                           self.apr[key], self.liquidity[key], meta=self.meta)
+
+    def newest(self, n):
+        """Los `n` snapshots más recientes (equivale a history[:n] de la API), en orden cronológico."""
+        n = max(0, int(n))
+        return self[len(self) - n:] if n < len(self) else self
+
+    def datetimes(self):
+        return parse_snapshot_dates(self.date)
+
+    def to_records(self):
+        """Vuelve al formato de la API: lista de dicts, más reciente primero."""
+        records = []
+        for i in range(len(self) - 1, -1, -1):
+            snap = {'date': str(self.date[i]) if self.date.dtype == np.int64 else self.date[i]}
+            for key, attr in SNAPSHOT_FIELDS:
+                value = getattr(self, attr)[i]
+                snap[key] = None if np.isnan(value) else float(value)
+            records.append(snap)
+        return records
+
+    def to_pool(self):
+        pool = dict(self.meta)
+        pool['history'] = self.to_records()
+        return pool
@@ -0,0 +1,138 @@
+import numpy as np
+
+
+def _safe_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class PoolIndex:
+    """
+    Índice del universo de pools (`get_all_pools`) para filtrar sin recorrerlo entero.
+
+    Se construye una vez por refresco del listado (admite un iterable en streaming):
+    - pools particionados por red, cada partición ordenada por TVL (corte por búsqueda binaria);
+    - índice invertido símbolo -> pools (la búsqueda por subcadena recorre solo símbolos únicos);
+    - ranking por volumen (descendente, estable) para ordenar los supervivientes.
+    """
+
+    def __init__(self, raw_pools, keep_pools=True):
+        """
+        raw_pools: lista o iterable de pools del listado (p.ej. el generador de un parseo en
+        streaming). Solo se guardan los campos que usa el filtrado, en columnas compactas;
+        con keep_pools=False los dicts originales se descartan según se leen.
+        """
+        kept = [] if keep_pools else None
+        addresses, tvl, volume = [], [], []
+        chain_codes, base_codes, quote_codes = [], [], []
+        chains, symbols = {}, {}  # valor -> código
+        chain_code, symbol_code = chains.setdefault, symbols.setdefault
+        for p in raw_pools or []:
+            if kept is not None: kept.append(p)
+            get = p.get
+            addresses.append(get('pairAddress') or get('_id'))
+            tvl.append(_safe_float(get('Liquidity', 0)))
+            volume.append(_safe_float(get('Volume', 0)))
+            chain_codes.append(chain_code(get('ChainId'), len(chains)))
+            base_codes.append(symbol_code(get('BaseToken', ''), len(symbols)))
+            quote_codes.append(symbol_code(get('QuoteToken', ''), len(symbols)))
+        n = len(addresses)
+
+        self._pools = kept
+        self.addresses = addresses
+        self.tvl = np.array(tvl, dtype=float)
+        self.volume = np.array(volume, dtype=float)
+        self.chain_names = list(chains)
+        self.chain_codes = np.array(chain_codes, dtype=np.int32)
+        self.symbol_names = list(symbols)
+        self.base_codes = np.array(base_codes, dtype=np.int32)
+        self.quote_codes = np.array(quote_codes, dtype=np.int32)
+
+        # Posición de cada pool en el orden por volumen (mismo orden que sorted(..., reverse=True))
+        order = np.argsort(-self.volume, kind='stable')
+        self.volume_rank = np.empty(n, dtype=np.int64)
+        self.volume_rank[order] = np.arange(n)
+
+        # Partición por red: índices ordenados por TVL + TVL ordenado para searchsorted
+        self._by_chain = {}
+        for code, chain in enumerate(self.chain_names):
+            self._by_chain[chain] = self._sorted_by_tvl(np.flatnonzero(self.chain_codes == code))
+        self._all = self._sorted_by_tvl(np.arange(n, dtype=np.int64))
+
+        # Índice invertido por símbolo (BaseToken / QuoteToken en mayúsculas)
+        upper = {}
+        to_upper = np.array([upper.setdefault(str(s).upper(), len(upper)) for s in self.symbol_names], dtype=np.int64)
+        codes = to_upper[np.concatenate([self.base_codes, self.quote_codes])]
+        rows = np.concatenate([np.arange(n, dtype=np.int64)] * 2)
+        order = np.lexsort((rows, codes))
+        codes, rows = codes[order], rows[order]
+        bounds = np.flatnonzero(np.diff(codes)) + 1
+        groups = np.split(rows, bounds) if n else []
+        names = list(upper)
+        self._symbols = {names[int(codes[g_start])]: np.unique(g)
+                         for g_start, g in zip(np.concatenate([[0], bounds]).astype(np.int64), groups)}
+        self._asset_cache = {}
+
+    @classmethod
+    def from_stream(cls, pools):
+        """Índice a partir de un iterable de pools sin retener los dicts (ver DataProvider.get_pool_index)."""
+        return cls(pools, keep_pools=False)
+
+    @property
+    def pools(self):
+        """Pools del listado. Si se construyó en streaming, solo con los campos indexados."""
+        if self._pools is None:
+            self._pools = [
+                {'pairAddress': a, 'ChainId': self.chain_names[c], 'BaseToken': self.symbol_names[b],
+                 'QuoteToken': self.symbol_names[q], 'Liquidity': t, 'Volume': v}
+                for a, c, b, q, t, v in zip(self.addresses, self.chain_codes.tolist(), self.base_codes.tolist(),
+                                            self.quote_codes.tolist(), self.tvl.tolist(), self.volume.tolist())
+            ]
+        return self._pools
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def _sorted_by_tvl(self, idx):
+        order = np.argsort(self.tvl[idx], kind='stable')
+        idx = idx[order]
+        return idx, self.tvl[idx]
+
+    def _above_tvl(self, partition, min_tvl):
+        idx, sorted_tvl = partition
+        # NaN queda al final del orden (y nunca es < min_tvl), igual que el filtro original
+        return idx[np.searchsorted(sorted_tvl, min_tvl, side='left'):]
+
+    def pools_for_asset(self, asset):
+        """Índices de pools cuyo Base o Quote contiene `asset` (subcadena, mayúsculas)."""
+        asset = asset.upper()
+        cached = self._asset_cache.get(asset)
+        if cached is None:
+            matches = [ix for symbol, ix in self._symbols.items() if asset in symbol]
+            cached = np.unique(np.concatenate(matches)) if matches else np.empty(0, dtype=np.int64)
+            self._asset_cache[asset] = cached
+        return cached
+
+    def query(self, target_chains=None, min_tvl=0, assets=None, limit=150):
+        """Índices de los pools que pasan los filtros, ordenados por volumen descendente."""
+        if target_chains:
+            parts = [self._above_tvl(self._by_chain[c], min_tvl) for c in set(target_chains) if c in self._by_chain]
+            selected = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+        else:
+            selected = self._above_tvl(self._all, min_tvl)
+
+        if assets:
+            matches = np.unique(np.concatenate([self.pools_for_asset(a) for a in assets]))
+            selected = np.intersect1d(selected, matches, assume_unique=True)
+
+        if limit is not None and len(selected) > limit:
+            ranks = self.volume_rank[selected]
+            top = np.argpartition(ranks, limit - 1)[:limit]
+            selected = selected[top]
+        return selected[np.argsort(self.volume_rank[selected], kind='stable')]
+
+    def select(self, target_chains=None, min_tvl=0, assets=None, limit=150):
+        """Como query, pero devuelve las direcciones de los pools."""
+        return [self.addresses[i] for i in self.query(target_chains, min_tvl, assets, limit)]
@@ -0,0 +1,318 @@
+import math
+
+import numpy as np
+
+from .backtester import Backtester
+from .history_store import SNAPSHOT_PERIOD_SECONDS
+from .math_core import V3Math, RollingVolatility
+from .pool_history import PoolHistory
+from . import metrics
+
+# Periodos de 8h en un año (mismo factor que las fees del Backtester)
+PERIODS_PER_YEAR = 1095
+SWAP_COST = 0.997
+
+POSITION_DEFAULTS = {"investment_usd": 1000.0, "sd_multiplier": 1.0, "auto_rebalance": False, "vol_days": None}
+
+
+def _pd():
+    # pandas solo hace falta para empaquetar los resultados
+    import pandas
+    return pandas
+
+
+def _max_drawdown(values):
+    """Máximo drawdown (decimal negativo) de una o varias curvas (columnas)."""
+    values = np.asarray(values, dtype=float)
+    peak = np.maximum.accumulate(values, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dd = np.where(peak > 0, values / peak - 1.0, 0.0)
+    return dd.min(axis=0)
+
+
+class PortfolioBacktester:
+    """
+    Backtest de una cartera de posiciones LP sobre una línea temporal común de 8h.
+
+    Cada posición es un dict con `history` (PoolHistory, lista de la API u objeto pool)
+    o `address` (se carga con el DataProvider), y opcionalmente `name`, `investment_usd`,
+    `sd_multiplier`, `auto_rebalance` y `vol_days`.
+
+    El bucle solo visita los periodos con eventos (entradas y salidas de rango); la
+    valoración, fees y HODL se calculan en bloque sobre matrices (tiempo x posición).
+    Misma lógica que Backtester.run_simulation.
+
+    La línea temporal acaba en el último periodo con datos de cualquier posición. Una posición
+    cuyo pool deja de publicar snapshots antes se mantiene a su último precio, sin fees, hasta
+    el final (se avisa y se indica en metadata["stale_periods"]); no recorta a las demás.
+    """
+
+    def __init__(self, data_provider=None):
+        self.backtester = Backtester(data_provider)
+
+    @staticmethod
+    def _slots(history):
+        """Periodo de 8h (entero) de cada snapshot."""
+        dates = history.datetimes()
+        if not isinstance(dates, np.ndarray):
+            raise ValueError("Fechas de snapshot no parseables")
+        return dates.astype('datetime64[s]').astype(np.int64) // SNAPSHOT_PERIOD_SECONDS
+
+    def _prepare(self, position):
+        history = position.get("history")
+        if history is None and position.get("address"):
+            history = self.backtester.load_history(position["address"])
+        history = PoolHistory.coerce(history)
+
+        p_native = history.price
+        p_usd = history.price_usd
+        valid = np.isfinite(p_native) & np.isfinite(p_usd) & (p_native > 0) & (p_usd > 0)
+        rows = np.flatnonzero(valid)
+        if not len(rows): return None
+
+        slots = self._slots(history)[rows]
+        # Varios snapshots en el mismo periodo: nos quedamos con el último
+        last = np.append(slots[1:] != slots[:-1], True)
+        rows, slots = rows[last], slots[last]
+        return {
+            "rows": rows,
+            "slots": slots,
+            "price": p_native[rows],
+            "price_usd": p_usd[rows],
+            "apr": np.nan_to_num(history.apr[rows], nan=0.0),
+            "rolling": RollingVolatility(history.price),
+        }
+
+    @staticmethod
+    def _liquidity(principal_usd, p_native, p_usd, lower, upper):
+        """L para un capital en USD (vectorizado, como Backtester._calculate_liquidity_and_amounts)."""
+        x_unit, y_unit = V3Math.calculate_amounts(1.0, np.sqrt(p_native), np.sqrt(lower), np.sqrt(upper))
+        cost_unit = x_unit * p_usd + y_unit * (p_usd / p_native)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            L = np.where(cost_unit > 0, principal_usd / cost_unit, 0.0)
+        return L, x_unit * L, y_unit * L
+
+    def run(self, positions, sim_days=30, vol_days=7):
+        """
+        Devuelve un dict con:
+        - "portfolio": DataFrame (Valor Total, Fees Acum, HODL Value, Drawdown %) de la cartera;
+        - "value", "fees", "hodl", "in_range": DataFrames (fecha x posición) por posición;
+        - "summary": una fila de métricas por posición;
+        - "correlation": matriz de correlación de los retornos de 8h de las posiciones;
+        - "metadata": drawdown de la cartera vs el de las posiciones por separado, volatilidad
+          y ratio de diversificación (sum w_i*σ_i / σ_cartera).
+        None si ninguna posición tiene historial.
+        """
+        registry = metrics.get_registry()
+        with registry.stage("backtest.portfolio"):
+            result = self._run(positions, sim_days, vol_days)
+        registry.inc("portfolio_backtests_total", result="ok" if result else "insufficient_history")
+        return result
+
+    def _run(self, positions, sim_days, vol_days):
+        names, configs, series, skipped = [], [], [], []
+        for k, position in enumerate(positions):
+            config = dict(POSITION_DEFAULTS)
+            config.update(position)
+            name = str(config.get("name") or config.get("address") or f"Posición {k + 1}")
+            try:
+                prepared = self._prepare(config)
+            except Exception as e:
+                print(f"Error preparando {name}: {e}")
+                prepared = None
+            if prepared is None:
+                skipped.append(name)
+                continue
+            names.append(name)
+            configs.append(config)
+            series.append(prepared)
+        if not series: return None
+
+        # --- 1. Línea temporal común: los últimos `sim_days` días hasta el periodo más reciente con datos ---
+        T = sim_days * 3
+        end_slot = max(int(s["slots"][-1]) for s in series)
+        timeline = np.arange(end_slot - T + 1, end_slot + 1, dtype=np.int64)
+        N = len(series)
+        stale = {name: int(end_slot - s["slots"][-1]) for name, s in zip(names, series) if s["slots"][-1] < end_slot}
+        if stale:
+            print(f"Aviso: pools sin snapshots recientes, se mantienen a su último precio (periodos): {stale}")
+
+        P = np.full((T, N), np.nan)
+        P_usd = np.full((T, N), np.nan)
+        apr = np.zeros((T, N))
+        row_at = np.zeros((T, N), dtype=np.int64)
+        active = np.zeros((T, N), dtype=bool)
+        for j, s in enumerate(series):
+            # Último snapshot disponible en cada periodo (precio arrastrado si falta alguno)
+            k = np.searchsorted(s["slots"], timeline, side='right') - 1
+            has = k >= 0
+            k = np.maximum(k, 0)
+            active[:, j] = has
+            P[has, j] = s["price"][k[has]]
+            P_usd[has, j] = s["price_usd"][k[has]]
+            row_at[:, j] = s["rows"][k]
+            # Sin snapshot nuevo en el periodo no hay APR (no se cobran fees)
+            observed = has & (s["slots"][k] == timeline)
+            apr[observed, j] = s["apr"][k[observed]]
+
+        investment = np.array([float(c["investment_usd"]) for c in configs])
+        sd = np.array([float(c["sd_multiplier"]) for c in configs])
+        auto = np.array([bool(c["auto_rebalance"]) for c in configs])
+        pos_vol_days = [int(c["vol_days"] or vol_days) for c in configs]
+
+        # Ancho de rango de cada posición en cada periodo (misma regla que
+        # Backtester._calculate_dynamic_range), con una consulta vectorizada por posición
+        vol_tn = np.empty((T, N))
+        for j, s in enumerate(series):
+            ends = row_at[:, j]
+            vol_tn[:, j] = s["rolling"].annualized_many(ends - pos_vol_days[j] * 3, ends)
+        scaling = np.sqrt(np.array(pos_vol_days) / 365.0)
+        width_tn = np.clip(vol_tn * scaling * sd, 0.01, 1.0)
+
+        # --- 2. Bucle por eventos (vectorizado por posición): solo entradas y rebalanceos ---
+        # Tras cada evento se busca en bloque (argmax) el siguiente periodo fuera de rango,
+        # así que el bucle solo visita periodos con eventos.
+        started_col = active    # una vez hay datos, la posición queda abierta
+
+        lower = np.full(N, np.nan)
+        upper = np.full(N, np.nan)
+        L = np.zeros(N)
+        hodl_x = np.zeros(N)
+        hodl_y = np.zeros(N)
+        rebalances = np.zeros(N, dtype=np.int64)
+        initial_vol = np.full(N, np.nan)
+        opened = np.zeros(N, dtype=bool)
+        events = []  # (t, posiciones, lower, upper, L)
+
+        next_t = np.argmax(active, axis=0)
+        while True:
+            t = int(next_t.min())
+            if t >= T: break
+            due = np.flatnonzero(next_t == t)
+            p_t = P[t]
+
+            entering = due[~opened[due]]
+            if len(entering):
+                width = width_tn[t, entering]
+                initial_vol[entering] = vol_tn[t, entering]
+                lower[entering] = p_t[entering] * (1 - width)
+                upper[entering] = p_t[entering] * (1 + width)
+                L[entering], hodl_x[entering], hodl_y[entering] = self._liquidity(
+                    investment[entering], p_t[entering], P_usd[t, entering], lower[entering], upper[entering]
+                )
+                opened[entering] = True
+
+            out = due[~np.isin(due, entering)]
+            if len(out):
+                p_usd_t = P_usd[t, out]
+                ax, ay = V3Math.calculate_amounts(L[out], np.sqrt(p_t[out]), np.sqrt(lower[out]), np.sqrt(upper[out]))
+                principal = (ax * p_usd_t + ay * (p_usd_t / p_t[out])) * SWAP_COST
+                width = width_tn[t, out]
+                lower[out] = p_t[out] * (1 - width)
+                upper[out] = p_t[out] * (1 + width)
+                L[out], _, _ = self._liquidity(principal, p_t[out], p_usd_t, lower[out], upper[out])
+                rebalances[out] += 1
+
+            events.append((t, due, lower[due], upper[due], L[due]))
+
+            # Siguiente salida de rango de las posiciones con auto-rebalanceo (T = ninguna)
+            next_t[due] = T
+            watch = due[auto[due]]
+            if len(watch) and t + 1 < T:
+                ahead = P[t + 1:, watch]
+                with np.errstate(invalid='ignore'):
+                    breach = active[t + 1:, watch] & ((ahead < lower[watch]) | (ahead > upper[watch]))
+                hit = breach.any(axis=0)
+                next_t[watch[hit]] = t + 1 + np.argmax(breach[:, hit], axis=0)
+
+        # Estado de cada posición arrastrado desde su último evento (una sola pasada T x N)
+        last_event = np.full((T, N), -1, dtype=np.int64)
+        lower_ev = np.full((T, N), np.nan)
+        upper_ev = np.full((T, N), np.nan)
+        L_ev = np.zeros((T, N))
+        for t, due, lo, up, liq in events:
+            last_event[t, due] = t
+            lower_ev[t, due], upper_ev[t, due], L_ev[t, due] = lo, up, liq
+        last_event = np.maximum.accumulate(last_event, axis=0)
+        seen = last_event >= 0
+        cols = np.broadcast_to(np.arange(N), (T, N))
+        rows_ev = np.maximum(last_event, 0)
+        lower_col = np.where(seen, lower_ev[rows_ev, cols], np.nan)
+        upper_col = np.where(seen, upper_ev[rows_ev, cols], np.nan)
+        L_col = np.where(seen, L_ev[rows_ev, cols], 0.0)
+
+        # --- 3. Valoración, fees y HODL en bloque (T x N) ---
+        with np.errstate(invalid='ignore'):
+            ax, ay = V3Math.calculate_amounts(L_col, np.sqrt(P), np.sqrt(lower_col), np.sqrt(upper_col))
+            P_quote = P_usd / P
+            val_pos = np.where(started_col, ax * P_usd + ay * P_quote, investment)
+            in_range = started_col & (lower_col <= P) & (P <= upper_col)
+            hodl = np.where(started_col, hodl_x * P_usd + hodl_y * P_quote, investment)
+        fees_period = np.where(in_range & (apr != 0), val_pos * ((apr / 100.0) / PERIODS_PER_YEAR), 0.0)
+        fees_acum = np.cumsum(fees_period, axis=0)
+        total = val_pos + fees_acum
+
+        # --- 4. Resultados ---
+        pd = _pd()
+        index = pd.to_datetime(timeline * SNAPSHOT_PERIOD_SECONDS, unit="s")
+        value_df = pd.DataFrame(total, index=index, columns=names)
+        fees_df = pd.DataFrame(fees_acum, index=index, columns=names)
+        hodl_df = pd.DataFrame(hodl, index=index, columns=names)
+        in_range_df = pd.DataFrame(in_range, index=index, columns=names)
+
+        portfolio_value = total.sum(axis=1)
+        portfolio_df = pd.DataFrame({
+            "Valor Total": portfolio_value,
+            "Fees Acum": fees_acum.sum(axis=1),
+            "HODL Value": hodl.sum(axis=1),
+            "Drawdown %": (portfolio_value / np.maximum.accumulate(portfolio_value) - 1.0) * 100.0,
+        }, index=index)
+
+        # Riesgo: el drawdown de la cartera ya incorpora las correlaciones; se compara con
+        # el de las posiciones por separado (ponderado por capital) para ver la diversificación
+        returns = value_df.pct_change().iloc[1:]
+        correlation = returns.corr()
+        weights = investment / investment.sum()
+        position_dd = _max_drawdown(total)
+        portfolio_dd = float(_max_drawdown(portfolio_value))
+        position_sigma = returns.std(ddof=0).to_numpy()
+        portfolio_sigma = float(portfolio_df["Valor Total"].pct_change().iloc[1:].std(ddof=0)) if T > 1 else float('nan')
+        diversification = float(np.dot(weights, position_sigma) / portfolio_sigma) if portfolio_sigma > 0 else float('nan')
+
+        final_value = total[-1]
+        summary = pd.DataFrame({
+            "Posición": names,
+            "Inversión": investment,
+            "Valor Final": final_value,
+            "HODL Final": hodl[-1],
+            "vs HODL %": (final_value / hodl[-1] - 1.0) * 100.0,
+            "Fees": fees_acum[-1],
+            "Rebalanceos": rebalances,
+            "Tiempo en Rango %": in_range.sum(axis=0) / np.maximum(started_col.sum(axis=0), 1) * 100.0,
+            "Max Drawdown %": position_dd * 100.0,
+            "Volatilidad Inicial": initial_vol,
+        })
+
+        metadata = {
+            "positions": N,
+            "skipped": skipped,
+            "periods": T,
+            "stale_periods": stale,
+            "max_drawdown_pct": portfolio_dd * 100.0,
+            "weighted_position_drawdown_pct": float(np.dot(weights, position_dd)) * 100.0,
+            "worst_position_drawdown_pct": float(position_dd.min()) * 100.0,
+            "volatility_annual": portfolio_sigma * math.sqrt(PERIODS_PER_YEAR),
+            "diversification_ratio": diversification,
+            "rebalances": int(rebalances.sum()),
+        }
+
+        return {
+            "portfolio": portfolio_df,
+            "value": value_df,
+            "fees": fees_df,
+            "hodl": hodl_df,
+            "in_range": in_range_df,
+            "summary": summary,
+            "correlation": correlation,
+            "metadata": metadata,
+        }
@@ -0,0 +1,268 @@
+import json
+import math
+import sqlite3
+import threading
+import time
+
+from .backtester import Backtester
+from .math_core import V3Math, StreamingVolatility
+from .pool_history import PoolHistory
+
+SWAP_COST = 0.997
+STATE_VERSION = 1
+
+# Campos numéricos del estado (se serializan tal cual)
+STATE_FIELDS = (
+    "investment_usd", "sd_multiplier", "vol_days", "fee_tier", "auto_rebalance",
+    "liquidity", "lower_price", "upper_price", "range_width_pct", "hodl_x", "hodl_y",
+    "fees_acum", "rebalances", "initial_min_p", "initial_max_p", "initial_volatility",
+    "last_date", "steps", "pool",
+)
+
+_helper = Backtester(cache=False)
+
+
+def _snapshot_prices(snap):
+    """(precio nativo, precio USD) con el mismo fallback que el motor original."""
+    p_native = snap.get('priceNative') or snap.get('priceUsd', 0)
+    p_usd = snap.get('priceUsd', 0)
+    try:
+        return float(p_native or 0), float(p_usd or 0)
+    except (TypeError, ValueError):
+        return 0.0, 0.0
+
+
+def _date_key(snap):
+    try:
+        return int(snap.get('date'))
+    except (TypeError, ValueError):
+        return None
+
+
+class PositionState:
+    """
+    Estado serializable de una posición simulada que avanza de snapshot en snapshot.
+
+    `step(snapshot)` aplica un periodo de 8h en O(1) (mismas reglas que
+    Backtester.run_simulation: rebalanceo, valoración, fees y HODL) y devuelve la
+    fila de resultados. La volatilidad del rango se mantiene con StreamingVolatility.
+    `to_dict` / `from_dict` permiten guardarla entre ejecuciones (ver PositionStore).
+    """
+
+    def __init__(self, investment_usd, sd_multiplier, vol_days=7, fee_tier=0.003, auto_rebalance=False, pool=None):
+        self.investment_usd = float(investment_usd)
+        self.sd_multiplier = float(sd_multiplier)
+        self.vol_days = int(vol_days)
+        self.fee_tier = fee_tier
+        self.auto_rebalance = bool(auto_rebalance)
+        self.pool = pool
+
+        self.liquidity = 0.0
+        self.lower_price = None
+        self.upper_price = None
+        self.range_width_pct = None
+        self.hodl_x = 0.0
+        self.hodl_y = 0.0
+        self.fees_acum = 0.0
+        self.rebalances = 0
+        self.initial_min_p = None
+        self.initial_max_p = None
+        self.initial_volatility = None
+        self.last_date = None
+        self.steps = 0
+        self.last_row = None
+        self.volatility = StreamingVolatility(self.vol_days * 3)
+
+    # --- Creación ---
+    @classmethod
+    def open(cls, warmup, entry, investment_usd, sd_multiplier, vol_days=7, fee_tier=0.003, auto_rebalance=False, pool=None):
+        """
+        Abre la posición en `entry` (snapshot de la API) usando `warmup` (snapshots anteriores,
+        orden cronológico) para la volatilidad inicial. Devuelve None si la entrada no tiene precio.
+        """
+        state = cls(investment_usd, sd_multiplier, vol_days, fee_tier, auto_rebalance, pool)
+        for snap in list(warmup)[-state.volatility.window:] if state.volatility.window else []:
+            state.volatility.push(snap.get('priceNative') or snap.get('priceUsd'))
+
+        p_native, p_usd = _snapshot_prices(entry)
+        if not p_native or not p_usd: return None
+
+        state.range_width_pct, state.initial_volatility = state._dynamic_range()
+        state.lower_price = p_native * (1 - state.range_width_pct)
+        state.upper_price = p_native * (1 + state.range_width_pct)
+        state.initial_min_p = state.lower_price
+        state.initial_max_p = state.upper_price
+        state.liquidity, state.hodl_x, state.hodl_y = _helper._calculate_liquidity_and_amounts(
+            state.investment_usd, p_native, p_usd, state.lower_price, state.upper_price
+        )
+        state.step(entry)
+        return state
+
+    @classmethod
+    def from_history(cls, history, investment_usd, sd_multiplier, sim_days=30, vol_days=7, fee_tier=0.003,
+                     auto_rebalance=False, pool=None):
+        """
+        Posición abierta hace `sim_days` días y avanzada hasta el último snapshot: mismo estado
+        final que Backtester.run_simulation con esos parámetros. Después basta con step().
+        """
+        history = PoolHistory.coerce(history)
+        records = history.newest((sim_days + vol_days) * 3).to_records()[::-1]
+        warmup_samples = vol_days * 3
+        if len(records) < warmup_samples + 1: return None
+
+        state = cls.open(records[:warmup_samples], records[warmup_samples], investment_usd, sd_multiplier,
+                         vol_days, fee_tier, auto_rebalance, pool or history.meta.get('pairAddress'))
+        if state is None: return None
+        for snap in records[warmup_samples + 1:]:
+            state.step(snap)
+        return state
+
+    # --- Avance ---
+    def _dynamic_range(self):
+        vol_annual = self.volatility.annualized()
+        range_width_pct = vol_annual * math.sqrt(self.vol_days / 365.0) * self.sd_multiplier
+        return max(0.01, min(range_width_pct, 1.0)), vol_annual
+
+    def step(self, snap):
+        """
+        Avanza un snapshot (dict de la API). Devuelve la fila de resultados, o None si el
+        snapshot ya se había aplicado (fecha <= la última) o no tiene precio.
+        """
+        date = _date_key(snap)
+        if date is not None and self.last_date is not None and date <= self.last_date:
+            return None
+
+        p_native, p_usd = _snapshot_prices(snap)
+        row = None
+        if p_native and p_usd:
+            row = self._apply(snap, p_native, p_usd)
+
+        # La ventana de volatilidad incluye todas las filas (también las que no tienen precio)
+        self.volatility.push(snap.get('priceNative') or snap.get('priceUsd'))
+        if date is not None:
+            self.last_date = date
+        self.steps += 1
+        if row is not None:
+            self.last_row = row
+        return row
+
+    def _apply(self, snap, p_native, p_usd):
+        p_quote = p_usd / p_native
+        in_range = self.lower_price <= p_native <= self.upper_price
+
+        if self.auto_rebalance and not in_range:
+            ax, ay = V3Math.calculate_amounts(self.liquidity, math.sqrt(p_native), math.sqrt(self.lower_price), math.sqrt(self.upper_price))
+            principal = (ax * p_usd + ay * p_quote) * SWAP_COST
+            self.range_width_pct, _ = self._dynamic_range()
+            self.lower_price = p_native * (1 - self.range_width_pct)
+            self.upper_price = p_native * (1 + self.range_width_pct)
+            self.liquidity, _, _ = _helper._calculate_liquidity_and_amounts(principal, p_native, p_usd, self.lower_price, self.upper_price)
+            self.rebalances += 1
+            in_range = True
+
+        x, y = V3Math.calculate_amounts(self.liquidity, math.sqrt(p_native), math.sqrt(self.lower_price), math.sqrt(self.upper_price))
+        value = x * p_usd + y * p_quote
+
+        apr = snap.get('apr', 0)
+        fees = 0.0
+        if in_range and apr:
+            fees = value * ((float(apr) / 100.0) / 1095.0)
+            self.fees_acum += fees
+
+        return {
+            "Date": _helper._parse_date(snap.get('date')),
+            "Price": p_native,
+            "Range Min": self.lower_price,
+            "Range Max": self.upper_price,
+            "Range Width %": self.range_width_pct * 100,
+            "In Range": in_range,
+            "APR Period": float(apr) if apr else 0.0,
+            "Fees Period": fees,
+            "Fees Acum": self.fees_acum,
+            "Valor Principal": value,
+            "Valor Total": value + self.fees_acum,
+            "HODL Value": self.hodl_x * p_usd + self.hodl_y * p_quote,
+        }
+
+    def metadata(self):
+        """Mismo formato que el metadata de run_simulation."""
+        return {
+            "initial_volatility": self.initial_volatility,
+            "rebalances": self.rebalances,
+            "initial_range_width_pct": self.range_width_pct,
+            "avg_efficiency": 1.0,
+        }
+
+    # --- Serialización ---
+    def to_dict(self):
+        data = {field: getattr(self, field) for field in STATE_FIELDS}
+        data["version"] = STATE_VERSION
+        data["volatility"] = self.volatility.to_dict()
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("version") != STATE_VERSION:
+            raise ValueError(f"Versión de estado no soportada: {data.get('version')}")
+        state = cls(data["investment_usd"], data["sd_multiplier"], data["vol_days"], data["fee_tier"],
+                    data["auto_rebalance"], data.get("pool"))
+        for field in STATE_FIELDS:
+            setattr(state, field, data.get(field))
+        state.volatility = StreamingVolatility.from_dict(data["volatility"])
+        return state
+
+
+class PositionStore:
+    """Estados de posiciones seguidas (SQLite), para avanzarlas cuando llega cada snapshot."""
+
+    def __init__(self, path="positions.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS positions ("
+                " key TEXT PRIMARY KEY, pool TEXT, state TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS positions_pool ON positions (pool)")
+            self._conn.commit()
+
+    def save_many(self, states):
+        """states: {clave: PositionState}."""
+        now = time.time()
+        rows = [(key, state.pool, json.dumps(state.to_dict()), now) for key, state in states.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO positions (key, pool, state, updated_at) VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def save(self, key, state):
+        self.save_many({key: state})
+
+    def load(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT state FROM positions WHERE key = ?", (key,)).fetchone()
+        return PositionState.from_dict(json.loads(row[0])) if row else None
+
+    def for_pool(self, pool):
+        """{clave: PositionState} de todas las posiciones de un pool."""
+        with self._lock:
+            rows = self._conn.execute("SELECT key, state FROM positions WHERE pool = ?", (pool,)).fetchall()
+        return {key: PositionState.from_dict(json.loads(state)) for key, state in rows}
+
+    def advance_pool(self, pool, snapshots):
+        """Aplica los snapshots nuevos (orden cronológico) a todas las posiciones del pool y las guarda."""
+        states = self.for_pool(pool)
+        for state in states.values():
+            for snap in snapshots:
+                state.step(snap)
+        if states:
+            self.save_many(states)
+        return states
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM positions WHERE key = ?", (key,))
+            self._conn.commit()
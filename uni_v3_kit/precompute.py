@@ -0,0 +1,186 @@
+"""
+Pre-cálculo de scans populares tras cada snapshot de 8h.
+
+    python -m uni_v3_kit.precompute presets.json --db scan_results.db
+    python -m uni_v3_kit.precompute presets.json --db scan_results.db --once
+
+presets.json: lista de presets con los parámetros de MarketScanner.scan, p.ej.
+    [{"name": "eth-usdc-arb-7d", "target_chains": ["arbitrum"], "min_tvl": 100000,
+      "days_window": 7, "sd_multiplier": 1.0, "min_apr": 0, "selected_assets": ["ETH", "USDC"]}]
+"""
+import argparse
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .analyzer import MarketScanner
+from .history_store import SNAPSHOT_PERIOD_SECONDS
+
+SCAN_PARAMS = ("target_chains", "min_tvl", "days_window", "sd_multiplier", "min_apr", "selected_assets", "custom_asset")
+SCAN_DEFAULTS = {"target_chains": None, "min_tvl": 0, "days_window": 7, "sd_multiplier": 1.0,
+                 "min_apr": 0, "selected_assets": None, "custom_asset": None}
+
+
+def canonical_params(params):
+    """Clave estable de unos parámetros de scan (independiente del orden de listas y claves)."""
+    normalized = dict(SCAN_DEFAULTS)
+    normalized.update({k: v for k, v in params.items() if k in SCAN_PARAMS})
+    for key in ("target_chains", "selected_assets"):
+        if normalized[key]:
+            normalized[key] = sorted(set(normalized[key]))
+        else:
+            normalized[key] = None
+    if normalized["selected_assets"]:
+        # El scan compara símbolos en mayúsculas: "eth" y " ETH" son el mismo preset
+        normalized["selected_assets"] = sorted({a.strip().upper() for a in normalized["selected_assets"]})
+    for key in ("min_tvl", "sd_multiplier", "min_apr"):
+        normalized[key] = float(normalized[key])
+    normalized["days_window"] = int(normalized["days_window"])
+    if normalized["custom_asset"]:
+        normalized["custom_asset"] = normalized["custom_asset"].strip().upper()
+    return json.dumps(normalized, sort_keys=True)
+
+
+def _pd():
+    # pandas solo hace falta al leer una tabla guardada
+    import pandas
+    return pandas
+
+
+def snapshot_slot(ts=None):
+    """Inicio (epoch UTC) del periodo de 8h que contiene `ts` (00:00, 08:00, 16:00 UTC)."""
+    ts = time.time() if ts is None else ts
+    return int(ts // SNAPSHOT_PERIOD_SECONDS) * SNAPSHOT_PERIOD_SECONDS
+
+
+class ResultsStore:
+    """Tablas de scan pre-calculadas (SQLite), indexadas por parámetros canónicos."""
+
+    def __init__(self, path="scan_results.db"):
+        self.path = path
+        self._lock = threading.Lock()
+
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS scan_results ("
+                " params TEXT PRIMARY KEY, name TEXT, computed_at REAL NOT NULL,"
+                " slot INTEGER NOT NULL, data TEXT NOT NULL)"
+            )
+            self._conn.commit()
+
+    def save(self, params, df, name=None, computed_at=None):
+        computed_at = time.time() if computed_at is None else computed_at
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO scan_results (params, name, computed_at, slot, data) VALUES (?, ?, ?, ?, ?)",
+                (canonical_params(params), name, computed_at, snapshot_slot(computed_at), df.to_json(orient="split"))
+            )
+            self._conn.commit()
+
+    def load(self, params, max_age=None):
+        """
+        (DataFrame, computed_at) del scan con esos parámetros, o (None, None) si no existe
+        o tiene más de `max_age` segundos.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT computed_at, data FROM scan_results WHERE params = ?", (canonical_params(params),)
+            ).fetchone()
+        if not row: return None, None
+
+        computed_at, data = row
+        if max_age is not None and time.time() - computed_at > max_age:
+            return None, None
+        return _pd().read_json(io.StringIO(data), orient="split"), computed_at
+
+    def is_current(self, params):
+        """True si el resultado se calculó en el periodo de 8h actual."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT slot FROM scan_results WHERE params = ?", (canonical_params(params),)
+            ).fetchone()
+        return bool(row) and row[0] == snapshot_slot()
+
+    def list(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT name, params, computed_at FROM scan_results ORDER BY name").fetchall()
+        return [{"name": n, "params": json.loads(p), "computed_at": c} for n, p, c in rows]
+
+
+class PrecomputeScheduler:
+    """Ejecuta los presets tras cada nuevo snapshot (inicio de periodo de 8h + `delay` segundos)."""
+
+    def __init__(self, presets, store, scanner=None, delay=600):
+        self.presets = presets
+        self.store = store
+        self.scanner = scanner or MarketScanner()
+        self.delay = delay
+
+    def run_once(self, only_stale=False):
+        """Calcula todos los presets (o solo los que no son del periodo actual)."""
+        done = 0
+        for preset in self.presets:
+            params = {k: preset[k] for k in SCAN_PARAMS if k in preset}
+            if only_stale and self.store.is_current(params): continue
+
+            name = preset.get("name") or canonical_params(params)
+            scan_args = dict(SCAN_DEFAULTS)
+            scan_args.update(params)
+            started = time.time()
+            try:
+                df = self.scanner.scan(**scan_args)
+            except Exception as e:
+                print(f"Error en preset {name}: {e}")
+                continue
+            if df.empty:
+                # Listado caído o scan vacío: conservamos el resultado anterior
+                print(f"Preset {name}: scan vacío, se mantiene el resultado anterior")
+                continue
+            self.store.save(params, df, name=name)
+            done += 1
+            print(f"Preset {name}: {len(df)} pools en {time.time() - started:.1f}s")
+        return done
+
+    def next_run_at(self, now=None):
+        now = time.time() if now is None else now
+        run_at = snapshot_slot(now) + self.delay
+        return run_at if run_at > now else run_at + SNAPSHOT_PERIOD_SECONDS
+
+    def run_forever(self):
+        # Al arrancar, recuperamos los presets que no estén al día
+        self.run_once(only_stale=True)
+        while True:
+            wait = self.next_run_at() - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            self.run_once()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-cálculo de scans populares")
+    parser.add_argument("presets", help="JSON con la lista de presets")
+    parser.add_argument("--db", default="scan_results.db", help="fichero SQLite de resultados")
+    parser.add_argument("--delay", type=int, default=600, help="segundos de margen tras cada snapshot")
+    parser.add_argument("--once", action="store_true", help="calcular una vez y salir")
+    args = parser.parse_args(argv)
+
+    with open(args.presets) as f:
+        presets = json.load(f)
+
+    scheduler = PrecomputeScheduler(presets, ResultsStore(args.db), delay=args.delay)
+    if args.once:
+        scheduler.run_once()
+    else:
+        scheduler.run_forever()
+
+
+if __name__ == "__main__":
+    main()
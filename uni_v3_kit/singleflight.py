@@ -0,0 +1,76 @@
+import threading
+
+from . import metrics
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Agrupa llamadas concurrentes con la misma clave: la primera ejecuta `fn` y las que
+    llegan mientras está en curso esperan y reciben su mismo resultado (o su excepción).
+    No es una caché: en cuanto termina la llamada, la siguiente vuelve a ejecutar `fn`.
+
+    Todas las llamadas agrupadas reciben el MISMO objeto: no debe modificarse.
+    Con `timeout`, quien espera a otra llamada se rinde tras esos segundos con TimeoutError
+    (la llamada en curso sigue y su resultado lo reciben los demás).
+    Métrica: singleflight_total{group, result=leader|coalesced|timeout}.
+    """
+
+    def __init__(self, name="default"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def do(self, key, fn, timeout=None):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        registry = metrics.get_registry()
+        if not leader:
+            registry.inc("singleflight_total", group=self.name, result="coalesced")
+            if not call.done.wait(timeout):
+                registry.inc("singleflight_total", group=self.name, result="timeout")
+                raise TimeoutError(f"singleflight {self.name}: {key} sigue en curso tras {timeout}s")
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        registry.inc("singleflight_total", group=self.name, result="leader")
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # Se quita antes de despertar a los que esperan: una llamada posterior ya no se agrupa
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value
+
+
+_shared_flight = None
+_shared_lock = threading.Lock()
+
+def get_singleflight():
+    """Grupo único por proceso, compartido por todos los DataProvider (todas las sesiones)."""
+    global _shared_flight
+    with _shared_lock:
+        if _shared_flight is None:
+            _shared_flight = SingleFlight("data_provider")
+        return _shared_flight
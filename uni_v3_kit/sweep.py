@@ -0,0 +1,145 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .archive import SnapshotArchive
+from .backtester import Backtester
+from .pool_history import PoolHistory
+
+# Parámetros de Backtester.run_simulation que se pueden barrer
+SWEEP_PARAMS = ("sd_multiplier", "vol_days", "sim_days", "auto_rebalance", "tick_exact")
+DEFAULT_PARAMS = {"sd_multiplier": 1.0, "vol_days": 7, "sim_days": 30, "auto_rebalance": False}
+
+
+def _pd():
+    # Los workers no usan pandas: solo se importa para la tabla final
+    import pandas
+    return pandas
+
+
+# Estado por proceso: los historiales se envían UNA vez a cada worker (initializer)
+_worker_histories = None
+_worker_backtester = None
+_worker_rolling = None
+
+def _init_worker(histories, archive_path=None):
+    global _worker_histories, _worker_backtester, _worker_rolling
+    if archive_path:
+        # Solo viaja la ruta: cada worker abre el memmap y comparte la caché de páginas del SO
+        archive = SnapshotArchive(archive_path)
+        histories = {k: archive.get(k) for k in histories}
+    _worker_histories = histories
+    # Sin caché de resultados: cada tarea es una combinación distinta y la conexión SQLite
+    # del nivel en disco no debe heredarse entre procesos
+    _worker_backtester = Backtester(cache=False)
+    # Una pasada por pool sirve para cualquier vol_days / sim_days del grid
+    _worker_rolling = {k: _worker_backtester.build_rolling_volatility(h) for k, h in histories.items()}
+
+def _run_task(task):
+    pool_key, params, investment_usd, fee_tier, token_decimals = task
+    result = _worker_backtester.run_simulation(
+        _worker_histories[pool_key], investment_usd, fee_tier=fee_tier,
+        rolling_vol=_worker_rolling[pool_key], token_decimals=token_decimals, **params
+    )
+    return ParameterSweep.summarize(pool_key, params, result)
+
+
+class ParameterSweep:
+    """
+    Grid-search de parámetros del Backtester sobre varios pools en paralelo.
+    Devuelve una tabla con una fila de métricas por (pool, parámetros).
+    """
+
+    def __init__(self, max_workers=None, data_provider=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.backtester = Backtester(data_provider)
+
+    @staticmethod
+    def expand_grid(param_grid):
+        """{'sd_multiplier': [1, 2], 'vol_days': [7]} -> lista de dicts con todas las combinaciones."""
+        unknown = set(param_grid) - set(SWEEP_PARAMS)
+        if unknown:
+            raise ValueError(f"Parámetros no soportados: {sorted(unknown)}")
+
+        keys = list(param_grid)
+        values = [v if isinstance(v, (list, tuple)) else [v] for v in param_grid.values()]
+        combos = []
+        for combo in itertools.product(*values):
+            params = dict(DEFAULT_PARAMS)
+            params.update(zip(keys, combo))
+            combos.append(params)
+        return combos
+
+    @staticmethod
+    def summarize(pool_key, params, result):
+        row = {"Pool": pool_key}
+        row.update(params)
+        if not result:
+            row.update({"Valor Final": None, "HODL Final": None, "vs HODL %": None,
+                        "Fees": None, "Rebalanceos": None, "Tiempo en Rango %": None,
+                        "Volatilidad Inicial": None})
+            return row
+
+        df, _, _, metadata = result
+        if df.empty:
+            final_value = hodl_value = fees = time_in_range = None
+        else:
+            final_value = float(df["Valor Total"].iloc[-1])
+            hodl_value = float(df["HODL Value"].iloc[-1])
+            fees = float(df["Fees Acum"].iloc[-1])
+            time_in_range = float(df["In Range"].mean()) * 100.0
+
+        vs_hodl = (final_value / hodl_value - 1) * 100.0 if final_value is not None and hodl_value else None
+        row.update({
+            "Valor Final": final_value,
+            "HODL Final": hodl_value,
+            "vs HODL %": vs_hodl,
+            "Fees": fees,
+            "Rebalanceos": metadata.get("rebalances"),
+            "Tiempo en Rango %": time_in_range,
+            "Volatilidad Inicial": metadata.get("initial_volatility")
+        })
+        return row
+
+    def run(self, pools, param_grid, investment_usd=1000.0, fee_tier=0.003, token_decimals=None):
+        """
+        pools: dict {clave: historial}, SnapshotArchive (los workers lo abren con memmap)
+        o lista de direcciones (se cargan con el DataProvider).
+        param_grid: dict {parámetro: lista de valores} (ver SWEEP_PARAMS).
+        token_decimals: dict {clave: (d0, d1)}; obligatorio para todos los pools si el grid
+        incluye tick_exact=True (la API no da los decimales de los tokens).
+        """
+        archive_path = None
+        if isinstance(pools, SnapshotArchive):
+            archive_path = pools.path
+            histories = {k: None for k in pools.addresses() if pools.pools[k]["count"]}
+        elif isinstance(pools, dict):
+            # Columnar: se parsea una vez y se envía a los workers mucho más compacto
+            histories = {k: PoolHistory.coerce(v) for k, v in pools.items() if v is not None}
+            histories = {k: v for k, v in histories.items() if len(v)}
+        else:
+            histories = {}
+            for address in pools:
+                history = self.backtester.load_history(address)
+                if len(history): histories[address] = history
+
+        combos = self.expand_grid(param_grid)
+        token_decimals = token_decimals or {}
+        if any(params.get("tick_exact") for params in combos):
+            missing = [key for key in histories if key not in token_decimals]
+            if missing:
+                raise ValueError(f"tick_exact necesita token_decimals para cada pool; faltan {len(missing)}: {missing[:5]}")
+        tasks = [(key, params, investment_usd, fee_tier, token_decimals.get(key)) for key in histories for params in combos]
+        if not tasks: return _pd().DataFrame()
+
+        workers = min(self.max_workers, len(tasks))
+        if workers <= 1:
+            _init_worker(histories, archive_path)
+            rows = [_run_task(t) for t in tasks]
+        else:
+            chunksize = max(1, len(tasks) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(list(histories) if archive_path else histories, archive_path)) as executor:
+                rows = list(executor.map(_run_task, tasks, chunksize=chunksize))
+
+        return _pd().DataFrame(rows)
@@ -0,0 +1,228 @@
+"""
+Ticks de Uniswap V3: TickMath / SqrtPriceMath / LiquidityAmounts en enteros Q64.96
+(mismo redondeo que los contratos) y tablas tick -> precio precalculadas por tick spacing.
+"""
+import math
+from functools import lru_cache
+
+import numpy as np
+
+MIN_TICK = -887272
+MAX_TICK = 887272
+MIN_SQRT_RATIO = 4295128739
+MAX_SQRT_RATIO = 1461446703485210103287273052203988822378723970342
+Q96 = 1 << 96
+MAX_UINT256 = (1 << 256) - 1
+MAX_UINT128 = (1 << 128) - 1
+
+# feeTier (centésimas de bip) -> tick spacing
+TICK_SPACING = {100: 1, 500: 10, 3000: 60, 10000: 200}
+
+# Constantes de TickMath.getSqrtRatioAtTick: sqrt(1.0001)^-(2^i) en Q128.128
+_TICK_RATIOS = (
+    (0x2, 0xfff97272373d413259a46990580e213a),
+    (0x4, 0xfff2e50f5f656932ef12357cf3c7fdcc),
+    (0x8, 0xffe5caca7e10e4e61c3624eaa0941cd0),
+    (0x10, 0xffcb9843d60f6159c9db58835c926644),
+    (0x20, 0xff973b41fa98c081472e6896dfb254c0),
+    (0x40, 0xff2ea16466c96a3843ec78b326b52861),
+    (0x80, 0xfe5dee046a99a2a811c461f1969c3053),
+    (0x100, 0xfcbe86c7900a88aedcffc83b479aa3a4),
+    (0x200, 0xf987a7253ac413176f2b074cf7815e54),
+    (0x400, 0xf3392b0822b70005940c7a398e4b70f3),
+    (0x800, 0xe7159475a2c29b7443b29c7fa6e889d9),
+    (0x1000, 0xd097f3bdfd2022b8845ad8f792aa5825),
+    (0x2000, 0xa9f746462d870fdf8a65dc1f90e061e5),
+    (0x4000, 0x70d869a156d2a1b890bb3df62baf32f7),
+    (0x8000, 0x31be135f97d08fd981231505542fcfa6),
+    (0x10000, 0x9aa508b5b7a84e1c677de54f3e99bc9),
+    (0x20000, 0x5d6af8dedb81196699c329225ee604),
+    (0x40000, 0x2216e584f5fa1ea926041bedfe98),
+    (0x80000, 0x48a170391f7dc42444e8fa2),
+)
+
+
+def tick_spacing_for_fee(fee_tier):
+    """Tick spacing de un feeTier (3000, "3000" o 0.003)."""
+    fee = float(fee_tier)
+    fee = int(round(fee * 1_000_000)) if fee < 1 else int(round(fee))
+    if fee not in TICK_SPACING:
+        raise ValueError(f"feeTier sin tick spacing conocido: {fee_tier}")
+    return TICK_SPACING[fee]
+
+
+# --- TickMath ---
+@lru_cache(maxsize=65536)
+def get_sqrt_ratio_at_tick(tick):
+    """sqrtPriceX96 exacto de un tick (TickMath.getSqrtRatioAtTick)."""
+    tick = int(tick)
+    abs_tick = abs(tick)
+    if abs_tick > MAX_TICK:
+        raise ValueError(f"Tick fuera de rango: {tick}")
+
+    ratio = 0xfffcb933bd6fad37aa2d162d1a594001 if abs_tick & 0x1 else 0x100000000000000000000000000000000
+    for bit, constant in _TICK_RATIOS:
+        if abs_tick & bit:
+            ratio = (ratio * constant) >> 128
+    if tick > 0:
+        ratio = MAX_UINT256 // ratio
+    # Q128.128 -> Q64.96 redondeando hacia arriba
+    return (ratio >> 32) + (0 if ratio % (1 << 32) == 0 else 1)
+
+
+# --- FullMath / SqrtPriceMath ---
+def _mul_div(a, b, denominator):
+    return (a * b) // denominator
+
+
+def _mul_div_rounding_up(a, b, denominator):
+    return -((-(a * b)) // denominator)
+
+
+def get_amount0_delta(sqrt_a, sqrt_b, liquidity, round_up):
+    if sqrt_a > sqrt_b: sqrt_a, sqrt_b = sqrt_b, sqrt_a
+    numerator1 = liquidity << 96
+    numerator2 = sqrt_b - sqrt_a
+    if round_up:
+        return -((-_mul_div_rounding_up(numerator1, numerator2, sqrt_b)) // sqrt_a)
+    return _mul_div(numerator1, numerator2, sqrt_b) // sqrt_a
+
+
+def get_amount1_delta(sqrt_a, sqrt_b, liquidity, round_up):
+    if sqrt_a > sqrt_b: sqrt_a, sqrt_b = sqrt_b, sqrt_a
+    if round_up:
+        return _mul_div_rounding_up(liquidity, sqrt_b - sqrt_a, Q96)
+    return _mul_div(liquidity, sqrt_b - sqrt_a, Q96)
+
+
+# --- LiquidityAmounts ---
+def get_liquidity_for_amounts(sqrt_p, sqrt_a, sqrt_b, amount0, amount1):
+    """
+    Máxima liquidez que admiten amount0/amount1 (LiquidityAmounts.getLiquidityForAmounts).
+    Como el contrato (SafeCast.toUint128), falla si no cabe en uint128: ValueError.
+    """
+    if sqrt_a > sqrt_b: sqrt_a, sqrt_b = sqrt_b, sqrt_a
+
+    def for_amount0(sa, sb):
+        return _mul_div(amount0, _mul_div(sa, sb, Q96), sb - sa)
+
+    def for_amount1(sa, sb):
+        return _mul_div(amount1, Q96, sb - sa)
+
+    if sqrt_p <= sqrt_a:
+        liquidity = for_amount0(sqrt_a, sqrt_b)
+    elif sqrt_p < sqrt_b:
+        liquidity = min(for_amount0(sqrt_p, sqrt_b), for_amount1(sqrt_a, sqrt_p))
+    else:
+        liquidity = for_amount1(sqrt_a, sqrt_b)
+    if liquidity > MAX_UINT128:
+        raise ValueError("Liquidez fuera de uint128: el contrato revierte con estos importes")
+    return liquidity
+
+
+def get_amounts_for_mint(sqrt_p, sqrt_a, sqrt_b, liquidity):
+    """Tokens que pide el pool al hacer mint de `liquidity` (redondeo hacia arriba, como Pool.mint)."""
+    if sqrt_p <= sqrt_a:
+        return get_amount0_delta(sqrt_a, sqrt_b, liquidity, True), 0
+    if sqrt_p < sqrt_b:
+        return get_amount0_delta(sqrt_p, sqrt_b, liquidity, True), get_amount1_delta(sqrt_a, sqrt_p, liquidity, True)
+    return 0, get_amount1_delta(sqrt_a, sqrt_b, liquidity, True)
+
+
+# --- Tablas precalculadas ---
+@lru_cache(maxsize=None)
+def tick_price_table(spacing):
+    """(ticks, precios) de todos los ticks utilizables con ese spacing; precio = 1.0001^tick (float64)."""
+    first = -(MAX_TICK // spacing) * spacing
+    ticks = np.arange(first, MAX_TICK + 1, spacing, dtype=np.int64)
+    prices = np.power(1.0001, ticks.astype(float))
+    return ticks, prices
+
+
+class TickGrid:
+    """
+    Rangos y liquidez de un pool en ticks exactos.
+
+    Los precios del Backtester son "humanos" (token1 por token0 ya ajustado por decimales);
+    `token_decimals=(d0, d1)` da el desplazamiento al precio crudo del contrato; es obligatorio
+    (con decimales supuestos los ticks no corresponden al precio real).
+    - snap_range: ajusta [lower, upper] a múltiplos del spacing (hacia fuera, con búsqueda
+      binaria en la tabla precalculada; admite arrays).
+    - tick_price: precio humano exacto de un tick (a partir de sqrtPriceX96).
+    - position_for_usd: liquidez y tokens depositados con las fórmulas enteras del contrato.
+    """
+
+    def __init__(self, fee_tier, token_decimals):
+        self.spacing = tick_spacing_for_fee(fee_tier)
+        self.decimals0, self.decimals1 = (int(d) for d in token_decimals)
+        # precio crudo = precio humano * 10^(d1 - d0)
+        self.raw_scale = 10.0 ** (self.decimals1 - self.decimals0)
+        # L humana = L cruda / 10^((d0 + d1) / 2)
+        self.liquidity_scale = 10.0 ** ((self.decimals0 + self.decimals1) / 2.0)
+        self.ticks, self.prices = tick_price_table(self.spacing)
+
+    def snap_range(self, lower_price, upper_price):
+        """(tick_lower, tick_upper) que contienen [lower_price, upper_price] (escalares o arrays)."""
+        last = len(self.ticks) - 1
+        if np.ndim(lower_price) == 0 and np.ndim(upper_price) == 0:
+            # Camino escalar (rebalanceos del Backtester): sin arrays temporales
+            i_lower = min(max(int(self.prices.searchsorted(lower_price * self.raw_scale, 'right')) - 1, 0), last - 1)
+            i_upper = min(max(int(self.prices.searchsorted(upper_price * self.raw_scale, 'left')), i_lower + 1), last)
+            return int(self.ticks[i_lower]), int(self.ticks[i_upper])
+
+        lower_raw = np.asarray(lower_price, dtype=float) * self.raw_scale
+        upper_raw = np.asarray(upper_price, dtype=float) * self.raw_scale
+        i_lower = np.clip(np.searchsorted(self.prices, lower_raw, side='right') - 1, 0, last - 1)
+        i_upper = np.clip(np.searchsorted(self.prices, upper_raw, side='left'), 1, last)
+        i_upper = np.maximum(i_upper, i_lower + 1)
+        return self.ticks[i_lower], self.ticks[i_upper]
+
+    def sqrt_price_x96(self, price):
+        """sqrtPriceX96 (entero) de un precio humano."""
+        return int(math.sqrt(price * self.raw_scale) * Q96)
+
+    def tick_price(self, tick):
+        """Precio humano del tick, a partir del sqrtPriceX96 exacto."""
+        sqrt_price = get_sqrt_ratio_at_tick(tick) / Q96
+        return sqrt_price * sqrt_price / self.raw_scale
+
+    def position_for_usd(self, principal_usd, price, price_usd, tick_lower, tick_upper):
+        """
+        (L, tokens0, tokens1) en unidades humanas de una posición de `principal_usd` en
+        [tick_lower, tick_upper] con el precio actual `price` (token1 por token0) y
+        `price_usd` (USD por token0). L sale de getLiquidityForAmounts y los tokens son
+        los que cobra el mint (redondeo del contrato).
+        """
+        if price <= 0 or price_usd <= 0: return 0.0, 0.0, 0.0
+        sqrt_a = get_sqrt_ratio_at_tick(tick_lower)
+        sqrt_b = get_sqrt_ratio_at_tick(tick_upper)
+        sqrt_p = min(max(self.sqrt_price_x96(price), MIN_SQRT_RATIO), MAX_SQRT_RATIO - 1)
+
+        # Reparto deseado por unidad de liquidez (float) -> cantidades crudas enteras
+        sa, sb, sp = sqrt_a / Q96, sqrt_b / Q96, sqrt_p / Q96
+        if sp <= sa:
+            unit0, unit1 = (sb - sa) / (sa * sb), 0.0
+        elif sp >= sb:
+            unit0, unit1 = 0.0, sb - sa
+        else:
+            unit0, unit1 = (sb - sp) / (sp * sb), sp - sa
+        # Unidades crudas -> humanas: token0 / 10^d0, token1 / 10^d1
+        unit0_h = unit0 / 10.0 ** self.decimals0
+        unit1_h = unit1 / 10.0 ** self.decimals1
+        cost_unit = unit0_h * price_usd + unit1_h * (price_usd / price)
+        if cost_unit <= 0: return 0.0, 0.0, 0.0
+        scale = principal_usd / cost_unit
+
+        amount0 = int(unit0 * scale)
+        amount1 = int(unit1 * scale)
+        liquidity = get_liquidity_for_amounts(sqrt_p, sqrt_a, sqrt_b, amount0, amount1)
+        owed0, owed1 = get_amounts_for_mint(sqrt_p, sqrt_a, sqrt_b, liquidity)
+        return (liquidity / self.liquidity_scale,
+                owed0 / 10.0 ** self.decimals0,
+                owed1 / 10.0 ** self.decimals1)
+
+
+@lru_cache(maxsize=64)
+def get_tick_grid(fee_tier, token_decimals):
+    """TickGrid compartido por (feeTier, decimales): las tablas se construyen una vez por proceso."""
+    return TickGrid(fee_tier, token_decimals)